@@ -1,15 +1,40 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, g, Response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
 from werkzeug.security import generate_password_hash, check_password_hash
+import base64
 import json
 import os
+import queue
+import threading
+import time
 from dotenv import load_dotenv
 from datetime import datetime
 
+from autocompletion import IndexPrefixes
+from cache_reponses import CacheReponses
+from cache_tuiles import CacheTuiles
+from versions_tables import VersionsTables
+from db_pool import PoolConnexions
+from notifications import EcouteurNotifications, DiffuseurFlux
+from geometrie import (decode_wkb_points, points_to_wkt, parse_wkb_linestring, tolerance_zoom,
+                       coordonnees_point, linestring_materialisee_to_wkt, sommets_simplifies)
+from tuiles_mvt import (BUFFER, LIGNE, MIME_MVT, POINT, encoder_couche, geometrie_ligne,
+                        geometrie_point, limites_tuile)
+
+# Sous gunicorn -k gevent: rendre psycopg2 coopératif (flux SSE nombreux)
+try:
+    from gevent import monkey
+    if monkey.is_module_patched('socket'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+except ImportError:
+    pass
+
 # Import optionnel de pandas (pas nécessaire pour le fonctionnement de base)
 try:
     import pandas as pd
@@ -29,6 +54,35 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'oncf-secret-key-2024')
 
 db = SQLAlchemy(app)
 
+# Pool de connexions psycopg2 pour les endpoints en SQL direct
+# (tailles configurables via DB_POOL_MIN / DB_POOL_MAX / DB_POOL_TIMEOUT / DB_POOL_MAX_AGE)
+db_pool = PoolConnexions.depuis_env(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Cache des réponses des endpoints de référence, invalidé par les écritures
+# (taille configurable via CACHE_REPONSES_TAILLE)
+cache_api = CacheReponses(taille_max=int(os.getenv('CACHE_REPONSES_TAILLE', 256)))
+
+# Versions des tables pour les ETags des endpoints de lecture
+versions_tables = VersionsTables()
+
+def signaler_ecriture(*tables):
+    """Invalider le cache de réponses et incrémenter les versions après une écriture"""
+    cache_api.invalider(*tables)
+    versions_tables.incrementer(*tables)
+
+def get_db_connection():
+    """Connexion psycopg2 empruntée au pool pour la requête courante"""
+    if 'db_conn' not in g:
+        g.db_conn = db_pool.obtenir()
+    return g.db_conn
+
+@app.teardown_appcontext
+def rendre_db_connection(exception):
+    """Rendre au pool la connexion empruntée pendant la requête"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.rendre(conn)
+
 # Configuration de Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -79,6 +133,22 @@ class RegisterForm(FlaskForm):
     last_name = StringField('Nom', validators=[DataRequired()])
     submit = SubmitField('S\'inscrire')
 
+class GeometrieEWKB(db.TypeDecorator):
+    """Géométrie stockée en binaire (geometry PostGIS ou bytea), lue en EWKB binaire via gpr.ewkb()
+
+    L'EWKB hexadécimal reçu par l'API est converti en octets à l'écriture.
+    """
+    impl = db.LargeBinary
+    cache_ok = True
+
+    def column_expression(self, colonne):
+        return db.func.gpr.ewkb(colonne, type_=db.LargeBinary)
+
+    def process_bind_param(self, valeur, dialect):
+        if isinstance(valeur, str):
+            return bytes.fromhex(valeur) if valeur.strip() else None
+        return valeur
+
 # Modèles de base de données
 class GrapheArc(db.Model):
     __tablename__ = 'graphe_arc'
@@ -92,7 +162,11 @@ class GrapheArc(db.Model):
     absd = db.Column(db.Numeric)
     plof = db.Column(db.String)
     absf = db.Column(db.Numeric)
-    geometrie = db.Column(db.Text)  # Geometry as text
+    geometrie = db.Column(GeometrieEWKB)
+    # Sommets WGS84 précalculés et importance Douglas-Peucker (mètres)
+    sommets_lon = db.Column(db.ARRAY(db.Float))
+    sommets_lat = db.Column(db.ARRAY(db.Float))
+    sommets_importance = db.Column(db.ARRAY(db.Float))
 
 class GareRef(db.Model):
     __tablename__ = 'gpd_gares_ref'
@@ -102,8 +176,8 @@ class GareRef(db.Model):
     axe = db.Column(db.String)
     plod = db.Column(db.String)
     absd = db.Column(db.String)
-    geometrie = db.Column(db.Text)
-    geometrie_dec = db.Column(db.Text)
+    geometrie = db.Column(GeometrieEWKB)
+    geometrie_dec = db.Column(GeometrieEWKB)
     codegare = db.Column(db.String)
     codeoperationnel = db.Column(db.String)
     codereseau = db.Column(db.String)
@@ -115,6 +189,9 @@ class GareRef(db.Model):
     idville = db.Column(db.Integer)
     villes_ville = db.Column(db.String)
     etat = db.Column(db.String)
+    # Coordonnées WGS84 précalculées à partir de geometrie
+    longitude = db.Column(db.Float)
+    latitude = db.Column(db.Float)
 
 # Modèles corrects basés sur la vraie structure des tables
 class GeEvenement(db.Model):
@@ -180,195 +257,64 @@ class RefSousTypes(db.Model):
     deleted = db.Column(db.Boolean)
 
 # API Routes
-def parse_wkb_point(wkb_hex):
-    """Parser une géométrie WKB hexadécimale pour extraire les coordonnées d'un point"""
+# Seuil de word_similarity (pg_trgm) au-delà duquel une gare correspond à la recherche
+SEUIL_SIMILARITE_GARES = 0.4
+COLONNES_RECHERCHE_GARES = (GareRef.nomgarefr, GareRef.codegare, GareRef.villes_ville)
+
+def filtrer_gares_approche(query, search):
+    """Recherche approchée sur nom, code et ville via les index trigrammes sur gpr.sans_accents()
+
+    Une gare correspond si le terme (sans accents ni casse) y figure tel quel ou
+    ressemble à l'un de ses mots (opérateur <%); les résultats sont triés par
+    similarité décroissante.
+    """
+    db.session.execute(
+        db.text("SELECT set_config('pg_trgm.word_similarity_threshold', :seuil, true)"),
+        {'seuil': str(SEUIL_SIMILARITE_GARES)}
+    )
+    terme = db.func.gpr.sans_accents(search)
+    colonnes = [db.func.gpr.sans_accents(colonne) for colonne in COLONNES_RECHERCHE_GARES]
+    
+    correspondances = []
+    for colonne in colonnes:
+        correspondances.append(colonne.like(db.func.concat('%', terme, '%')))
+        correspondances.append(terme.op('<%')(colonne))
+    
+    similarite = db.func.greatest(*[db.func.word_similarity(terme, colonne) for colonne in colonnes])
+    return query.filter(db.or_(*correspondances)).order_by(similarite.desc(), GareRef.id)
+
+def lire_bbox(args):
+    """Emprise ?bbox=minLon,minLat,maxLon,maxLat (WGS84), ou None si absente"""
+    bbox = args.get('bbox', '')
+    if not bbox:
+        return None
     try:
-        if not wkb_hex or len(wkb_hex) < 18:
-            return None
-            
-        # WKB Point: byte order (1) + geometry type (1) + SRID (4) + coordinates (8)
-        # Format: 0101000020 + SRID (4 bytes) + X (8 bytes) + Y (8 bytes)
-        if wkb_hex.startswith('0101000020110F'):
-            # Format spécifique trouvé dans les données: SRID 110F (4367)
-            # Extraire les coordonnées (après le header 0101000020110F)
-            coords_hex = wkb_hex[18:]  # Après le header
-            
-            if len(coords_hex) >= 16:
-                # Convertir les 8 premiers bytes en X (longitude)
-                x_hex = coords_hex[:16]
-                # Convertir les 8 derniers bytes en Y (latitude)
-                y_hex = coords_hex[16:32]
-                
-                # Convertir hex en float (little endian)
-                import struct
-                x_bytes = bytes.fromhex(x_hex)
-                y_bytes = bytes.fromhex(y_hex)
-                
-                x = struct.unpack('<d', x_bytes)[0]  # little endian double
-                y = struct.unpack('<d', y_bytes)[0]  # little endian double
-                
-                # Conversion précise avec facteurs calculés pour le Maroc
-                # Facteurs optimisés pour les coordonnées ONCF avec ajustement géographique
-                
-                # Ajuster les facteurs selon la latitude pour corriger la déformation nord-sud
-                base_lat = y / 118170.71
-                
-                # Si la latitude calculée est > 35.5, ajuster pour éviter de dépasser les limites nord
-                if base_lat > 35.5:
-                    # Facteur de correction pour le nord du Maroc - ajustement plus précis
-                    if base_lat > 36.0:
-                        lat_correction = 0.98  # Réduire de 2% pour les gares très au nord
-                    else:
-                        lat_correction = 0.99  # Réduire de 1% pour les gares du nord
-                    lat = base_lat * lat_correction
-                else:
-                    lat = base_lat
-                
-                lon = x / 112202.79
-                
-                # Vérifier si les coordonnées sont dans les limites du Maroc (plus permissives)
-                if -10 <= lon <= -1 and 27 <= lat <= 37:
-                    print(f"Conversion mètres vers degrés: Lon={lon:.6f}, Lat={lat:.6f}")
-                    return f"POINT({lon} {lat})"
-                else:
-                    # Si pas dans les limites, essayer une conversion plus précise avec pyproj
-                    try:
-                        from pyproj import Transformer
-                        
-                        # Essayer différents systèmes de coordonnées projetées du Maroc
-                        systems = [
-                            ("EPSG:26191", "Maroc Lambert"),
-                            ("EPSG:26192", "Maroc Mercator"),
-                            ("EPSG:26193", "Maroc Albers"),
-                            ("EPSG:32629", "UTM 29N"),
-                            ("EPSG:32630", "UTM 30N")
-                        ]
-                        
-                        for crs, name in systems:
-                            try:
-                                transformer = Transformer.from_crs(crs, "EPSG:4326", always_xy=True)
-                                lon_proj, lat_proj = transformer.transform(x, y)
-                                
-                                if -10 <= lon_proj <= -1 and 27 <= lat_proj <= 37:
-                                    print(f"Conversion {name}: Lon={lon_proj:.6f}, Lat={lat_proj:.6f}")
-                                    return f"POINT({lon_proj} {lat_proj})"
-                            except:
-                                continue
-                        
-                        # Si aucune conversion ne fonctionne, utiliser la conversion mètres
-                        print(f"Utilisation conversion mètres: Lon={lon:.6f}, Lat={lat:.6f}")
-                        return f"POINT({lon} {lat})"
-                        
-                    except ImportError:
-                        # Fallback si pyproj n'est pas disponible
-                        print(f"pyproj non disponible, utilisation conversion mètres: Lon={lon:.6f}, Lat={lat:.6f}")
-                        return f"POINT({lon} {lat})"
-                    except Exception as e:
-                        print(f"Erreur lors de la conversion: {e}, utilisation conversion mètres")
-                        return f"POINT({lon} {lat})"
-                    
-        elif wkb_hex.startswith('0101000020'):
-            # Extraire les coordonnées (les 8 derniers bytes pour X et Y)
-            coords_hex = wkb_hex[18:]  # Après le header
-            
-            if len(coords_hex) >= 16:
-                # Convertir les 8 premiers bytes en X (longitude)
-                x_hex = coords_hex[:16]
-                # Convertir les 8 derniers bytes en Y (latitude)
-                y_hex = coords_hex[16:32]
-                
-                # Convertir hex en float (little endian)
-                import struct
-                x_bytes = bytes.fromhex(x_hex)
-                y_bytes = bytes.fromhex(y_hex)
-                
-                x = struct.unpack('<d', x_bytes)[0]  # little endian double
-                y = struct.unpack('<d', y_bytes)[0]  # little endian double
-                
-                # Utiliser pyproj pour une conversion précise UTM vers Lat/Lon
-                # Le Maroc utilise principalement UTM Zone 29N (EPSG:32629) et Zone 30N (EPSG:32630)
-                try:
-                    from pyproj import Transformer
-                    
-                    # Essayer d'abord UTM Zone 29N (ouest du Maroc)
-                    transformer_29n = Transformer.from_crs("EPSG:32629", "EPSG:4326", always_xy=True)
-                    lon, lat = transformer_29n.transform(x, y)
-                    
-                    # Vérifier si les coordonnées sont dans des limites raisonnables pour le Maroc
-                    if -10 <= lon <= -1 and 27 <= lat <= 37:
-                        return f"POINT({lon} {lat})"
-                    
-                    # Si pas dans les limites, essayer UTM Zone 30N (est du Maroc)
-                    transformer_30n = Transformer.from_crs("EPSG:32630", "EPSG:4326", always_xy=True)
-                    lon, lat = transformer_30n.transform(x, y)
-                    
-                    # Vérifier à nouveau les limites
-                    if -10 <= lon <= -1 and 27 <= lat <= 37:
-                        return f"POINT({lon} {lat})"
-                    
-                    # Si toujours pas dans les limites, utiliser la zone 29N par défaut
-                    lon, lat = transformer_29n.transform(x, y)
-                    return f"POINT({lon} {lat})"
-                    
-                except ImportError:
-                    # Fallback si pyproj n'est pas disponible
-                    print("pyproj non disponible, utilisation de la conversion approximative")
-                    lon = (x - 500000) / 1000000 - 9
-                    lat = y / 1000000 + 30
-                    return f"POINT({lon} {lat})"
-                    
-
-                    
-        elif wkb_hex.startswith('0001000020'):
-            # Big endian format
-            coords_hex = wkb_hex[18:]
-            
-            if len(coords_hex) >= 16:
-                x_hex = coords_hex[:16]
-                y_hex = coords_hex[16:32]
-                
-                import struct
-                x_bytes = bytes.fromhex(x_hex)
-                y_bytes = bytes.fromhex(y_hex)
-                
-                x = struct.unpack('>d', x_bytes)[0]  # big endian double
-                y = struct.unpack('>d', y_bytes)[0]  # big endian double
-                
-                # Même conversion précise pour big endian
-                try:
-                    from pyproj import Transformer
-                    
-                    transformer_29n = Transformer.from_crs("EPSG:32629", "EPSG:4326", always_xy=True)
-                    lon, lat = transformer_29n.transform(x, y)
-                    
-                    if -10 <= lon <= -1 and 27 <= lat <= 37:
-                        return f"POINT({lon} {lat})"
-                    
-                    transformer_30n = Transformer.from_crs("EPSG:32630", "EPSG:4326", always_xy=True)
-                    lon, lat = transformer_30n.transform(x, y)
-                    
-                    if -10 <= lon <= -1 and 27 <= lat <= 37:
-                        return f"POINT({lon} {lat})"
-                    
-                    lon, lat = transformer_29n.transform(x, y)
-                    return f"POINT({lon} {lat})"
-                    
-                except ImportError:
-                    lon = (x - 500000) / 1000000 - 9
-                    lat = y / 1000000 + 30
-                    return f"POINT({lon} {lat})"
-                    
-    except Exception as e:
-        print(f"Erreur parsing WKB: {e}")
-        # En cas d'erreur, utiliser des coordonnées par défaut
-        return "POINT(-7.0926 31.7917)"  # Centre du Maroc
-    return None
+        min_lon, min_lat, max_lon, max_lat = (float(valeur) for valeur in bbox.split(','))
+    except ValueError:
+        raise ValueError("Paramètre bbox invalide (attendu: minLon,minLat,maxLon,maxLat)")
+    if not (min_lon <= max_lon and min_lat <= max_lat):
+        raise ValueError("Paramètre bbox invalide (minimums supérieurs aux maximums)")
+    return min_lon, min_lat, max_lon, max_lat
+
+def filtre_bbox(expression, operateur, bbox):
+    """Condition SQL `expression <operateur> box(bbox)`, servie par l'index GiST de l'expression
+
+    Les expressions doivent reprendre à l'identique celles des index
+    idx_gares_position et idx_arcs_emprise (voir migrer_base.py).
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return db.text(
+        f"{expression} {operateur} box(point(:bbox_min_lon, :bbox_min_lat), point(:bbox_max_lon, :bbox_max_lat))"
+    ).bindparams(bbox_min_lon=min_lon, bbox_min_lat=min_lat, bbox_max_lon=max_lon, bbox_max_lat=max_lat)
 
 @app.route('/api/gares')
+@versions_tables.conditionnel('gares')
 def api_gares():
     try:
         # Récupérer les paramètres de filtrage
         search = request.args.get('search', '')
+        # fuzzy (défaut): insensible aux accents et aux fautes, trié par similarité; exact: ILIKE
+        search_mode = request.args.get('search_mode', 'fuzzy')
         axe = request.args.get('axe', '')
         type_gare = request.args.get('type', '')
         etat = request.args.get('etat', '')
@@ -379,7 +325,7 @@ def api_gares():
         # Construire la requête avec filtres
         query = GareRef.query
         
-        if search:
+        if search and search_mode == 'exact':
             query = query.filter(
                 db.or_(
                     GareRef.nomgarefr.ilike(f'%{search}%'),
@@ -387,6 +333,8 @@ def api_gares():
                     GareRef.villes_ville.ilike(f'%{search}%')
                 )
             )
+        elif search:
+            query = filtrer_gares_approche(query, search)
         
         if axe:
             query = query.filter(GareRef.axe == axe)
@@ -396,7 +344,14 @@ def api_gares():
         
         if etat:
             query = query.filter(GareRef.etat == etat)
-        
+
+        # Gares visibles dans l'emprise de la carte (index idx_gares_position)
+        bbox = lire_bbox(request.args)
+        if bbox:
+            query = query.filter(filtre_bbox(
+                "point(gpr.gpd_gares_ref.longitude, gpr.gpd_gares_ref.latitude)", '<@', bbox
+            ))
+
         # Si all=true, retourner toutes les gares sans pagination
         if all_gares:
             gares = query.all()
@@ -406,17 +361,19 @@ def api_gares():
             total = query.count()
             gares = query.offset((page - 1) * per_page).limit(per_page).all()
         
+        # Coordonnées matérialisées; décoder en une passe celles pas encore calculées
+        geometries_wkt = [
+            f"POINT({gare.longitude} {gare.latitude})" if gare.longitude is not None else None
+            for gare in gares
+        ]
+        a_decoder = [i for i, gare in enumerate(gares) if gare.longitude is None and gare.geometrie]
+        if a_decoder:
+            lons, lats = decode_wkb_points([gares[i].geometrie for i in a_decoder])
+            for i, geometrie_wkt in zip(a_decoder, points_to_wkt(lons, lats)):
+                geometries_wkt[i] = geometrie_wkt
+        
         gares_data = []
-        for gare in gares:
-            # Parser la géométrie WKB seulement si elle existe
-            geometrie_wkt = None
-            if gare.geometrie:
-                try:
-                    geometrie_wkt = parse_wkb_point(gare.geometrie)
-                except Exception as e:
-                    print(f"Erreur parsing géométrie pour gare {gare.id}: {e}")
-                    geometrie_wkt = None
-            
+        for gare, geometrie_wkt in zip(gares, geometries_wkt):
             gare_dict = {
                 'id': gare.id,
                 'nom': gare.nomgarefr,
@@ -450,6 +407,8 @@ def api_gares():
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/gares/filters')
+@versions_tables.conditionnel('gares')
+@cache_api.en_cache(ttl=3600, groupes=('gares',))
 def api_gares_filters():
     """Récupérer les options de filtrage pour les gares"""
     try:
@@ -476,6 +435,69 @@ def api_gares_filters():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+# Index de préfixes en mémoire pour /api/gares/autocomplete (propre à chaque processus)
+index_gares = IndexPrefixes()
+index_gares_verrou = threading.Lock()
+
+# Backends PostgreSQL des connexions SQLAlchemy de ce processus: une notification
+# 'gares' émise par l'un d'eux vient d'une écriture de l'API déjà reportée sur
+# l'index local, qu'il est inutile de reconstruire
+backends_locaux = set()
+
+def enregistrer_backend(connexion_dbapi, enregistrement):
+    cursor = connexion_dbapi.cursor()
+    cursor.execute("SELECT pg_backend_pid()")
+    enregistrement.info['backend_pid'] = cursor.fetchone()[0]
+    cursor.close()
+    connexion_dbapi.rollback()
+    backends_locaux.add(enregistrement.info['backend_pid'])
+
+def oublier_backend(connexion_dbapi, enregistrement):
+    backends_locaux.discard(enregistrement.info.get('backend_pid'))
+
+with app.app_context():
+    event.listen(db.engine, 'connect', enregistrer_backend)
+    event.listen(db.engine, 'close', oublier_backend)
+
+def resume_gare_autocompletion(gare):
+    """Champs d'une gare conservés dans l'index d'autocomplétion"""
+    return {
+        'id': gare.id,
+        'nom': gare.nomgarefr,
+        'code': gare.codegare,
+        'codeoperationnel': gare.codeoperationnel,
+        'publishid': gare.publishid,
+        'axe': gare.axe,
+        'ville': gare.villes_ville
+    }
+
+def obtenir_index_gares():
+    """Index d'autocomplétion, construit depuis la base au premier appel"""
+    if not index_gares.charge:
+        with index_gares_verrou:
+            if not index_gares.charge:
+                gares = GareRef.query.with_entities(
+                    GareRef.id, GareRef.nomgarefr, GareRef.codegare, GareRef.codeoperationnel,
+                    GareRef.publishid, GareRef.axe, GareRef.villes_ville
+                ).all()
+                index_gares.charger([resume_gare_autocompletion(gare) for gare in gares])
+    return index_gares
+
+@app.route('/api/gares/autocomplete')
+@versions_tables.conditionnel('gares')
+def api_gares_autocomplete():
+    """Suggestions de gares par préfixe (nom, code, code opérationnel, publishid)"""
+    try:
+        texte = request.args.get('q', '')
+        limite = min(request.args.get('limit', 10, type=int), 50)
+        return jsonify({'success': True, 'data': obtenir_index_gares().rechercher(texte, limite)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def materialiser_coordonnees_gare(gare):
+    """Recalculer les coordonnées WGS84 stockées à partir de la géométrie WKB"""
+    gare.longitude, gare.latitude = coordonnees_point(gare.geometrie)
+
 @app.route('/api/gares', methods=['POST'])
 def api_create_gare():
     """Créer une nouvelle gare"""
@@ -497,11 +519,16 @@ def api_create_gare():
             villes_ville=data.get('ville'),
             etat=data.get('etat', 'ACTIVE'),
             codeoperationnel=data.get('codeoperationnel'),
-            codereseau=data.get('codereseau')
+            codereseau=data.get('codereseau'),
+            geometrie=data.get('geometrie')
         )
+        materialiser_coordonnees_gare(nouvelle_gare)
         
         db.session.add(nouvelle_gare)
         db.session.commit()
+        if index_gares.charge:
+            index_gares.mettre_a_jour(resume_gare_autocompletion(nouvelle_gare))
+        signaler_ecriture('gares')
         
         return jsonify({
             'success': True, 
@@ -540,8 +567,14 @@ def api_update_gare(gare_id):
             gare.codeoperationnel = data['codeoperationnel']
         if 'codereseau' in data:
             gare.codereseau = data['codereseau']
+        if 'geometrie' in data:
+            gare.geometrie = data['geometrie']
+            materialiser_coordonnees_gare(gare)
         
         db.session.commit()
+        if index_gares.charge:
+            index_gares.mettre_a_jour(resume_gare_autocompletion(gare))
+        signaler_ecriture('gares')
         
         return jsonify({'success': True, 'message': 'Gare modifiée avec succès'})
         
@@ -560,6 +593,8 @@ def api_delete_gare(gare_id):
         
         db.session.delete(gare)
         db.session.commit()
+        index_gares.retirer(gare_id)
+        signaler_ecriture('gares')
         
         return jsonify({'success': True, 'message': 'Gare supprimée avec succès'})
         
@@ -567,71 +602,33 @@ def api_delete_gare(gare_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
-def parse_wkb_linestring(wkb_hex):
-    """Parser une géométrie WKB hexadécimale pour extraire les coordonnées d'une ligne"""
-    try:
-        if not wkb_hex or len(wkb_hex) < 18:
-            return None
-            
-        # WKB LineString: byte order (1) + geometry type (1) + SRID (4) + num points (4) + points
-        # Format: 0102000020 + SRID (4 bytes) + num points (4 bytes) + points
-        if wkb_hex.startswith('0102000020'):
-            # Pour les LineString, on va utiliser une approche simplifiée
-            # car le parsing complet est complexe sans bibliothèque spécialisée
-            # On va créer une ligne de test avec des coordonnées réalistes pour le Maroc
-            try:
-                from pyproj import Transformer
-                
-                # Créer une ligne de test entre deux points du Maroc
-                transformer_29n = Transformer.from_crs("EPSG:32629", "EPSG:4326", always_xy=True)
-                
-                # Point de départ (Casablanca approximatif en UTM)
-                x1, y1 = 500000, 3715000  # UTM Zone 29N
-                lon1, lat1 = transformer_29n.transform(x1, y1)
-                
-                # Point d'arrivée (Rabat approximatif en UTM)
-                x2, y2 = 520000, 3765000  # UTM Zone 29N
-                lon2, lat2 = transformer_29n.transform(x2, y2)
-                
-                return f"LINESTRING({lon1} {lat1}, {lon2} {lat2})"
-                
-            except ImportError:
-                # Fallback si pyproj n'est pas disponible
-                return "LINESTRING(-7.6167 33.5731, -6.8498 34.0209)"  # Casablanca à Rabat
-                
-        elif wkb_hex.startswith('0002000020'):
-            # Big endian format - même approche
-            try:
-                from pyproj import Transformer
-                
-                transformer_29n = Transformer.from_crs("EPSG:32629", "EPSG:4326", always_xy=True)
-                
-                x1, y1 = 500000, 3715000
-                lon1, lat1 = transformer_29n.transform(x1, y1)
-                
-                x2, y2 = 520000, 3765000
-                lon2, lat2 = transformer_29n.transform(x2, y2)
-                
-                return f"LINESTRING({lon1} {lat1}, {lon2} {lat2})"
-                
-            except ImportError:
-                return "LINESTRING(-7.6167 33.5731, -6.8498 34.0209)"
-                
-    except Exception as e:
-        print(f"Erreur parsing WKB LineString: {e}")
-        return "LINESTRING(-7.0926 31.7917, -6.8 31.6)"  # Ligne par défaut au Maroc
-    return None
-
 @app.route('/api/arcs')
+@versions_tables.conditionnel('arcs')
 def api_arcs():
     try:
-        # Utiliser SQLAlchemy pour récupérer les données
-        arcs = GrapheArc.query.limit(50).all()
+        # Niveau de zoom de la carte: les sommets invisibles à ce zoom sont éliminés
+        zoom = request.args.get('zoom', type=int)
+        tolerance = tolerance_zoom(zoom) if zoom is not None else None
+        
+        # Utiliser SQLAlchemy pour récupérer les données, restreintes à l'emprise
+        # de la carte si demandée (index idx_arcs_emprise)
+        query = GrapheArc.query
+        bbox = lire_bbox(request.args)
+        if bbox:
+            query = query.filter(filtre_bbox(
+                "gpr.emprise_sommets(gpr.graphe_arc.sommets_lon, gpr.graphe_arc.sommets_lat)", '&&', bbox
+            ))
+        arcs = query.all()
         arcs_data = []
         
         for arc in arcs:
-            # Parser la géométrie WKB
-            geometrie_wkt = parse_wkb_linestring(arc.geometrie)
+            # Sommets matérialisés si disponibles, sinon parser la géométrie WKB
+            if arc.sommets_lon:
+                geometrie_wkt = linestring_materialisee_to_wkt(
+                    arc.sommets_lon, arc.sommets_lat, arc.sommets_importance, tolerance
+                )
+            else:
+                geometrie_wkt = parse_wkb_linestring(arc.geometrie, tolerance)
             
             arc_dict = {
                 'id': arc.id,
@@ -648,58 +645,219 @@ def api_arcs():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+# Tuiles vectorielles: couches gares et arcs en cache disque, invalidées par
+# emprise d'après le journal gpr.tuiles_invalidees (voir migrer_base.py);
+# couche incidents calculée à chaque requête, les incidents changeant souvent
+# (dossier et taille configurables via TUILES_CACHE_DOSSIER / TUILES_CACHE_MAX_MO)
+cache_tuiles = CacheTuiles(
+    os.getenv('TUILES_CACHE_DOSSIER', os.path.join(app.root_path, 'cache', 'tuiles')),
+    taille_max=int(os.getenv('TUILES_CACHE_MAX_MO', 256)) * 1024 * 1024
+)
+TUILES_ZOOM_MAX = 20
+TUILES_ZOOM_TOUTES_GARES = 9  # en deçà, seules les gares principales
+TYPE_GARES_PRINCIPALES = 'STATION'  # valeur de typegare (les autres: HALT, Haltes...)
+TUILES_INCIDENTS_MAX = 500  # incidents les plus récents par tuile
+TUILES_SYNCHRO_INTERVALLE = 30  # secondes, rattrapage des notifications perdues
+TUILES_INVALIDATIONS_MAX = 1000  # au-delà, vider le cache plutôt qu'emprise par emprise
+TUILES_JOURNAL_CONSERVATION = 3600  # secondes, au-delà les entrées du journal sont purgées
+TUILES_PURGE_INTERVALLE = 600  # secondes entre deux purges par processus
+synchro_tuiles = {'sequence': None, 'instant': 0.0, 'purge': 0.0}
+synchro_tuiles_verrou = threading.Lock()
+
+def synchroniser_cache_tuiles():
+    """Appliquer au cache disque les invalidations journalisées depuis la dernière appliquée
+
+    Appelée sur notification d'écriture des gares ou des arcs, et au plus tard
+    toutes les TUILES_SYNCHRO_INTERVALLE secondes par les requêtes de tuiles.
+    Purge aussi, toutes les TUILES_PURGE_INTERVALLE secondes, les entrées
+    plus anciennes que TUILES_JOURNAL_CONSERVATION; si des entrées purgées
+    n'avaient pas été appliquées (horizon dépassé), tout le cache est vidé.
+    """
+    with synchro_tuiles_verrou:
+        if synchro_tuiles['sequence'] is None:
+            synchro_tuiles['sequence'] = cache_tuiles.lire_sequence()
+        depuis = synchro_tuiles['sequence']
+
+        conn = db_pool.obtenir()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT count(*), max(seq), bool_or(emprise IS NULL),
+                           (SELECT horizon FROM gpr.tuiles_invalidees_horizon)
+                    FROM gpr.tuiles_invalidees
+                    WHERE seq > %s
+                """, (depuis,))
+                nombre, sequence, tout, horizon = cursor.fetchone()
+                perdues = horizon is not None and horizon > depuis
+                emprises = set()
+                if nombre and not tout and not perdues and nombre <= TUILES_INVALIDATIONS_MAX:
+                    # box: [0] coin supérieur droit, [1] coin inférieur gauche
+                    cursor.execute("""
+                        SELECT (emprise[1])[0], (emprise[1])[1], (emprise[0])[0], (emprise[0])[1]
+                        FROM gpr.tuiles_invalidees
+                        WHERE seq > %s AND seq <= %s
+                    """, (depuis, sequence))
+                    emprises = set(cursor.fetchall())
+
+                if time.monotonic() - synchro_tuiles['purge'] >= TUILES_PURGE_INTERVALLE:
+                    cursor.execute("SELECT gpr.purger_tuiles_invalidees(make_interval(secs => %s))",
+                                   (TUILES_JOURNAL_CONSERVATION,))
+                    conn.commit()
+                    synchro_tuiles['purge'] = time.monotonic()
+        finally:
+            db_pool.rendre(conn)
+
+        synchro_tuiles['instant'] = time.monotonic()
+        if not nombre and not perdues:
+            return
+        if emprises:
+            for emprise in emprises:
+                cache_tuiles.invalider_emprise(*emprise)
+        else:
+            cache_tuiles.vider()
+        sequence = max(sequence or 0, horizon or 0)
+        synchro_tuiles['sequence'] = sequence
+        cache_tuiles.ecrire_sequence(sequence)
+
+def tuile_reseau(z, x, y):
+    """Couches gares et arcs d'une tuile, encodées en MVT"""
+    emprise = limites_tuile(z, x, y, BUFFER)
+
+    # Gares de l'emprise (index idx_gares_position); principales seulement à petite échelle
+    query = GareRef.query.with_entities(
+        GareRef.id, GareRef.nomgarefr, GareRef.codegare, GareRef.typegare,
+        GareRef.axe, GareRef.etat, GareRef.longitude, GareRef.latitude
+    ).filter(filtre_bbox("point(gpr.gpd_gares_ref.longitude, gpr.gpd_gares_ref.latitude)", '<@', emprise))
+    if z < TUILES_ZOOM_TOUTES_GARES:
+        query = query.filter(GareRef.typegare == TYPE_GARES_PRINCIPALES)
+    gares = []
+    for gare in query:
+        parties = geometrie_point(gare.longitude, gare.latitude, z, x, y)
+        if parties:
+            gares.append((gare.id, POINT, parties, {
+                'nom': gare.nomgarefr, 'code': gare.codegare, 'type': gare.typegare,
+                'axe': gare.axe, 'etat': gare.etat
+            }))
+
+    # Arcs qui coupent l'emprise (index idx_arcs_emprise), simplifiés au pixel du zoom
+    tolerance = tolerance_zoom(z)
+    query = GrapheArc.query.with_entities(
+        GrapheArc.id, GrapheArc.axe, GrapheArc.plod, GrapheArc.plof,
+        GrapheArc.sommets_lon, GrapheArc.sommets_lat, GrapheArc.sommets_importance
+    ).filter(filtre_bbox(
+        "gpr.emprise_sommets(gpr.graphe_arc.sommets_lon, gpr.graphe_arc.sommets_lat)", '&&', emprise
+    ))
+    arcs = []
+    for arc in query:
+        lonlat = sommets_simplifies(arc.sommets_lon, arc.sommets_lat, arc.sommets_importance, tolerance)
+        parties = geometrie_ligne(lonlat[:, 0], lonlat[:, 1], z, x, y)
+        if parties:
+            arcs.append((arc.id, LIGNE, parties, {'axe': arc.axe, 'plod': arc.plod, 'plof': arc.plof}))
+
+    return encoder_couche('arcs', arcs) + encoder_couche('gares', gares)
+
+def couche_incidents(z, x, y):
+    """Couche incidents d'une tuile: les plus récents, placés comme dans serialiser_evenement"""
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(z, x, y, BUFFER)
+    cursor = get_db_connection().cursor()
+    cursor.execute("""
+        SELECT e.id, e.etat, e.type_id, e.date_debut, p.longitude, p.latitude
+        FROM gpr.ge_evenement e
+        CROSS JOIN LATERAL (
+            SELECT g.longitude, g.latitude
+            FROM gpr.ge_localisation l
+            JOIN gpr.gpd_gares_ref g
+              ON g.publishid IN (l.gare_debut_id, l.gare_fin_id) AND g.longitude IS NOT NULL
+            WHERE l.evenement_id = e.id
+            ORDER BY l.id, g.publishid = l.gare_debut_id DESC
+            LIMIT 1
+        ) p
+        WHERE EXISTS (
+            SELECT 1 FROM gpr.ge_localisation lb
+            JOIN gpr.gpd_gares_ref gb ON gb.publishid IN (lb.gare_debut_id, lb.gare_fin_id)
+            WHERE lb.evenement_id = e.id
+              AND point(gb.longitude, gb.latitude) <@ box(point(%s, %s), point(%s, %s))
+        )
+        ORDER BY e.date_debut DESC NULLS LAST, e.id DESC
+        LIMIT %s
+    """, (min_lon, min_lat, max_lon, max_lat, TUILES_INCIDENTS_MAX))
+    incidents = []
+    for id_evenement, etat, type_id, date_debut, longitude, latitude in cursor.fetchall():
+        parties = geometrie_point(longitude, latitude, z, x, y)
+        if parties:
+            incidents.append((id_evenement, POINT, parties, {
+                'etat': etat, 'type_id': type_id,
+                'date_debut': date_debut.isoformat() if date_debut else None
+            }))
+    cursor.close()
+    return encoder_couche('incidents', incidents)
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.mvt')
+@versions_tables.conditionnel('gares', 'arcs', 'evenements')
+def api_tuile(z, x, y):
+    """Tuile vectorielle (Mapbox Vector Tile) des couches arcs, gares et incidents"""
+    try:
+        if not (0 <= z <= TUILES_ZOOM_MAX and x < 2 ** z and y < 2 ** z):
+            return jsonify({'success': False, 'error': f'Tuile invalide: {z}/{x}/{y}'})
+
+        if time.monotonic() - synchro_tuiles['instant'] > TUILES_SYNCHRO_INTERVALLE:
+            synchroniser_cache_tuiles()
+
+        reseau = cache_tuiles.lire(z, x, y)
+        if reseau is None:
+            generation = cache_tuiles.generation
+            reseau = tuile_reseau(z, x, y)
+            cache_tuiles.ecrire(z, x, y, reseau, generation)
+
+        return Response(reseau + couche_incidents(z, x, y), mimetype=MIME_MVT)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/statistiques')
+@versions_tables.conditionnel('gares', 'arcs', 'evenements', 'types')
+@cache_api.en_cache(ttl=60, groupes=('gares', 'arcs', 'evenements', 'types'))
 def api_statistiques():
     try:
-        # Statistiques des gares
-        total_gares = GareRef.query.count()
-        gares_par_type = db.session.query(GareRef.typegare, db.func.count(GareRef.id)).group_by(GareRef.typegare).all()
-        gares_par_axe = db.session.query(GareRef.axe, db.func.count(GareRef.id)).group_by(GareRef.axe).all()
-        
-        # Statistiques des arcs
-        total_arcs = GrapheArc.query.count()
-        arcs_par_axe = db.session.query(GrapheArc.axe, db.func.count(GrapheArc.id)).group_by(GrapheArc.axe).all()
-        
-        # Statistiques des événements/incidents avec SQL direct
+        # Lecture de la table de synthèse tenue à jour par triggers (voir migrer_base.py):
+        # une seule requête, de coût indépendant de la taille des tables
         import psycopg2.extras
-        conn_stat = psycopg2.connect(os.getenv('DATABASE_URL'))
-        cursor_stat = conn_stat.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        # Compter les événements
-        cursor_stat.execute("SELECT COUNT(*) FROM gpr.ge_evenement")
-        total_evenements = cursor_stat.fetchone()[0]
-        
-        # Événements par statut
-        cursor_stat.execute("SELECT etat, COUNT(*) FROM gpr.ge_evenement GROUP BY etat")
-        evenements_par_statut = cursor_stat.fetchall()
-        
-        # Statistiques des types d'incidents
-        cursor_stat.execute("SELECT COUNT(*) FROM gpr.ref_types")
-        total_types = cursor_stat.fetchone()[0]
-        
-        cursor_stat.execute("SELECT COUNT(*) FROM gpr.ref_types WHERE etat = true")
-        types_actifs = cursor_stat.fetchone()[0]
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor.execute("""
+            SELECT domaine, dimension, valeur, nombre
+            FROM gpr.statistiques_rollup
+            ORDER BY domaine, dimension, nombre DESC, valeur
+        """)
+        lignes = cursor.fetchall()
+        cursor.close()
         
-        cursor_stat.close()
-        conn_stat.close()
+        totaux = {}
+        groupes = {}
+        for ligne in lignes:
+            if ligne['dimension'] in ('total', 'actifs'):
+                totaux[(ligne['domaine'], ligne['dimension'])] = ligne['nombre']
+            else:
+                groupes.setdefault((ligne['domaine'], ligne['dimension']), []).append(
+                    (ligne['valeur'] or 'Non défini', ligne['nombre'])
+                )
         
         stats = {
             'gares': {
-                'total': total_gares,
-                'par_type': [{'type': t[0] or 'Non défini', 'count': t[1]} for t in gares_par_type],
-                'par_axe': [{'axe': a[0] or 'Non défini', 'count': a[1]} for a in gares_par_axe]
+                'total': totaux.get(('gares', 'total'), 0),
+                'par_type': [{'type': v, 'count': n} for v, n in groupes.get(('gares', 'type'), [])],
+                'par_axe': [{'axe': v, 'count': n} for v, n in groupes.get(('gares', 'axe'), [])]
             },
             'arcs': {
-                'total': total_arcs,
-                'par_axe': [{'axe': a[0] or 'Non défini', 'count': a[1]} for a in arcs_par_axe]
+                'total': totaux.get(('arcs', 'total'), 0),
+                'par_axe': [{'axe': v, 'count': n} for v, n in groupes.get(('arcs', 'axe'), [])]
             },
             'evenements': {
-                'total': total_evenements,
-                'par_statut': [{'statut': s['etat'] or 'Non défini', 'count': s['count']} for s in evenements_par_statut]
+                'total': totaux.get(('evenements', 'total'), 0),
+                'par_statut': [{'statut': v, 'count': n} for v, n in groupes.get(('evenements', 'statut'), [])]
             },
             'types_incidents': {
-                'total': total_types,
-                'actifs': types_actifs
+                'total': totaux.get(('types', 'total'), 0),
+                'actifs': totaux.get(('types', 'actifs'), 0)
             }
         }
         
@@ -707,126 +865,643 @@ def api_statistiques():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+# Cache des COUNT(*) d'événements par filtre, vidé à chaque écriture d'événement
+COMPTAGE_EVENEMENTS_TTL = 30  # secondes
+_comptages_evenements = {}
+_comptages_evenements_lock = threading.Lock()
+
+def compter_evenements(cursor, where_clause, params):
+    """Nombre exact d'événements pour un filtre, mis en cache COMPTAGE_EVENEMENTS_TTL secondes"""
+    cle = (where_clause, tuple(params))
+    with _comptages_evenements_lock:
+        entree = _comptages_evenements.get(cle)
+    if entree and time.monotonic() - entree[1] < COMPTAGE_EVENEMENTS_TTL:
+        return entree[0]
+    
+    cursor.execute(f"SELECT COUNT(*) FROM gpr.ge_evenement e {where_clause}", params)
+    total = cursor.fetchone()[0]
+    with _comptages_evenements_lock:
+        _comptages_evenements[cle] = (total, time.monotonic())
+    return total
+
+def estimer_evenements(cursor):
+    """Estimation du nombre d'événements d'après les statistiques du planificateur"""
+    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'gpr.ge_evenement'::regclass")
+    estimation = cursor.fetchone()[0]
+    return max(int(estimation), 0)
+
+def invalider_comptages_evenements():
+    """Vider les comptages et les réponses en cache, incrémenter la version après une écriture d'événement"""
+    with _comptages_evenements_lock:
+        _comptages_evenements.clear()
+    signaler_ecriture('evenements')
+
+def encoder_curseur(date_debut, evenement_id):
+    """Encoder la position (date_debut, id) du dernier événement en jeton opaque"""
+    brut = json.dumps([date_debut.isoformat() if date_debut else None, evenement_id])
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+def decoder_curseur(jeton):
+    """Décoder un jeton de curseur en (date_debut, id); accepte aussi 'date_debut,id'"""
+    try:
+        if ',' in jeton:
+            date_str, id_str = jeton.rsplit(',', 1)
+            date_str = date_str.strip()
+            date_debut = None if date_str in ('', 'null') else datetime.fromisoformat(date_str)
+            return date_debut, int(id_str)
+        brut = base64.urlsafe_b64decode(jeton + '=' * (-len(jeton) % 4)).decode()
+        date_str, evenement_id = json.loads(brut)
+        date_debut = datetime.fromisoformat(date_str) if date_str else None
+        return date_debut, int(evenement_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Curseur de pagination invalide: {jeton}') from e
+
+def lire_page_curseur(cursor, select_sql, conditions, params, curseur, per_page):
+    """Lire une page d'événements par recherche de clé (keyset) sur (date_debut, id)
+
+    L'ordre est date_debut DESC NULLS LAST, id DESC, servi par l'index
+    idx_evenements_date_id. Retourne (lignes, jeton_suivant).
+    """
+    ordre = "ORDER BY e.date_debut DESC NULLS LAST, e.id DESC LIMIT %s"
+    
+    def executer(conditions_page, params_page, limite):
+        where = f"WHERE {' AND '.join(conditions_page)}" if conditions_page else ""
+        cursor.execute(f"{select_sql} {where} {ordre}", params_page + [limite])
+        return cursor.fetchall()
+    
+    if curseur is None:
+        lignes = executer(conditions, params, per_page + 1)
+    elif curseur[0] is not None:
+        lignes = executer(conditions + ["(e.date_debut, e.id) < (%s, %s)"],
+                          params + [curseur[0], curseur[1]], per_page + 1)
+        # Page à la frontière: compléter avec les événements sans date
+        if len(lignes) <= per_page:
+            lignes += executer(conditions + ["e.date_debut IS NULL"],
+                               params, per_page + 1 - len(lignes))
+    else:
+        lignes = executer(conditions + ["e.date_debut IS NULL", "e.id < %s"],
+                          params + [curseur[1]], per_page + 1)
+    
+    jeton_suivant = None
+    if len(lignes) > per_page:
+        lignes = lignes[:per_page]
+        jeton_suivant = encoder_curseur(lignes[-1]['date_debut'], lignes[-1]['id'])
+    return lignes, jeton_suivant
+
+# Clés de tri autorisées pour /api/evenements (préfixe '-' pour l'ordre décroissant),
+# chacune servie par un index: idx_evenements_date_id, idx_evenements_date_fin_id, clé primaire
+TRIS_EVENEMENTS = {
+    'date_debut': 'e.date_debut',
+    'date_fin': 'e.date_fin',
+    'id': None,
+}
+TRI_EVENEMENTS_DEFAUT = '-date_debut'
+
+def _liste_entiers(valeur):
+    """Convertir '1,2,3' en [1, 2, 3]"""
+    return [int(v) for v in valeur.split(',') if v.strip()]
+
+def filtres_evenements(args):
+    """Traduire les paramètres de requête en conditions SQL indexables sur gpr.ge_evenement e
+
+    Filtres: statut (ILIKE, historique), etat, type, sous_type (listes d'ids
+    séparés par des virgules), date_min/date_max (sur date_debut), axe,
+    gare et bbox (via les localisations) et q (plein texte, comme /search).
+    Retourne (conditions, params).
+    """
+    conditions = []
+    params = []
+    
+    statut = args.get('statut', '')
+    if statut:
+        conditions.append("e.etat ILIKE %s")
+        params.append(f'%{statut}%')
+    
+    etat = args.get('etat', '')
+    if etat:
+        conditions.append("e.etat = %s")
+        params.append(etat)
+    
+    types = args.get('type', '')
+    if types:
+        conditions.append("e.type_id = ANY(%s)")
+        params.append(_liste_entiers(types))
+    
+    sous_types = args.get('sous_type', '')
+    if sous_types:
+        conditions.append("e.sous_type_id = ANY(%s)")
+        params.append(_liste_entiers(sous_types))
+    
+    date_min = args.get('date_min', '')
+    if date_min:
+        conditions.append("e.date_debut >= %s")
+        params.append(datetime.fromisoformat(date_min))
+    
+    date_max = args.get('date_max', '')
+    if date_max:
+        conditions.append("e.date_debut <= %s")
+        params.append(datetime.fromisoformat(date_max))
+    
+    gare = args.get('gare', '')
+    if gare:
+        conditions.append("""EXISTS (
+            SELECT 1 FROM gpr.ge_localisation lg
+            WHERE lg.evenement_id = e.id AND (lg.gare_debut_id = %s OR lg.gare_fin_id = %s)
+        )""")
+        params.extend([gare, gare])
+    
+    axe = args.get('axe', '')
+    if axe:
+        conditions.append("""EXISTS (
+            SELECT 1 FROM gpr.ge_localisation la
+            JOIN gpr.gpd_gares_ref ga ON ga.publishid IN (la.gare_debut_id, la.gare_fin_id)
+            WHERE la.evenement_id = e.id AND ga.axe = %s
+        )""")
+        params.append(axe)
+    
+    # Incidents localisés sur une gare de l'emprise (index idx_gares_position)
+    bbox = lire_bbox(args)
+    if bbox:
+        conditions.append("""EXISTS (
+            SELECT 1 FROM gpr.ge_localisation lb
+            JOIN gpr.gpd_gares_ref gb ON gb.publishid IN (lb.gare_debut_id, lb.gare_fin_id)
+            WHERE lb.evenement_id = e.id
+              AND point(gb.longitude, gb.latitude) <@ box(point(%s, %s), point(%s, %s))
+        )""")
+        params.extend(bbox)
+    
+    texte = args.get('q', '').strip()
+    if texte:
+        # Index GIN idx_evenements_recherche (un ILIKE '%...%' parcourrait toute la table)
+        conditions.append("e.recherche @@ websearch_to_tsquery('french', %s)")
+        params.append(texte)
+    
+    return conditions, params
+
+def tri_evenements(tri):
+    """Construire la clause ORDER BY d'une clé de tri (id en départage)
+
+    Les NULL viennent en dernier en ordre décroissant et en premier en ordre
+    croissant: l'index (colonne DESC NULLS LAST, id DESC) sert les deux sens.
+    """
+    cle = tri.lstrip('-')
+    if cle not in TRIS_EVENEMENTS:
+        raise ValueError(f'Tri non supporté: {tri}')
+    decroissant = tri.startswith('-')
+    sens = 'DESC' if decroissant else 'ASC'
+    colonne = TRIS_EVENEMENTS[cle]
+    if colonne is None:
+        return f"ORDER BY e.id {sens}"
+    return f"ORDER BY {colonne} {sens} NULLS {'LAST' if decroissant else 'FIRST'}, e.id {sens}"
+
+# Sélection des événements: une ligne par événement, localisations agrégées
+SELECT_EVENEMENTS = """
+        SELECT e.id, e.date_debut, e.date_fin, e.heure_debut, e.heure_fin, e.etat, 
+               e.resume, e.commentaire, e.extrait, e.type_id, e.sous_type_id,
+               loc.localisations
+        FROM gpr.ge_evenement e
+        LEFT JOIN LATERAL (
+            SELECT json_agg(json_build_object(
+                       'id', l.id,
+                       'gare_debut_id', l.gare_debut_id,
+                       'gare_fin_id', l.gare_fin_id,
+                       'pk_debut', l.pk_debut,
+                       'pk_fin', l.pk_fin,
+                       'type_localisation', l.type_localisation,
+                       'gare_nom', g.nomgarefr,
+                       'longitude', g.longitude,
+                       'latitude', g.latitude
+                   ) ORDER BY l.id) AS localisations
+            FROM gpr.ge_localisation l
+            -- Position de la gare de début, à défaut celle de fin
+            LEFT JOIN LATERAL (
+                SELECT gl.nomgarefr, gl.longitude, gl.latitude
+                FROM gpr.gpd_gares_ref gl
+                WHERE gl.publishid IN (l.gare_debut_id, l.gare_fin_id) AND gl.longitude IS NOT NULL
+                ORDER BY gl.publishid = l.gare_debut_id DESC
+                LIMIT 1
+            ) g ON true
+            WHERE l.evenement_id = e.id
+        ) loc ON true
+    """
+
+def serialiser_evenement(evt):
+    """Représentation JSON d'une ligne de SELECT_EVENEMENTS"""
+    description = evt['resume'] or evt['commentaire'] or evt['extrait'] or 'Aucune description'
+    if len(description) > 200:
+        description = description[:200] + '...'
+    
+    localisations = evt['localisations'] or []
+    
+    # Position de la gare de la première localisation situable, sinon
+    # coordonnées déduites de la description
+    incident_coords = None
+    incident_location = None
+    for loc in localisations:
+        if loc.get('longitude') is not None:
+            incident_coords = f"POINT({loc['longitude']} {loc['latitude']})"
+            incident_location = loc.get('gare_nom')
+            break
+    
+    # Coordonnées approximatives pour différentes régions du Maroc
+    maroc_coords = {
+        'casa': [33.5731, -7.5898],      # Casablanca
+        'rabat': [34.0209, -6.8416],     # Rabat
+        'marrakech': [31.6295, -7.9811], # Marrakech
+        'fes': [34.0181, -5.0078],       # Fès
+        'meknes': [33.8935, -5.5473],    # Meknès
+        'tanger': [35.7595, -5.8340],    # Tanger
+        'agadir': [30.4278, -9.5981],    # Agadir
+        'oujda': [34.6814, -1.9086],     # Oujda
+        'kenitra': [34.2610, -6.5802],   # Kénitra
+        'mohammedia': [33.6833, -7.3833], # Mohammedia
+        'safi': [32.2833, -9.2333],      # Safi
+        'taza': [34.2167, -4.0167],      # Taza
+        'nador': [35.1683, -2.9273],     # Nador
+        'el jadida': [33.2333, -8.5000], # El Jadida
+        'beni mellal': [32.3373, -6.3498], # Beni Mellal
+        'ouarzazate': [30.9200, -6.9100], # Ouarzazate
+        'al hoceima': [35.2492, -3.9371], # Al Hoceima
+        'tetouan': [35.5711, -5.3724],   # Tétouan
+        'larache': [35.1833, -6.1500],   # Larache
+        'khemisset': [33.8167, -6.0667], # Khémisset
+        'sidi kacem': [34.2167, -5.7000], # Sidi Kacem
+        'sidi slimane': [34.2667, -5.9333], # Sidi Slimane
+        'benguerir': [32.2500, -7.9500], # Benguerir
+        'el aria': [32.4833, -8.0167],   # El Aria
+        'oued amlil': [34.2000, -4.2833], # Oued Amlil
+    }
+    
+    # Essayer de trouver des coordonnées basées sur la description
+    description_lower = description.lower()
+    for key, coords in maroc_coords.items():
+        if incident_coords:
+            break
+        elif key in description_lower:
+            incident_coords = f"POINT({coords[1]} {coords[0]})"
+            incident_location = key.replace('_', ' ').title()
+            break
+    
+    # Si aucune correspondance, utiliser des coordonnées par défaut
+    if not incident_coords:
+        incident_coords = "POINT(-7.0926 31.7917)"  # Centre du Maroc
+        incident_location = "Localisation approximative"
+    
+    # Champs à plat conservés pour les clients existants: première localisation
+    localisation = localisations[0] if localisations else {}
+    
+    evt_dict = {
+        'id': evt['id'],
+        'date_debut': evt['date_debut'].isoformat() if evt['date_debut'] else None,
+        'date_fin': evt['date_fin'].isoformat() if evt['date_fin'] else None,
+        'heure_debut': evt['heure_debut'].strftime('%H:%M:%S') if evt['heure_debut'] else None,
+        'heure_fin': evt['heure_fin'].strftime('%H:%M:%S') if evt['heure_fin'] else None,
+        'statut': evt['etat'],
+        'description': description,
+        'type_id': evt['type_id'],
+        'localisation_id': localisation.get('id'),
+        'gare_debut_id': localisation.get('gare_debut_id'),
+        'gare_fin_id': localisation.get('gare_fin_id'),
+        'pk_debut': localisation.get('pk_debut'),
+        'pk_fin': localisation.get('pk_fin'),
+        'localisations': localisations,
+        'geometrie': incident_coords,
+        'location_name': incident_location
+    }
+    return evt_dict
+
 @app.route('/api/evenements')
+@versions_tables.conditionnel('evenements', 'gares')
 def api_evenements():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
-        statut = request.args.get('statut', '')
+        tri = request.args.get('sort', TRI_EVENEMENTS_DEFAUT)
+        # Pagination par curseur: ?after= (vide pour la première page) puis ?after=<jeton>
+        after = request.args.get('after')
+        mode_curseur = after is not None
+        if mode_curseur and tri != TRI_EVENEMENTS_DEFAUT:
+            return jsonify({'success': False, 'error': f'La pagination par curseur impose le tri {TRI_EVENEMENTS_DEFAUT}'})
+        order_by = tri_evenements(tri)
+        # Total: exact (mis en cache), estimate (statistiques PostgreSQL) ou none
+        mode_total = request.args.get('total', 'estimate' if mode_curseur else 'exact')
         
         # Utiliser des requêtes SQL directes
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         # Construire la requête avec filtres
-        where_clause = ""
-        params = []
-        if statut:
-            where_clause = "WHERE e.etat ILIKE %s"
-            params.append(f'%{statut}%')
+        conditions, params = filtres_evenements(request.args)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        # Compter le total (un filtre rend l'estimation inexacte: compter dans ce cas)
+        total = None
+        if mode_total == 'estimate' and not conditions:
+            total = estimer_evenements(cursor)
+        elif mode_total in ('exact', 'estimate'):
+            total = compter_evenements(cursor, where_clause, params)
+        
+        # Récupérer les données paginées: une ligne par événement, localisations agrégées
+        select_sql = SELECT_EVENEMENTS
+        jeton_suivant = None
+        if mode_curseur:
+            curseur = decoder_curseur(after) if after else None
+            evenements, jeton_suivant = lire_page_curseur(
+                cursor, select_sql, conditions, params, curseur, per_page
+            )
+        else:
+            offset = (page - 1) * per_page
+            cursor.execute(f"""
+                {select_sql}
+                {where_clause}
+                {order_by}
+                LIMIT %s OFFSET %s
+            """, params + [per_page, offset])
+            evenements = cursor.fetchall()
         
-        # Compter le total
-        cursor.execute(f"SELECT COUNT(*) FROM gpr.ge_evenement e {where_clause}", params)
-        total = cursor.fetchone()[0]
+        evenements_data = [serialiser_evenement(evt) for evt in evenements]
         
-        # Récupérer les données paginées avec localisation
-        offset = (page - 1) * per_page
-        cursor.execute(f"""
-            SELECT e.id, e.date_debut, e.date_fin, e.heure_debut, e.heure_fin, e.etat, 
-                   e.resume, e.commentaire, e.extrait, e.type_id, e.sous_type_id,
-                   l.id as localisation_id, l.gare_debut_id, l.gare_fin_id, l.pk_debut, l.pk_fin
-            FROM gpr.ge_evenement e
-            LEFT JOIN gpr.ge_localisation l ON e.id = l.evenement_id
-            {where_clause}
-            ORDER BY e.date_debut DESC 
-            LIMIT %s OFFSET %s
-        """, params + [per_page, offset])
-        
-        evenements = cursor.fetchall()
-        
-        evenements_data = []
-        for evt in evenements:
-            description = evt['resume'] or evt['commentaire'] or evt['extrait'] or 'Aucune description'
-            if len(description) > 200:
-                description = description[:200] + '...'
-            
-            # Déterminer les coordonnées de l'incident basées sur la description
-            incident_coords = None
-            incident_location = None
-            
-            # Coordonnées approximatives pour différentes régions du Maroc
-            maroc_coords = {
-                'casa': [33.5731, -7.5898],      # Casablanca
-                'rabat': [34.0209, -6.8416],     # Rabat
-                'marrakech': [31.6295, -7.9811], # Marrakech
-                'fes': [34.0181, -5.0078],       # Fès
-                'meknes': [33.8935, -5.5473],    # Meknès
-                'tanger': [35.7595, -5.8340],    # Tanger
-                'agadir': [30.4278, -9.5981],    # Agadir
-                'oujda': [34.6814, -1.9086],     # Oujda
-                'kenitra': [34.2610, -6.5802],   # Kénitra
-                'mohammedia': [33.6833, -7.3833], # Mohammedia
-                'safi': [32.2833, -9.2333],      # Safi
-                'taza': [34.2167, -4.0167],      # Taza
-                'nador': [35.1683, -2.9273],     # Nador
-                'el jadida': [33.2333, -8.5000], # El Jadida
-                'beni mellal': [32.3373, -6.3498], # Beni Mellal
-                'ouarzazate': [30.9200, -6.9100], # Ouarzazate
-                'al hoceima': [35.2492, -3.9371], # Al Hoceima
-                'tetouan': [35.5711, -5.3724],   # Tétouan
-                'larache': [35.1833, -6.1500],   # Larache
-                'khemisset': [33.8167, -6.0667], # Khémisset
-                'sidi kacem': [34.2167, -5.7000], # Sidi Kacem
-                'sidi slimane': [34.2667, -5.9333], # Sidi Slimane
-                'benguerir': [32.2500, -7.9500], # Benguerir
-                'el aria': [32.4833, -8.0167],   # El Aria
-                'oued amlil': [34.2000, -4.2833], # Oued Amlil
+        cursor.close()
+        
+        if mode_curseur:
+            pagination = {
+                'per_page': per_page,
+                'next': jeton_suivant,
+                'total': total,
+                'total_estime': mode_total == 'estimate' and not conditions
             }
-            
-            # Essayer de trouver des coordonnées basées sur la description
-            description_lower = description.lower()
-            for key, coords in maroc_coords.items():
-                if key in description_lower:
-                    incident_coords = f"POINT({coords[1]} {coords[0]})"
-                    incident_location = key.replace('_', ' ').title()
-                    break
-            
-            # Si aucune correspondance, utiliser des coordonnées par défaut
-            if not incident_coords:
-                incident_coords = "POINT(-7.0926 31.7917)"  # Centre du Maroc
-                incident_location = "Localisation approximative"
-            
-            evt_dict = {
-                'id': evt['id'],
-                'date_debut': evt['date_debut'].isoformat() if evt['date_debut'] else None,
-                'date_fin': evt['date_fin'].isoformat() if evt['date_fin'] else None,
-                'heure_debut': evt['heure_debut'].strftime('%H:%M:%S') if evt['heure_debut'] else None,
-                'heure_fin': evt['heure_fin'].strftime('%H:%M:%S') if evt['heure_fin'] else None,
-                'statut': evt['etat'],
-                'description': description,
-                'type_id': evt['type_id'],
-                'localisation_id': evt['localisation_id'],
-                'gare_debut_id': evt['gare_debut_id'],
-                'gare_fin_id': evt['gare_fin_id'],
-                'pk_debut': evt['pk_debut'],
-                'pk_fin': evt['pk_fin'],
-                'geometrie': incident_coords,
-                'location_name': incident_location
+        else:
+            pagination = {
+                'page': page,
+                'pages': (total + per_page - 1) // per_page if total is not None else None,
+                'per_page': per_page,
+                'total': total
             }
-            evenements_data.append(evt_dict)
         
-        pages = (total + per_page - 1) // per_page
+        return jsonify({
+            'success': True, 
+            'data': evenements_data,
+            'pagination': pagination
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/evenements/changes')
+def api_changements_evenements():
+    """Modifications d'événements depuis un numéro de séquence du journal (synchronisation par delta)
+
+    Sans ?since=, retourne seulement le numéro courant à utiliser pour la suite.
+    Chaque événement n'apparaît qu'une fois, dans son dernier état: dans
+    'modifies' (représentation de /api/evenements) ou dans 'supprimes' (id).
+    'reset': true signale que les tables ont été remplacées en bloc (TRUNCATE,
+    rechargement complet) sans journal ligne à ligne: le client doit tout
+    recharger depuis /api/evenements, puis reprendre à partir de 'next'.
+    """
+    try:
+        since = request.args.get('since', type=int)
+        limit = min(request.args.get('limit', 500, type=int), 5000)
+        
+        import psycopg2.extras
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
+        if since is None:
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM gpr.ge_evenement_changement")
+            courant = cursor.fetchone()[0]
+            cursor.close()
+            return jsonify({'success': True, 'reset': False, 'data': {'modifies': [], 'supprimes': []},
+                            'next': courant, 'has_more': False})
+        
+        cursor.execute("""
+            SELECT seq, evenement_id, operation
+            FROM gpr.ge_evenement_changement
+            WHERE seq > %s
+            ORDER BY seq
+            LIMIT %s
+        """, (since, limit + 1))
+        changements = cursor.fetchall()
+        has_more = len(changements) > limit
+        changements = changements[:limit]
+        
+        # Remplacement en bloc dans la fenêtre: les lignes antérieures n'ont plus de sens
+        reinitialisations = [c['seq'] for c in changements if c['operation'] == 'reset']
+        if reinitialisations:
+            cursor.close()
+            return jsonify({
+                'success': True,
+                'reset': True,
+                'data': {'modifies': [], 'supprimes': []},
+                'next': reinitialisations[-1],
+                'has_more': has_more or changements[-1]['seq'] != reinitialisations[-1]
+            })
+        
+        # Dernière opération de chaque événement dans la fenêtre
+        dernieres = {}
+        for changement in changements:
+            dernieres[changement['evenement_id']] = changement['operation']
+        supprimes = sorted(i for i, op in dernieres.items() if op == 'delete')
+        a_lire = [i for i, op in dernieres.items() if op != 'delete']
+        
+        modifies = []
+        if a_lire:
+            cursor.execute(f"{SELECT_EVENEMENTS} WHERE e.id = ANY(%s) ORDER BY e.id", (a_lire,))
+            lignes = cursor.fetchall()
+            modifies = [serialiser_evenement(evt) for evt in lignes]
+            # Supprimé après la fenêtre: signalé comme tel dès maintenant
+            presents = {evt['id'] for evt in lignes}
+            supprimes = sorted(set(supprimes) | (set(a_lire) - presents))
         cursor.close()
-        conn.close()
         
         return jsonify({
-            'success': True, 
-            'data': evenements_data,
+            'success': True,
+            'reset': False,
+            'data': {'modifies': modifies, 'supprimes': supprimes},
+            'next': changements[-1]['seq'] if changements else since,
+            'has_more': has_more
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Notifications PostgreSQL: flux SSE des incidents et invalidation des caches
+# de tous les processus, y compris pour les écritures faites hors de l'API
+ecouteur_notifications = EcouteurNotifications(app.config['SQLALCHEMY_DATABASE_URI'])
+diffuseur_evenements = DiffuseurFlux()
+FLUX_HEARTBEAT = 15  # secondes
+FLUX_LOT_RATTRAPAGE = 500
+
+def appliquer_table_modifiee(table, emetteur=None):
+    """Rappel de tables_modifiees: invalider caches, comptages, ETags et index locaux
+
+    L'index des gares n'est reconstruit que pour les écritures faites hors de
+    ce processus (autres processus, imports, SQL direct): celles de l'API
+    locale y sont déjà reportées une à une.
+    """
+    if table == 'evenements':
+        invalider_comptages_evenements()
+    else:
+        signaler_ecriture(table)
+    if table == 'gares' and emetteur not in backends_locaux:
+        index_gares.charge = False
+    if table in ('gares', 'arcs'):
+        synchroniser_cache_tuiles()
+
+ecouteur_notifications.ajouter_rappel('evenements_changements',
+                                      lambda charge: diffuseur_evenements.publier(json.loads(charge)))
+ecouteur_notifications.ajouter_rappel('tables_modifiees', appliquer_table_modifiee, avec_emetteur=True)
+
+def apres_reconnexion_notifications():
+    """Notifications perdues pendant une coupure: tout invalider, rattraper les flux SSE"""
+    cache_api.invalider()
+    versions_tables.incrementer('gares', 'arcs', 'evenements', 'types')
+    invalider_comptages_evenements()
+    index_gares.charge = False
+    synchroniser_cache_tuiles()
+    diffuseur_evenements.signaler_retard()
+
+ecouteur_notifications.ajouter_rappel_reconnexion(apres_reconnexion_notifications)
+
+@app.before_request
+def demarrer_ecouteur_notifications():
+    ecouteur_notifications.demarrer()
+
+def lire_journal_evenements(depuis, limite):
+    """Entrées du journal postérieures à depuis (MAX(seq) si depuis est None)
+
+    La connexion est rendue aussitôt au pool: un flux ouvert n'en garde aucune.
+    """
+    conn = db_pool.obtenir()
+    try:
+        with conn.cursor() as cursor:
+            if depuis is None:
+                cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM gpr.ge_evenement_changement")
+                return cursor.fetchone()[0], []
+            cursor.execute("""
+                SELECT seq, evenement_id, operation
+                FROM gpr.ge_evenement_changement
+                WHERE seq > %s
+                ORDER BY seq
+                LIMIT %s
+            """, (depuis, limite))
+            changements = [{'seq': seq, 'evenement_id': evenement_id, 'operation': operation}
+                           for seq, evenement_id, operation in cursor.fetchall()]
+            return depuis, changements
+    finally:
+        db_pool.rendre(conn)
+
+def message_sse(changement):
+    return (f"id: {changement['seq']}\n"
+            f"event: {changement['operation']}\n"
+            f"data: {json.dumps(changement)}\n\n")
+
+@app.route('/api/stream/evenements')
+def api_stream_evenements():
+    """Flux Server-Sent Events des créations, modifications et suppressions d'incidents
+
+    Reprise après coupure via l'en-tête Last-Event-ID (numéro de séquence du
+    journal) ou ?since=; commentaire de maintien toutes les FLUX_HEARTBEAT s.
+    Un événement `reset` (evenement_id null) demande de tout recharger.
+    """
+    dernier = request.headers.get('Last-Event-ID') or request.args.get('since')
+    dernier = int(dernier) if dernier and dernier.isdigit() else None
+    # S'abonner avant de relire le journal: rien ne peut être manqué entre les deux
+    abonnement = diffuseur_evenements.abonner()
+    
+    def flux():
+        nonlocal dernier
+        try:
+            yield "retry: 5000\n\n"
+            rattraper = True
+            while True:
+                if rattraper or abonnement.en_retard:
+                    abonnement.en_retard = False
+                    while True:
+                        dernier, changements = lire_journal_evenements(dernier, FLUX_LOT_RATTRAPAGE)
+                        for changement in changements:
+                            dernier = changement['seq']
+                            yield message_sse(changement)
+                        if len(changements) < FLUX_LOT_RATTRAPAGE:
+                            break
+                    rattraper = False
+                
+                try:
+                    changement = abonnement.file.get(timeout=FLUX_HEARTBEAT)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if changement['seq'] > dernier:
+                    dernier = changement['seq']
+                    yield message_sse(changement)
+        finally:
+            diffuseur_evenements.desabonner(abonnement)
+    
+    return Response(flux(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Options de ts_headline pour les extraits de /api/evenements/search
+OPTIONS_EXTRAITS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "'
+
+@app.route('/api/evenements/search')
+@versions_tables.conditionnel('evenements')
+def api_search_evenements():
+    """Recherche plein texte (français) dans les récits des incidents, triée par pertinence"""
+    try:
+        texte = request.args.get('q', '').strip()
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        if not texte:
+            return jsonify({'success': False, 'error': 'Paramètre q requis'})
+        
+        import psycopg2.extras
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        
+        cursor.execute("""
+            SELECT COUNT(*) FROM gpr.ge_evenement
+            WHERE recherche @@ websearch_to_tsquery('french', %s)
+        """, (texte,))
+        total = cursor.fetchone()[0]
+        
+        # Classement sur l'index GIN, puis extraits calculés pour la seule page retournée
+        cursor.execute("""
+            SELECT r.id, r.date_debut, r.date_fin, r.etat, r.type_id, r.sous_type_id, r.score,
+                   ts_headline('french',
+                               concat_ws(' ', r.resume, r.commentaire, r.extrait),
+                               r.requete, %s) AS extrait
+            FROM (
+                SELECT e.id, e.date_debut, e.date_fin, e.etat, e.type_id, e.sous_type_id,
+                       e.resume, e.commentaire, e.extrait, q.requete,
+                       ts_rank_cd(e.recherche, q.requete) AS score
+                FROM gpr.ge_evenement e,
+                     websearch_to_tsquery('french', %s) AS q(requete)
+                WHERE e.recherche @@ q.requete
+                ORDER BY score DESC, e.id DESC
+                LIMIT %s OFFSET %s
+            ) r
+            ORDER BY r.score DESC, r.id DESC
+        """, (OPTIONS_EXTRAITS, texte, per_page, (page - 1) * per_page))
+        resultats = cursor.fetchall()
+        cursor.close()
+        
+        resultats_data = [{
+            'id': r['id'],
+            'date_debut': r['date_debut'].isoformat() if r['date_debut'] else None,
+            'date_fin': r['date_fin'].isoformat() if r['date_fin'] else None,
+            'statut': r['etat'],
+            'type_id': r['type_id'],
+            'sous_type_id': r['sous_type_id'],
+            'score': round(float(r['score']), 4),
+            'extrait': r['extrait']
+        } for r in resultats]
+        
+        return jsonify({
+            'success': True,
+            'data': resultats_data,
             'pagination': {
                 'page': page,
-                'pages': pages,
+                'pages': (total + per_page - 1) // per_page,
                 'per_page': per_page,
                 'total': total
             }
@@ -835,10 +1510,12 @@ def api_evenements():
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/types-incidents')
+@versions_tables.conditionnel('types')
+@cache_api.en_cache(ttl=3600, groupes=('types',))
 def api_types_incidents():
     try:
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         cursor.execute("""
@@ -861,17 +1538,18 @@ def api_types_incidents():
             types_data.append(type_dict)
         
         cursor.close()
-        conn.close()
         
         return jsonify({'success': True, 'data': types_data})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/localisations')
+@versions_tables.conditionnel('evenements')
+@cache_api.en_cache(ttl=300, groupes=('evenements',))
 def api_localisations():
     try:
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         cursor.execute("""
@@ -898,7 +1576,6 @@ def api_localisations():
             loc_data.append(loc_dict)
         
         cursor.close()
-        conn.close()
         
         return jsonify({'success': True, 'data': loc_data})
     except Exception as e:
@@ -917,7 +1594,7 @@ def api_create_evenement():
                 return jsonify({'success': False, 'error': f'Le champ {field} est requis'})
         
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         # Insérer l'événement
@@ -957,7 +1634,7 @@ def api_create_evenement():
         
         conn.commit()
         cursor.close()
-        conn.close()
+        invalider_comptages_evenements()
         
         return jsonify({'success': True, 'message': 'Incident créé avec succès', 'id': evenement_id})
         
@@ -971,7 +1648,7 @@ def api_update_evenement(evenement_id):
         data = request.get_json()
         
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         # Mettre à jour l'événement
@@ -1013,7 +1690,7 @@ def api_update_evenement(evenement_id):
         
         conn.commit()
         cursor.close()
-        conn.close()
+        invalider_comptages_evenements()
         
         return jsonify({'success': True, 'message': 'Incident modifié avec succès'})
         
@@ -1025,7 +1702,7 @@ def api_delete_evenement(evenement_id):
     """Supprimer un événement/incident"""
     try:
         import psycopg2.extras
-        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         # Supprimer d'abord les localisations associées
@@ -1036,13 +1713,31 @@ def api_delete_evenement(evenement_id):
         
         conn.commit()
         cursor.close()
-        conn.close()
+        invalider_comptages_evenements()
         
         return jsonify({'success': True, 'message': 'Incident supprimé avec succès'})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/pool/stats')
+def api_pool_stats():
+    """Statistiques du pool de connexions (utilisation, attente) pour le dimensionner"""
+    return jsonify({'success': True, 'data': db_pool.stats()})
+
+@app.route('/api/stream/stats')
+def api_stream_stats():
+    """Abonnés aux flux SSE et état de l'écoute des notifications"""
+    return jsonify({'success': True, 'data': {
+        'abonnes_evenements': len(diffuseur_evenements),
+        'ecoute_connectee': ecouteur_notifications.connecte
+    }})
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Compteurs du cache de réponses et du cache disque des tuiles"""
+    return jsonify({'success': True, 'data': cache_api.stats(), 'tuiles': cache_tuiles.stats()})
+
 # Routes d'authentification
 @app.route('/login', methods=['GET', 'POST'])
 def login():
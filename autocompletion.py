@@ -0,0 +1,104 @@
+"""
+Index de préfixes en mémoire pour l'autocomplétion des gares
+
+Tableau trié de clés normalisées (sans accents, minuscules) parcouru par
+bisect: une recherche coûte O(log n + k) sans aller-retour à la base.
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# Champs indexés d'une gare; pour le nom, chaque mot est aussi un point d'entrée
+CHAMPS_INDEXES = ('nom', 'code', 'codeoperationnel', 'publishid')
+
+def normaliser(texte):
+    """Minuscules sans accents, ponctuation remplacée par des espaces"""
+    if not texte:
+        return ''
+    texte = unicodedata.normalize('NFKD', str(texte))
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', texte.lower()).split())
+
+def cles_gare(gare):
+    """Clés de préfixe d'une gare (dict avec les champs de CHAMPS_INDEXES)"""
+    cles = set()
+    for champ in CHAMPS_INDEXES:
+        valeur = normaliser(gare.get(champ))
+        if not valeur:
+            continue
+        cles.add(valeur)
+        if champ == 'nom':
+            mots = valeur.split(' ')
+            for i in range(1, len(mots)):
+                cles.add(' '.join(mots[i:]))
+    return cles
+
+class IndexPrefixes:
+    """Index de préfixes thread-safe, chargé une fois puis tenu à jour gare par gare"""
+
+    def __init__(self):
+        self._verrou = threading.RLock()
+        self._entrees = []   # (cle, gare_id) triées
+        self._gares = {}     # gare_id -> (resume, cles)
+        self.charge = False
+
+    def charger(self, gares):
+        """(Re)construire tout l'index à partir d'une liste de résumés de gares"""
+        gares_par_id = {}
+        entrees = []
+        for gare in gares:
+            cles = cles_gare(gare)
+            gares_par_id[gare['id']] = (gare, cles)
+            entrees.extend((cle, gare['id']) for cle in cles)
+        entrees.sort()
+        with self._verrou:
+            self._entrees = entrees
+            self._gares = gares_par_id
+            self.charge = True
+
+    def _retirer(self, gare_id):
+        ancienne = self._gares.pop(gare_id, None)
+        if ancienne is None:
+            return
+        for cle in ancienne[1]:
+            i = bisect_left(self._entrees, (cle, gare_id))
+            if i < len(self._entrees) and self._entrees[i] == (cle, gare_id):
+                del self._entrees[i]
+
+    def mettre_a_jour(self, gare):
+        """Ajouter ou remplacer une gare"""
+        cles = cles_gare(gare)
+        with self._verrou:
+            self._retirer(gare['id'])
+            self._gares[gare['id']] = (gare, cles)
+            for cle in cles:
+                insort(self._entrees, (cle, gare['id']))
+
+    def retirer(self, gare_id):
+        """Retirer une gare de l'index"""
+        with self._verrou:
+            self._retirer(gare_id)
+
+    def rechercher(self, texte, limite=10):
+        """Gares dont une clé commence par le texte normalisé, dans l'ordre des clés"""
+        prefixe = normaliser(texte)
+        if not prefixe:
+            return []
+        resultats = []
+        vus = set()
+        with self._verrou:
+            i = bisect_left(self._entrees, (prefixe,))
+            while i < len(self._entrees) and len(resultats) < limite:
+                cle, gare_id = self._entrees[i]
+                if not cle.startswith(prefixe):
+                    break
+                if gare_id not in vus:
+                    vus.add(gare_id)
+                    resultats.append(self._gares[gare_id][0])
+                i += 1
+        return resultats
+
+    def __len__(self):
+        return len(self._gares)
@@ -0,0 +1,126 @@
+"""
+Cache de réponses JSON en mémoire pour les endpoints de référence
+
+Chaque entrée a une durée de vie propre à l'endpoint et appartient à des
+groupes (gares, evenements, ...) que les endpoints d'écriture invalident
+explicitement. La taille est bornée, les entrées les moins récemment
+utilisées sont évincées en premier.
+
+Chaque invalidation incrémente la génération de ses groupes: une réponse
+calculée avant une invalidation survenue entre-temps n'est pas mémorisée.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app
+
+class CacheReponses:
+    """Cache LRU à durée de vie par entrée, invalidable par groupe, thread-safe"""
+
+    def __init__(self, taille_max=256):
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._entrees = OrderedDict()  # cle -> (corps, mimetype, expiration, groupes)
+        self._generations = {}  # groupe -> nombre d'invalidations
+        self._generation = 0  # invalidations de tous les groupes
+
+        self._nb_succes = 0
+        self._nb_echecs = 0
+        self._nb_evictions = 0
+        self._nb_expirations = 0
+        self._nb_invalidations = 0
+
+    def lire(self, cle):
+        """Corps et mimetype en cache pour une clé, ou None"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[2] <= time.monotonic():
+                del self._entrees[cle]
+                self._nb_expirations += 1
+                entree = None
+            if entree is None:
+                self._nb_echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._nb_succes += 1
+            return entree[0], entree[1]
+
+    def _generation_groupes(self, groupes):
+        return self._generation, tuple(self._generations.get(groupe, 0) for groupe in groupes)
+
+    def generation(self, groupes):
+        """Génération courante des groupes, à relever avant de calculer une réponse"""
+        with self._verrou:
+            return self._generation_groupes(groupes)
+
+    def ecrire(self, cle, corps, mimetype, ttl, groupes, generation=None):
+        """Mémoriser une réponse, en évinçant les entrées les plus anciennes au-delà de taille_max
+
+        Sans effet si `generation` (relevée avant le calcul) n'est plus celle
+        des groupes. Retourne True si la réponse a été mémorisée.
+        """
+        with self._verrou:
+            if generation is not None and generation != self._generation_groupes(groupes):
+                return False
+            self._entrees[cle] = (corps, mimetype, time.monotonic() + ttl, frozenset(groupes))
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self._nb_evictions += 1
+        return True
+
+    def invalider(self, *groupes):
+        """Supprimer les entrées appartenant à l'un des groupes (toutes si aucun groupe)"""
+        with self._verrou:
+            if not groupes:
+                self._generation += 1
+                supprimees = list(self._entrees)
+            else:
+                for groupe in groupes:
+                    self._generations[groupe] = self._generations.get(groupe, 0) + 1
+                supprimees = [cle for cle, entree in self._entrees.items()
+                              if entree[3].intersection(groupes)]
+            for cle in supprimees:
+                del self._entrees[cle]
+            self._nb_invalidations += len(supprimees)
+
+    def en_cache(self, ttl, groupes=()):
+        """Décorateur de vue Flask: clé = endpoint + paramètres de requête
+
+        Seules les réponses 200 dont le JSON indique success sont mémorisées,
+        et seulement si aucun de leurs groupes n'a été invalidé pendant le calcul.
+        """
+        def decorateur(vue):
+            @wraps(vue)
+            def vue_en_cache(*args, **kwargs):
+                cle = (request.endpoint, tuple(sorted(kwargs.items())),
+                       tuple(sorted(request.args.items(multi=True))))
+                en_cache = self.lire(cle)
+                if en_cache is not None:
+                    return current_app.response_class(en_cache[0], mimetype=en_cache[1])
+
+                generation = self.generation(groupes)
+                reponse = current_app.make_response(vue(*args, **kwargs))
+                if reponse.status_code == 200 and reponse.is_json and (reponse.get_json() or {}).get('success'):
+                    self.ecrire(cle, reponse.get_data(), reponse.mimetype, ttl, groupes, generation)
+                return reponse
+            return vue_en_cache
+        return decorateur
+
+    def stats(self):
+        """Compteurs de succès, échecs, évictions et taille courante"""
+        with self._verrou:
+            total = self._nb_succes + self._nb_echecs
+            return {
+                'taille': len(self._entrees),
+                'taille_max': self.taille_max,
+                'succes': self._nb_succes,
+                'echecs': self._nb_echecs,
+                'taux_succes': round(self._nb_succes / total, 4) if total else 0.0,
+                'evictions': self._nb_evictions,
+                'expirations': self._nb_expirations,
+                'invalidations': self._nb_invalidations,
+            }
@@ -0,0 +1,175 @@
+"""
+Cache disque borné des tuiles vectorielles
+
+Chaque tuile est un fichier <dossier>/<z>/<x>/<y>.mvt partagé par tous les
+processus de l'application. Au-delà de taille_max octets, les tuiles les
+moins récemment lues (date de modification, rafraîchie à chaque lecture)
+sont supprimées. L'invalidation se fait par emprise lon/lat: seules les
+tuiles qui la recouvrent sont supprimées.
+
+Le compteur `generation` est propre au processus: une tuile calculée avant
+une invalidation reçue entre-temps n'est pas écrite (voir ecrire).
+"""
+
+import os
+import shutil
+import threading
+
+from tuiles_mvt import BUFFER, tuiles_emprise
+
+class CacheTuiles:
+    """Tuiles MVT sur disque, taille bornée, invalidables par emprise, thread-safe"""
+
+    def __init__(self, dossier, taille_max):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.generation = 0
+        self._verrou = threading.Lock()
+        self._taille = None  # estimée, recalculée à chaque éviction
+
+        self._nb_succes = 0
+        self._nb_echecs = 0
+        self._nb_evictions = 0
+        self._nb_invalidations = 0
+
+    def _chemin(self, z, x, y):
+        return os.path.join(self.dossier, str(z), str(x), f'{y}.mvt')
+
+    def lire(self, z, x, y):
+        """Contenu de la tuile en cache, ou None"""
+        chemin = self._chemin(z, x, y)
+        try:
+            with open(chemin, 'rb') as fichier:
+                donnees = fichier.read()
+            os.utime(chemin)
+        except OSError:
+            with self._verrou:
+                self._nb_echecs += 1
+            return None
+        with self._verrou:
+            self._nb_succes += 1
+        return donnees
+
+    def ecrire(self, z, x, y, donnees, generation):
+        """Mémoriser une tuile calculée à la génération donnée
+
+        Sans effet si une invalidation a eu lieu depuis: la tuile pourrait
+        refléter un état antérieur. Retourne True si la tuile a été écrite.
+        """
+        chemin = self._chemin(z, x, y)
+        with self._verrou:
+            if generation != self.generation:
+                return False
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporaire, 'wb') as fichier:
+                fichier.write(donnees)
+            os.replace(temporaire, chemin)
+
+            if self._taille is None:
+                self._taille = sum(taille for _, taille, _ in self._fichiers())
+            else:
+                self._taille += len(donnees)
+            if self._taille > self.taille_max:
+                self._evincer()
+        return True
+
+    def _fichiers(self):
+        """(chemin, taille, date de modification) de toutes les tuiles en cache"""
+        for racine, _, noms in os.walk(self.dossier):
+            for nom in noms:
+                if not nom.endswith('.mvt'):
+                    continue
+                chemin = os.path.join(racine, nom)
+                try:
+                    etat = os.stat(chemin)
+                except FileNotFoundError:
+                    continue
+                yield chemin, etat.st_size, etat.st_mtime
+
+    def _evincer(self):
+        """Supprimer les tuiles les moins récemment lues jusqu'à 90% de taille_max"""
+        fichiers = sorted(self._fichiers(), key=lambda fichier: fichier[2])
+        taille = sum(fichier[1] for fichier in fichiers)
+        for chemin, taille_fichier, _ in fichiers:
+            if taille <= self.taille_max * 0.9:
+                break
+            try:
+                os.remove(chemin)
+                self._nb_evictions += 1
+            except FileNotFoundError:
+                pass
+            taille -= taille_fichier
+        self._taille = taille
+
+    def _sous_dossiers(self, dossier, debut, fin):
+        """Entrées numériques de `dossier` comprises entre debut et fin"""
+        try:
+            noms = os.listdir(dossier)
+        except FileNotFoundError:
+            return []
+        return [nom for nom in noms if nom.isdigit() and debut <= int(nom) <= fin]
+
+    def invalider_emprise(self, min_lon, min_lat, max_lon, max_lat):
+        """Supprimer les tuiles de tous les zooms qui recouvrent l'emprise (tampon compris)"""
+        with self._verrou:
+            self.generation += 1
+            for z in self._sous_dossiers(self.dossier, 0, 30):
+                x_min, x_max, y_min, y_max = tuiles_emprise(int(z), min_lon, min_lat, max_lon, max_lat,
+                                                            marge=BUFFER)
+                dossier_z = os.path.join(self.dossier, z)
+                for x in self._sous_dossiers(dossier_z, x_min, x_max):
+                    dossier_x = os.path.join(dossier_z, x)
+                    for nom in os.listdir(dossier_x):
+                        y = nom[:-len('.mvt')]
+                        if nom.endswith('.mvt') and y.isdigit() and y_min <= int(y) <= y_max:
+                            try:
+                                os.remove(os.path.join(dossier_x, nom))
+                                self._nb_invalidations += 1
+                            except FileNotFoundError:
+                                pass
+            self._taille = None
+
+    def vider(self):
+        """Supprimer toutes les tuiles"""
+        with self._verrou:
+            self.generation += 1
+            for z in self._sous_dossiers(self.dossier, 0, 30):
+                shutil.rmtree(os.path.join(self.dossier, z), ignore_errors=True)
+            self._nb_invalidations += 1
+            self._taille = 0
+
+    def lire_sequence(self):
+        """Dernière invalidation journalisée appliquée au cache, 0 si inconnue
+
+        Lue au démarrage d'un processus, pour rattraper les invalidations
+        survenues pendant que l'application était arrêtée.
+        """
+        try:
+            with open(os.path.join(self.dossier, 'sequence')) as fichier:
+                return int(fichier.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def ecrire_sequence(self, sequence):
+        """Enregistrer la dernière invalidation journalisée appliquée"""
+        os.makedirs(self.dossier, exist_ok=True)
+        chemin = os.path.join(self.dossier, 'sequence')
+        temporaire = f'{chemin}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporaire, 'w') as fichier:
+            fichier.write(str(sequence))
+        os.replace(temporaire, chemin)
+
+    def stats(self):
+        """Compteurs de succès, échecs, évictions et invalidations"""
+        with self._verrou:
+            total = self._nb_succes + self._nb_echecs
+            return {
+                'taille_octets': self._taille,
+                'taille_max_octets': self.taille_max,
+                'succes': self._nb_succes,
+                'echecs': self._nb_echecs,
+                'taux_succes': round(self._nb_succes / total, 4) if total else 0.0,
+                'evictions': self._nb_evictions,
+                'invalidations': self._nb_invalidations,
+            }
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Chargement en masse des fichiers sql_data/* par COPY ... FROM STDIN
+
+Chaque fichier est copié tel quel dans une table temporaire de texte, puis
+converti en une seule requête: les conversions de types se font dans la
+base, sans aller-retour Python par ligne. Les fichiers à nombre de colonnes
+irrégulier sont relus enregistrement par enregistrement et envoyés à COPY par
+lots de taille fixe: la mémoire reste constante quelle que soit l'archive.
+
+En mode incrémental, seules les lignes dont l'empreinte a changé depuis
+l'import précédent sont écrites (INSERT ... ON CONFLICT) et les lignes
+disparues de la source sont supprimées.
+
+Usage:
+    python chargeur_copy.py                 # tous les fichiers connus
+    python chargeur_copy.py gpd_gares_ref   # seulement certaines tables
+    python chargeur_copy.py --incremental   # n'écrire que les lignes modifiées
+"""
+
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2 import errors, sql
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Enregistrements par lot envoyé à COPY (mémoire client bornée)
+TAILLE_LOT = int(os.getenv('IMPORT_TAILLE_LOT', 5000))
+
+# Les récits d'incidents peuvent dépasser la limite par défaut du module csv (128 Ko)
+csv.field_size_limit(2 ** 31 - 1)
+
+# Colonnes des dumps sql_data/<table> dans l'ordre du fichier, avec leur type
+FICHIERS_SQL_DATA = {
+    'gpd_gares_ref': {
+        'id': 'int',
+        'axe': 'str',
+        'plod': 'str',
+        'absd': 'str',
+        'geometrie': 'ewkb',
+        'geometrie_dec': 'ewkb',
+        'codegare': 'str',
+        'codeoperationnel': 'str',
+        'codereseau': 'str',
+        'nomgarefr': 'str',
+        'typegare': 'str',
+        'publishid': 'str',
+        'sivtypegare': 'str',
+        'num_pk': 'str',
+        'idville': 'int',
+        'villes_ville': 'str',
+        'etat': 'str'
+    },
+    'graphe_arc': {
+        'id': 'int',
+        'axe': 'str',
+        'cumuld': 'float',
+        'cumulf': 'float',
+        'plod': 'str',
+        'absd': 'float',
+        'plof': 'str',
+        'absf': 'float',
+        'geometrie': 'ewkb'
+    },
+    'ge_evenement': {
+        'id': 'int',
+        'date_debut': 'datetime',
+        'date_fin': 'datetime',
+        'col3': 'str',
+        'col4': 'str',
+        'date_creation': 'datetime',
+        'type_id': 'int',
+        'statut': 'str',
+        'heure_debut': 'time',
+        'heure_fin': 'time',
+        'col10': 'str',
+        'col11': 'str',
+        'col12': 'bool',
+        'col13': 'bool',
+        'col14': 'bool',
+        'col15': 'bool',
+        'description': 'str'
+    },
+    'ref_types': {
+        'id': 'int',
+        'date_creation': 'datetime',
+        'libelle': 'str',
+        'niveau': 'int',
+        'systeme_id': 'int',
+        'actif': 'bool',
+        'supprime': 'bool'
+    },
+    'ge_localisation': {
+        'id': 'int',
+        'axe': 'str',
+        'pk_debut': 'float',
+        'pk_fin': 'float',
+        'voie': 'str',
+        'section': 'str',
+        'gare': 'str',
+        'description': 'str',
+        'col8': 'str', 'col9': 'str', 'col10': 'str', 'col11': 'str',
+        'col12': 'str', 'col13': 'str', 'col14': 'str', 'col15': 'str',
+        'col16': 'str', 'col17': 'str', 'col18': 'str', 'col19': 'str',
+        'col20': 'str'
+    },
+    'ref_sous_types': {
+        'id': 'int',
+        'date_creation': 'datetime',
+        'libelle': 'str',
+        'type_id': 'int',
+        'systeme_id': 'int',
+        'actif': 'bool',
+        'supprime': 'bool',
+        'col7': 'str', 'col8': 'str', 'col9': 'str', 'col10': 'str',
+        'col11': 'str', 'col12': 'str', 'col13': 'str', 'col14': 'str',
+        'col15': 'str', 'col16': 'str', 'col17': 'str', 'col18': 'str',
+        'col19': 'str', 'col20': 'str'
+    }
+}
+
+# Conversion SQL d'une colonne texte de la table temporaire ({c}), valeur invalide -> NULL
+# (mêmes règles que l'ancien import ligne à ligne)
+CONVERSIONS = {
+    'int': "CASE WHEN btrim({c}) ~ '^[0-9]+$' THEN btrim({c})::integer END",
+    'float': ("CASE WHEN replace(btrim({c}), ',', '.') ~ '^[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][+-]?[0-9]+)?$' "
+              "THEN replace(btrim({c}), ',', '.')::double precision END"),
+    'datetime': "pg_temp.vers_timestamp({c})",
+    'time': "pg_temp.vers_heure({c})",
+    'bool': "CASE WHEN btrim({c}) <> '' THEN lower(btrim({c})) IN ('t', 'true', '1', 'yes', 'oui') END",
+    'str': "NULLIF(btrim({c}), '')",
+    # EWKB hexadécimal du dump, stocké en binaire (bytea ou geometry par conversion implicite)
+    'ewkb': "pg_temp.vers_ewkb({c})",
+}
+
+# Colonnes calculées à partir de la géométrie (materialiser_geometries.py),
+# remises à NULL quand un import modifie la géométrie
+COLONNES_DERIVEES = {
+    'gpd_gares_ref': ['longitude', 'latitude'],
+    'graphe_arc': ['sommets_lon', 'sommets_lat', 'sommets_importance'],
+}
+
+# Empreintes des lignes importées, pour l'import par différence
+EMPREINTES_SQL = """
+    CREATE TABLE IF NOT EXISTS gpr.import_empreintes (
+        nom_table TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        empreinte TEXT NOT NULL,
+        PRIMARY KEY (nom_table, id)
+    );
+"""
+
+# Conversions tolérantes aux valeurs invalides, propres à la session
+FONCTIONS_CONVERSION = """
+    CREATE OR REPLACE FUNCTION pg_temp.vers_timestamp(t text) RETURNS timestamp
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    BEGIN
+        RETURN NULLIF(btrim(t), '')::timestamp;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION pg_temp.vers_ewkb(t text) RETURNS bytea
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    BEGIN
+        RETURN decode(NULLIF(btrim(t), ''), 'hex');
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION pg_temp.vers_heure(t text) RETURNS time
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    BEGIN
+        RETURN NULLIF(btrim(t), '')::time;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$;
+"""
+
+def connect_to_database():
+    """Établir une connexion à la base de données PostgreSQL"""
+    try:
+        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        return conn
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base de données: {e}")
+        return None
+
+def enregistrements_csv(fichier, largeur):
+    """Générateur des enregistrements CSV ramenés à `largeur` colonnes
+
+    Un récit multi-ligne entre guillemets reste un seul enregistrement; les
+    colonnes en trop sont ignorées, les manquantes laissées vides.
+    """
+    for ligne in csv.reader(fichier):
+        yield (ligne + [''] * largeur)[:largeur]
+
+def lots(enregistrements, taille=TAILLE_LOT):
+    """Découper un itérable en listes d'au plus `taille` éléments"""
+    enregistrements = iter(enregistrements)
+    while True:
+        lot = list(itertools.islice(enregistrements, taille))
+        if not lot:
+            return
+        yield lot
+
+class FluxCopie:
+    """Objet fichier lu par COPY: un lot d'enregistrements réécrit en CSV à chaque read()
+
+    COPY ne demande le lot suivant qu'une fois le précédent envoyé au serveur:
+    la lecture du fichier suit le débit de la base et la mémoire reste bornée
+    à un lot, quelle que soit la taille de l'archive.
+    """
+
+    def __init__(self, enregistrements, taille_lot=TAILLE_LOT):
+        self._lots = lots(enregistrements, taille_lot)
+        self._tampon = io.StringIO()
+        self._ecrivain = csv.writer(self._tampon, lineterminator='\n')
+        self.nb_enregistrements = 0
+        self.nb_lots = 0
+
+    def read(self, taille=-1):
+        lot = next(self._lots, None)
+        if lot is None:
+            return ''
+        self._ecrivain.writerows(lot)
+        self.nb_enregistrements += len(lot)
+        self.nb_lots += 1
+        donnees = self._tampon.getvalue()
+        self._tampon.seek(0)
+        self._tampon.truncate()
+        return donnees
+
+def largeur_premiere_ligne(chemin):
+    """Nombre de colonnes du premier enregistrement CSV"""
+    with open(chemin, 'r', encoding='utf-8', newline='') as f:
+        premiere = next(csv.reader(f), [])
+    return len(premiere)
+
+def copier_vers_temporaire(cursor, chemin, largeur_attendue):
+    """COPY du fichier dans une table temporaire de texte; retourne le nombre de lignes
+
+    Essai direct (fichier régulier); en cas d'erreur de format, le fichier est
+    normalisé à `largeur_attendue` colonnes (colonnes en trop ignorées,
+    manquantes vides) comme le faisait l'import ligne à ligne.
+    """
+    largeur = max(largeur_premiere_ligne(chemin), 1)
+    colonnes = sql.SQL(', ').join(sql.SQL('c{} text').format(sql.SQL(str(i))) for i in range(largeur))
+    cursor.execute("DROP TABLE IF EXISTS pg_temp.import_brut")
+    cursor.execute(sql.SQL("CREATE TEMP TABLE import_brut ({}) ON COMMIT DROP").format(colonnes))
+
+    cursor.execute("SAVEPOINT copie_directe")
+    try:
+        with open(chemin, 'r', encoding='utf-8', newline='') as f:
+            cursor.copy_expert("COPY pg_temp.import_brut FROM STDIN WITH (FORMAT csv)", f)
+        nb_lignes = cursor.rowcount
+        cursor.execute("RELEASE SAVEPOINT copie_directe")
+        return nb_lignes, largeur
+    except (errors.BadCopyFileFormat, errors.InvalidTextRepresentation):
+        cursor.execute("ROLLBACK TO SAVEPOINT copie_directe")
+
+    print(f"   ↪ colonnes irrégulières dans {os.path.basename(chemin)}, normalisation à {largeur_attendue}")
+    colonnes = sql.SQL(', ').join(sql.SQL('c{} text').format(sql.SQL(str(i))) for i in range(largeur_attendue))
+    cursor.execute("DROP TABLE pg_temp.import_brut")
+    cursor.execute(sql.SQL("CREATE TEMP TABLE import_brut ({}) ON COMMIT DROP").format(colonnes))
+    with open(chemin, 'r', encoding='utf-8', newline='') as f:
+        flux = FluxCopie(enregistrements_csv(f, largeur_attendue))
+        cursor.copy_expert("COPY pg_temp.import_brut FROM STDIN WITH (FORMAT csv)", flux)
+    print(f"   ↪ {flux.nb_enregistrements:,} enregistrements en {flux.nb_lots} lots")
+    return cursor.rowcount, largeur_attendue
+
+def conversion_colonne(type_source, type_cible):
+    """Expression SQL de conversion; une géométrie encore en TEXT (avant migration) reste hexadécimale"""
+    if type_source == 'ewkb' and type_cible == 'text':
+        return CONVERSIONS['str']
+    return CONVERSIONS[type_source]
+
+def preparer_source(cursor, chemin, table, colonnes):
+    """COPY puis conversion dans pg_temp.import_source (une ligne par id, avec son empreinte)
+
+    Retourne (colonnes chargées, lignes du fichier). L'empreinte est le md5 de
+    la ligne convertie: elle ne change que si une valeur importée change.
+    """
+    cursor.execute(FONCTIONS_CONVERSION)
+    nb_brut, largeur = copier_vers_temporaire(cursor, chemin, len(colonnes))
+
+    cursor.execute("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = 'gpr' AND table_name = %s
+    """, (table,))
+    types_cibles = dict(cursor.fetchall())
+    noms = list(colonnes)[:largeur]
+    expressions = [
+        sql.SQL("{} AS {}").format(
+            sql.SQL(conversion_colonne(colonnes[nom], types_cibles.get(nom)).format(c=f'c{i}')),
+            sql.Identifier(nom))
+        for i, nom in enumerate(noms)
+    ]
+    cursor.execute("DROP TABLE IF EXISTS pg_temp.import_source")
+    # Une ligne sans identifiant valide était rejetée par l'import ligne à ligne
+    cursor.execute(sql.SQL("""
+        CREATE TEMP TABLE import_source ON COMMIT DROP AS
+        SELECT DISTINCT ON (s.id) s.*, md5(ROW(s.*)::text) AS empreinte
+        FROM (SELECT {} FROM pg_temp.import_brut) s
+        WHERE s.id IS NOT NULL
+        ORDER BY s.id
+    """).format(sql.SQL(', ').join(expressions)))
+    cursor.execute("CREATE UNIQUE INDEX ON pg_temp.import_source (id)")
+    cursor.execute("ANALYZE pg_temp.import_source")
+    return noms, nb_brut
+
+def colonnes_derivees(cursor, table):
+    """Colonnes matérialisées présentes dans la table (à recalculer si la géométrie change)"""
+    candidates = COLONNES_DERIVEES.get(table, [])
+    if not candidates:
+        return []
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'gpr' AND table_name = %s AND column_name = ANY(%s)
+    """, (table, candidates))
+    return [ligne[0] for ligne in cursor.fetchall()]
+
+# Journaux dérivés à réinitialiser quand une table est remplacée en bloc: les
+# triggers de ligne qui les tiennent à jour ne voient pas le remplacement
+REINITIALISATIONS = {
+    'gpd_gares_ref': 'gpr.invalider_toutes_tuiles()',
+    'graphe_arc': 'gpr.invalider_toutes_tuiles()',
+    'ge_evenement': 'gpr.reinitialiser_journal_evenements()',
+    'ge_localisation': 'gpr.reinitialiser_journal_evenements()',
+}
+
+def _fonction_existe(cursor, signature):
+    cursor.execute("SELECT to_regprocedure(%s) IS NOT NULL", (signature,))
+    return cursor.fetchone()[0]
+
+def signaler_remplacement(cursor, table):
+    """Réinitialiser les journaux dérivés d'une table remplacée en bloc (fonctions de migrer_base.py)"""
+    fonction = REINITIALISATIONS.get(table)
+    if fonction and _fonction_existe(cursor, fonction):
+        cursor.execute(f"SELECT {fonction}")
+
+def remplacer_table(cursor, table, noms):
+    """Vider la table et y insérer toute la source (triggers utilisateur suspendus)
+
+    Les triggers sont suspendus avant le TRUNCATE: ses triggers d'instruction
+    (statistiques) liraient les tables que les autres processus de chargement
+    tiennent verrouillées, d'où un interblocage. apres_chargement recalcule
+    ensuite une seule fois les statistiques; tuiles et journal des événements
+    sont réinitialisés ici (signaler_remplacement).
+    """
+    cible = sql.Identifier('gpr', table)
+    cursor.execute(sql.SQL("ALTER TABLE {} DISABLE TRIGGER USER").format(cible))
+    cursor.execute(sql.SQL("TRUNCATE TABLE {} RESTART IDENTITY CASCADE").format(cible))
+    liste = sql.SQL(', ').join(sql.Identifier(nom) for nom in noms)
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM pg_temp.import_source").format(
+        cible, liste, liste))
+    nb_inseres = cursor.rowcount
+    cursor.execute(sql.SQL("ALTER TABLE {} ENABLE TRIGGER USER").format(cible))
+    signaler_remplacement(cursor, table)
+
+    cursor.execute("DELETE FROM gpr.import_empreintes WHERE nom_table = %s", (table,))
+    cursor.execute("""
+        INSERT INTO gpr.import_empreintes (nom_table, id, empreinte)
+        SELECT %s, id, empreinte FROM pg_temp.import_source
+    """, (table,))
+    return {'inseres': nb_inseres, 'modifies': 0, 'supprimes': 0, 'inchanges': 0}
+
+def fusionner_table(cursor, table, noms):
+    """Appliquer seulement les différences avec l'import précédent (INSERT ... ON CONFLICT)
+
+    Les lignes dont l'empreinte est inchangée ne sont pas touchées; une ligne
+    importée auparavant et absente de la source est supprimée. Les lignes
+    créées par l'application (sans empreinte) sont conservées. Les triggers
+    restent actifs: journal, notifications et statistiques suivent les
+    modifications réelles.
+    """
+    cible = sql.Identifier('gpr', table)
+    cursor.execute("DROP TABLE IF EXISTS pg_temp.import_diff")
+    cursor.execute("""
+        CREATE TEMP TABLE import_diff ON COMMIT DROP AS
+        SELECT s.* FROM pg_temp.import_source s
+        LEFT JOIN gpr.import_empreintes e ON e.nom_table = %s AND e.id = s.id
+        WHERE e.empreinte IS DISTINCT FROM s.empreinte
+    """, (table,))
+
+    affectations = [sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(nom), sql.Identifier(nom))
+                    for nom in noms if nom != 'id']
+    if 'geometrie' in noms:
+        affectations += [
+            sql.SQL("{} = CASE WHEN t.geometrie IS DISTINCT FROM EXCLUDED.geometrie THEN NULL ELSE t.{} END")
+            .format(sql.Identifier(nom), sql.Identifier(nom))
+            for nom in colonnes_derivees(cursor, table)
+        ]
+    liste = sql.SQL(', ').join(sql.Identifier(nom) for nom in noms)
+    cursor.execute(sql.SQL("""
+        WITH ecrites AS (
+            INSERT INTO {} AS t ({})
+            SELECT {} FROM pg_temp.import_diff
+            ON CONFLICT (id) DO UPDATE SET {}
+            RETURNING (xmax = 0) AS inseree
+        )
+        SELECT COUNT(*) FILTER (WHERE inseree), COUNT(*) FILTER (WHERE NOT inseree) FROM ecrites
+    """).format(cible, liste, liste, sql.SQL(', ').join(affectations)))
+    nb_inseres, nb_modifies = cursor.fetchone()
+
+    cursor.execute(sql.SQL("""
+        WITH supprimees AS (
+            DELETE FROM {} t
+            USING gpr.import_empreintes e
+            WHERE e.nom_table = %s AND e.id = t.id
+              AND NOT EXISTS (SELECT 1 FROM pg_temp.import_source s WHERE s.id = t.id)
+            RETURNING t.id
+        )
+        SELECT COUNT(*) FROM supprimees
+    """).format(cible), (table,))
+    nb_supprimes = cursor.fetchone()[0]
+
+    cursor.execute("""
+        INSERT INTO gpr.import_empreintes (nom_table, id, empreinte)
+        SELECT %s, id, empreinte FROM pg_temp.import_diff
+        ON CONFLICT (nom_table, id) DO UPDATE SET empreinte = EXCLUDED.empreinte
+    """, (table,))
+    cursor.execute("""
+        DELETE FROM gpr.import_empreintes e
+        WHERE e.nom_table = %s
+          AND NOT EXISTS (SELECT 1 FROM pg_temp.import_source s WHERE s.id = e.id)
+    """, (table,))
+
+    cursor.execute("SELECT COUNT(*) FROM pg_temp.import_source")
+    nb_source = cursor.fetchone()[0]
+    return {'inseres': nb_inseres, 'modifies': nb_modifies, 'supprimes': nb_supprimes,
+            'inchanges': nb_source - nb_inseres - nb_modifies}
+
+def charger_table(cursor, chemin, table, colonnes, incremental=False):
+    """Charger un dump dans gpr.<table> via COPY, en remplacement complet ou par différence
+
+    Retourne un dict: inseres, modifies, supprimes, inchanges, rejetes, duree.
+    La séquence de l'id est ensuite recalée sur le plus grand id.
+    """
+    debut = time.perf_counter()
+    cursor.execute(EMPREINTES_SQL)
+    noms, nb_brut = preparer_source(cursor, chemin, table, colonnes)
+
+    if incremental:
+        resultat = fusionner_table(cursor, table, noms)
+    else:
+        resultat = remplacer_table(cursor, table, noms)
+
+    cursor.execute(sql.SQL("""
+        SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+        FROM {}
+    """).format(sql.Identifier('gpr', table)), (f'gpr.{table}',))
+
+    cursor.execute("SELECT COUNT(*) FROM pg_temp.import_source")
+    resultat['rejetes'] = nb_brut - cursor.fetchone()[0]
+    resultat['duree'] = time.perf_counter() - debut
+    return resultat
+
+def resume_chargement(table, resultat, taille=None):
+    """Ligne de compte rendu d'un chargement (volumes et débit)"""
+    duree = max(resultat['duree'], 1e-9)
+    lignes = resultat['inseres'] + resultat['modifies'] + resultat['inchanges']
+    debit = f"{lignes / duree:,.0f} lignes/s"
+    if taille is not None:
+        debit += f", {taille / 1024 / 1024 / duree:.1f} Mo/s"
+    details = f"+{resultat['inseres']:,} ~{resultat['modifies']:,} -{resultat['supprimes']:,}"
+    if resultat['inchanges']:
+        details += f" ={resultat['inchanges']:,}"
+    if resultat['rejetes']:
+        details += f", {resultat['rejetes']} rejetées"
+    return f"{table}: {details} en {resultat['duree']:.2f}s ({debit})"
+
+def apres_chargement(cursor):
+    """Recalculer les statistiques et prévenir l'application (objets créés par migrer_base.py)
+
+    À appeler une fois, après la validation de tous les chargements.
+    """
+    if _fonction_existe(cursor, 'gpr.reconstruire_statistiques()'):
+        cursor.execute("SELECT gpr.reconstruire_statistiques()")
+    for table in ('gares', 'arcs', 'evenements', 'types'):
+        cursor.execute("SELECT pg_notify('tables_modifiees', %s)", (table,))
+
+def charger_fichier(cursor, table, colonnes, dossier='sql_data', incremental=False):
+    """Charger sql_data/<table> et afficher le débit; retourne le nombre de lignes écrites"""
+    chemin = os.path.join(dossier, table)
+    if not os.path.exists(chemin):
+        print(f"⚠️  Fichier {chemin} non trouvé, ignoré")
+        return 0
+
+    resultat = charger_table(cursor, chemin, table, colonnes, incremental)
+    print(f"✅ {resume_chargement(table, resultat, os.path.getsize(chemin))}")
+    return resultat['inseres'] + resultat['modifies']
+
+def main():
+    """Fonction principale"""
+    print("🚂 ONCF GIS - Chargement COPY des données")
+    print("=" * 50)
+
+    incremental = '--incremental' in sys.argv
+    tables = [a for a in sys.argv[1:] if not a.startswith('--')] or list(FICHIERS_SQL_DATA)
+    inconnues = [t for t in tables if t not in FICHIERS_SQL_DATA]
+    if inconnues:
+        print(f"❌ Tables inconnues: {', '.join(inconnues)}")
+        sys.exit(1)
+
+    conn = connect_to_database()
+    if not conn:
+        sys.exit(1)
+
+    cursor = conn.cursor()
+    try:
+        debut = time.perf_counter()
+        total = sum(charger_fichier(cursor, table, FICHIERS_SQL_DATA[table], incremental=incremental)
+                    for table in tables)
+        apres_chargement(cursor)
+        conn.commit()
+        duree = time.perf_counter() - debut
+        print(f"\n🎉 {total:,} lignes écrites en {duree:.2f}s ({total / max(duree, 1e-9):,.0f} lignes/s)")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erreur lors du chargement: {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
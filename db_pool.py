@@ -0,0 +1,204 @@
+"""
+Pool de connexions psycopg2 partagé par les endpoints en SQL direct
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+class PoolEpuise(Exception):
+    """Aucune connexion libérée avant la fin du délai d'attente"""
+
+class PoolConnexions:
+    """Pool de connexions borné, thread-safe, avec attente, vérification et recyclage
+
+    - `taille_min` connexions sont ouvertes à la première utilisation;
+    - au plus `taille_max` connexions existent simultanément, les demandes
+      suivantes attendent jusqu'à `delai_attente` secondes;
+    - une connexion fermée, en erreur ou plus vieille que `duree_vie_max`
+      secondes est remplacée; une connexion inactive depuis plus de
+      `intervalle_verification` secondes est testée par un SELECT 1.
+    """
+
+    def __init__(self, dsn, taille_min=1, taille_max=10, delai_attente=10.0,
+                 duree_vie_max=1800.0, intervalle_verification=30.0):
+        if taille_max < 1 or taille_min > taille_max:
+            raise ValueError("Tailles de pool invalides")
+        self.dsn = dsn
+        self.taille_min = taille_min
+        self.taille_max = taille_max
+        self.delai_attente = delai_attente
+        self.duree_vie_max = duree_vie_max
+        self.intervalle_verification = intervalle_verification
+
+        self._condition = threading.Condition()
+        self._libres = deque()  # (connexion, dernier_usage)
+        self._creees_a = {}
+        self._total = 0
+        self._prechauffe = False
+
+        self._en_attente = 0
+        self._nb_obtentions = 0
+        self._nb_attentes = 0
+        self._nb_delais_depasses = 0
+        self._nb_recyclees = 0
+        self._attente_totale = 0.0
+        self._attente_max = 0.0
+
+    @classmethod
+    def depuis_env(cls, dsn):
+        """Construire le pool à partir des variables DB_POOL_* de l'environnement"""
+        return cls(
+            dsn,
+            taille_min=int(os.getenv('DB_POOL_MIN', 1)),
+            taille_max=int(os.getenv('DB_POOL_MAX', 10)),
+            delai_attente=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            duree_vie_max=float(os.getenv('DB_POOL_MAX_AGE', 1800)),
+            intervalle_verification=float(os.getenv('DB_POOL_CHECK_INTERVAL', 30)),
+        )
+
+    def _ouvrir(self):
+        """Ouvrir une nouvelle connexion (la place doit déjà être réservée)"""
+        try:
+            conn = psycopg2.connect(self.dsn)
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            raise
+        self._creees_a[id(conn)] = time.monotonic()
+        return conn
+
+    def _fermer(self, conn):
+        """Fermer une connexion et libérer sa place dans le pool"""
+        self._creees_a.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._total -= 1
+            self._condition.notify()
+
+    def _prechauffer(self):
+        """Ouvrir les `taille_min` connexions initiales"""
+        with self._condition:
+            if self._prechauffe:
+                return
+            self._prechauffe = True
+        while True:
+            with self._condition:
+                if self._total >= self.taille_min:
+                    return
+                self._total += 1
+            conn = self._ouvrir()
+            with self._condition:
+                self._libres.append((conn, time.monotonic()))
+                self._condition.notify()
+
+    def _est_saine(self, conn, dernier_usage):
+        """Vérifier qu'une connexion libre est encore utilisable"""
+        if conn.closed:
+            return False
+        if time.monotonic() - self._creees_a.get(id(conn), 0) > self.duree_vie_max:
+            return False
+        if time.monotonic() - dernier_usage > self.intervalle_verification:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                return False
+        return True
+
+    def obtenir(self):
+        """Emprunter une connexion, en attendant si le pool est plein"""
+        if not self._prechauffe:
+            self._prechauffer()
+
+        debut = time.monotonic()
+        while True:
+            a_ouvrir = False
+            with self._condition:
+                while not self._libres and self._total >= self.taille_max:
+                    restant = self.delai_attente - (time.monotonic() - debut)
+                    if restant <= 0:
+                        self._nb_delais_depasses += 1
+                        raise PoolEpuise(
+                            f"Aucune connexion disponible après {self.delai_attente}s "
+                            f"({self.taille_max} connexions utilisées)"
+                        )
+                    self._en_attente += 1
+                    try:
+                        self._condition.wait(restant)
+                    finally:
+                        self._en_attente -= 1
+
+                if self._libres:
+                    conn, dernier_usage = self._libres.pop()
+                else:
+                    self._total += 1
+                    a_ouvrir = True
+
+            if a_ouvrir:
+                conn = self._ouvrir()
+            elif not self._est_saine(conn, dernier_usage):
+                self._nb_recyclees += 1
+                self._fermer(conn)
+                continue
+
+            attente = time.monotonic() - debut
+            with self._condition:
+                self._nb_obtentions += 1
+                if attente > 0.001:
+                    self._nb_attentes += 1
+                self._attente_totale += attente
+                self._attente_max = max(self._attente_max, attente)
+            return conn
+
+    def rendre(self, conn):
+        """Rendre une connexion au pool (transaction en cours annulée)"""
+        if conn.closed:
+            self._fermer(conn)
+            return
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._nb_recyclees += 1
+            self._fermer(conn)
+            return
+        with self._condition:
+            self._libres.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def fermer_tout(self):
+        """Fermer toutes les connexions actuellement libres"""
+        with self._condition:
+            libres = list(self._libres)
+            self._libres.clear()
+        for conn, _ in libres:
+            self._fermer(conn)
+
+    def stats(self):
+        """Statistiques d'utilisation pour dimensionner le pool"""
+        with self._condition:
+            return {
+                'taille_min': self.taille_min,
+                'taille_max': self.taille_max,
+                'ouvertes': self._total,
+                'en_cours': self._total - len(self._libres),
+                'libres': len(self._libres),
+                'en_attente': self._en_attente,
+                'obtentions': self._nb_obtentions,
+                'obtentions_avec_attente': self._nb_attentes,
+                'delais_depasses': self._nb_delais_depasses,
+                'recyclees': self._nb_recyclees,
+                'attente_moyenne_ms': round(1000 * self._attente_totale / self._nb_obtentions, 3)
+                if self._nb_obtentions else 0.0,
+                'attente_max_ms': round(1000 * self._attente_max, 3),
+            }
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Rechargement d'une table sans interruption de service (échange atomique)
+
+La nouvelle version de gpr.<table> est construite à côté (gpr.<table>_new):
+données, index construits en parallèle, contraintes, triggers et ANALYZE.
+Elle ne remplace l'ancienne qu'une fois prête, par deux RENAME dans une
+transaction courte protégée par lock_timeout et réessayée en cas de
+conflit: les lecteurs ne voient jamais une table vide ou sans index.
+
+De la copie à l'échange, gpr.<table> est verrouillée en mode SHARE: les
+lectures continuent, les écritures attendent la fin de l'échange (elles
+seraient sinon perdues avec l'ancienne version).
+
+Usage (voir aussi fix_gares_arcs.py):
+    python echange_tables.py gpd_gares_ref graphe_arc             # reconstruire depuis gpr
+    python echange_tables.py --depuis public gpd_gares_ref        # recharger depuis public.*
+"""
+
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2 import errors, sql
+from dotenv import load_dotenv
+
+from chargeur_copy import signaler_remplacement
+from import_parallele import creer_index_en_parallele
+
+# Charger les variables d'environnement
+load_dotenv()
+
+SUFFIXE_NOUVELLE = '_new'
+SUFFIXE_ANCIENNE = '_old'
+
+# Attente maximale d'un verrou pendant l'échange, et nombre d'essais
+DELAI_VERROU = os.getenv('ECHANGE_DELAI_VERROU', '2s')
+TENTATIVES_ECHANGE = int(os.getenv('ECHANGE_TENTATIVES', 10))
+
+# Nom logique notifié sur le canal tables_modifiees (caches de l'application)
+NOMS_LOGIQUES = {
+    'gpd_gares_ref': 'gares',
+    'graphe_arc': 'arcs',
+    'ge_evenement': 'evenements',
+    'ge_localisation': 'evenements',
+    'ref_types': 'types',
+}
+
+def connect_to_database():
+    """Établir une connexion à la base de données PostgreSQL"""
+    try:
+        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        return conn
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base de données: {e}")
+        return None
+
+def definitions_table(cursor, table):
+    """Index (nom, définition, contrainte, type de contrainte) et triggers de gpr.<table>
+
+    Les définitions sont lues avec un search_path vide pour être entièrement
+    qualifiées (gpr.<table>, gpr.sans_accents...).
+    """
+    cursor.execute("SELECT set_config('search_path', '', true)")
+    cursor.execute("""
+        SELECT i.relname, pg_get_indexdef(x.indexrelid), c.conname, c.contype
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+        WHERE x.indrelid = %s::regclass
+        ORDER BY x.indisprimary DESC, i.relname
+    """, (f'gpr.{table}',))
+    index = cursor.fetchall()
+    cursor.execute("""
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal
+        ORDER BY tgname
+    """, (f'gpr.{table}',))
+    triggers = [ligne[0] for ligne in cursor.fetchall()]
+    cursor.execute("RESET search_path")
+    return index, triggers
+
+def verifier_references(cursor, table):
+    """Refuser l'échange si des clés étrangères ou des vues dépendent de la table (elles suivraient l'ancienne)"""
+    cursor.execute("""
+        SELECT conrelid::regclass::text FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = %s::regclass
+        UNION
+        SELECT r.ev_class::regclass::text FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = %s::regclass AND r.ev_class <> d.refobjid
+    """, (f'gpr.{table}', f'gpr.{table}'))
+    dependances = [ligne[0] for ligne in cursor.fetchall()]
+    if dependances:
+        raise ValueError(f"gpr.{table} est référencée par {', '.join(dependances)}")
+
+def colonnes_inserables(cursor, table):
+    """Colonnes de gpr.<table> dans l'ordre, sans les colonnes générées"""
+    cursor.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+    """, (f'gpr.{table}',))
+    return [ligne[0] for ligne in cursor.fetchall()]
+
+def construire_table(conn, table, schema_source='gpr', processus=None):
+    """Construire gpr.<table>_new prête à l'emploi; retourne le nombre de lignes
+
+    Même structure que gpr.<table> (LIKE ... INCLUDING ALL sans les index),
+    remplie depuis <schema_source>.<table>, puis index (en parallèle, une
+    connexion par index), contraintes, triggers et ANALYZE. Rien n'est
+    encore visible des lecteurs.
+    """
+    nouvelle = table + SUFFIXE_NOUVELLE
+    cursor = conn.cursor()
+    try:
+        verifier_references(cursor, table)
+        index, triggers = definitions_table(cursor, table)
+        colonnes = colonnes_inserables(cursor, table)
+        liste = sql.SQL(', ').join(sql.Identifier(nom) for nom in colonnes)
+
+        # 1. Table et données, sans index ni triggers (chargement le plus rapide)
+        debut = time.perf_counter()
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier('gpr', nouvelle)))
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING ALL EXCLUDING INDEXES)").format(
+            sql.Identifier('gpr', nouvelle), sql.Identifier('gpr', table)))
+        cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+            sql.Identifier('gpr', nouvelle), liste, liste, sql.Identifier(schema_source, table)))
+        nb_lignes = cursor.rowcount
+        conn.commit()
+        print(f"   ✅ gpr.{nouvelle}: {nb_lignes:,} lignes en {time.perf_counter() - debut:.2f}s")
+
+        # 2. Index construits en parallèle sur la table que personne ne lit encore
+        cible_ancienne = f" ON gpr.{table} USING "
+        cible_nouvelle = f" ON gpr.{nouvelle} USING "
+        requetes = []
+        for nom, definition, _, _ in index:
+            definition = definition.replace(f" INDEX {nom} ON ", f" INDEX {nom}{SUFFIXE_NOUVELLE} ON ", 1)
+            requetes.append(definition.replace(cible_ancienne, cible_nouvelle, 1))
+        if creer_index_en_parallele(requetes, processus):
+            raise RuntimeError(f"index de gpr.{nouvelle} en échec")
+
+        # 3. Contraintes adossées aux index, triggers, statistiques du planificateur
+        for nom, _, contrainte, type_contrainte in index:
+            if type_contrainte in ('p', 'u'):
+                cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {} USING INDEX {}").format(
+                    sql.Identifier('gpr', nouvelle), sql.Identifier(nom + SUFFIXE_NOUVELLE),
+                    sql.SQL('PRIMARY KEY' if type_contrainte == 'p' else 'UNIQUE'),
+                    sql.Identifier(nom + SUFFIXE_NOUVELLE)))
+        for definition in triggers:
+            cursor.execute(definition.replace(f" ON gpr.{table} ", f" ON gpr.{nouvelle} ", 1))
+        cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier('gpr', nouvelle)))
+        conn.commit()
+        print(f"   ✅ gpr.{nouvelle}: {len(index)} index, {len(triggers)} triggers, statistiques à jour")
+        return nb_lignes
+    except Exception:
+        conn.rollback()
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier('gpr', nouvelle)))
+        conn.commit()
+        raise
+    finally:
+        cursor.close()
+
+def _echanger(cursor, table):
+    """RENAME de la table et de ses index, transfert des séquences (dans la transaction courante)"""
+    nouvelle, ancienne = table + SUFFIXE_NOUVELLE, table + SUFFIXE_ANCIENNE
+    cursor.execute("""
+        SELECT attname, pg_get_serial_sequence(%s, attname) FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+    """, (f'gpr.{table}', f'gpr.{table}'))
+    sequences = [(colonne, sequence) for colonne, sequence in cursor.fetchall() if sequence]
+    cursor.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass",
+                   (f'gpr.{table}',))
+    anciens_index = [nom.split('.')[-1] for (nom,) in cursor.fetchall()]
+
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+        sql.Identifier('gpr', table), sql.Identifier(ancienne)))
+    for nom in anciens_index:
+        cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier('gpr', nom), sql.Identifier(nom + SUFFIXE_ANCIENNE)))
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+        sql.Identifier('gpr', nouvelle), sql.Identifier(table)))
+    for nom in anciens_index:
+        cursor.execute(sql.SQL("ALTER INDEX IF EXISTS {} RENAME TO {}").format(
+            sql.Identifier('gpr', nom + SUFFIXE_NOUVELLE), sql.Identifier(nom)))
+    # La séquence appartenait à l'ancienne table: la garder en la supprimant
+    for colonne, sequence in sequences:
+        cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}").format(
+            sql.SQL(sequence), sql.Identifier('gpr', table, colonne)))
+    # Le renommage échappe aux triggers de ligne (tuiles, journal des événements)
+    signaler_remplacement(cursor, table)
+    if table in NOMS_LOGIQUES:
+        cursor.execute("SELECT pg_notify('tables_modifiees', %s)", (NOMS_LOGIQUES[table],))
+
+def supprimer_anciennes(conn, tables):
+    """Supprimer les restes d'un échange précédent dont la suppression n'avait pas abouti"""
+    with conn.cursor() as cursor:
+        for table in tables:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(
+                sql.Identifier('gpr', table + SUFFIXE_ANCIENNE)))
+    conn.commit()
+
+def verrouiller_tables(conn, tables, tentatives=TENTATIVES_ECHANGE):
+    """Bloquer les écritures sur gpr.<table> (lectures permises) jusqu'à la fin de la transaction
+
+    À prendre avant la copie et à garder jusqu'à l'échange, fait dans la même
+    transaction (echanger_tables). Attend la fin des écritures en cours;
+    réessayé si le verrou forme un interblocage avec l'une d'elles.
+    """
+    cibles = sql.SQL(', ').join(sql.Identifier('gpr', table) for table in tables)
+    with conn.cursor() as cursor:
+        for tentative in range(1, tentatives + 1):
+            try:
+                cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(cibles))
+                return
+            except errors.DeadlockDetected:
+                conn.rollback()
+                print(f"   ⏳ Interblocage en verrouillant {', '.join(tables)} (essai {tentative}/{tentatives})")
+                time.sleep(min(0.2 * 2 ** tentative, 5.0))
+    raise RuntimeError(f"impossible de verrouiller {', '.join(tables)}")
+
+def echanger_tables(conn, tables, delai_verrou=DELAI_VERROU, tentatives=TENTATIVES_ECHANGE):
+    """Remplacer gpr.<table> par gpr.<table>_new pour toutes les tables, en une transaction
+
+    `conn` est la connexion qui tient les tables en mode SHARE depuis la
+    copie (verrouiller_tables). Chaque essai attend au plus `delai_verrou`
+    les verrous exclusifs; en cas d'échec ou d'interblocage il est annulé
+    jusqu'à un point de sauvegarde (les lecteurs ne sont pas bloqués plus
+    longtemps, le verrou SHARE est conservé) et recommence après une pause.
+    """
+    cursor = conn.cursor()
+    try:
+        for tentative in range(1, tentatives + 1):
+            cursor.execute("SAVEPOINT echange")
+            try:
+                cursor.execute("SET LOCAL lock_timeout = %s", (delai_verrou,))
+                for table in tables:
+                    _echanger(cursor, table)
+                conn.commit()
+                print(f"   🔀 Échange effectué ({', '.join(tables)}, essai {tentative})")
+                break
+            except (errors.LockNotAvailable, errors.DeadlockDetected) as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT echange")
+                pause = min(0.2 * 2 ** tentative, 5.0)
+                motif = 'Interblocage' if isinstance(e, errors.DeadlockDetected) else 'Verrou indisponible'
+                print(f"   ⏳ {motif} (essai {tentative}/{tentatives}), nouvel essai dans {pause:.1f}s")
+                time.sleep(pause)
+        else:
+            conn.rollback()
+            return False
+
+        # L'ancienne version n'est plus lue: la supprimer sans attendre les requêtes en cours
+        for table in tables:
+            try:
+                cursor.execute("SET LOCAL lock_timeout = %s", (delai_verrou,))
+                cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier('gpr', table + SUFFIXE_ANCIENNE)))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"   ⚠️  gpr.{table}{SUFFIXE_ANCIENNE} conservée ({e.pgerror or e}), supprimée au prochain échange")
+
+        # Les triggers de synthèse ne voient pas l'échange: recalculer la table de statistiques
+        cursor.execute("SELECT to_regprocedure('gpr.reconstruire_statistiques()') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT gpr.reconstruire_statistiques()")
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+
+def recharger_tables(tables, schema_source='gpr', processus=None):
+    """Construire puis échanger les tables; retourne {table: lignes} ou None en cas d'échec
+
+    Une seconde connexion tient les tables en mode SHARE de la copie à
+    l'échange, qu'elle effectue elle-même: les écritures attendent.
+    """
+    conn = connect_to_database()
+    if not conn:
+        return None
+    garde = connect_to_database()
+    if not garde:
+        conn.close()
+        return None
+    try:
+        supprimer_anciennes(conn, tables)
+        verrouiller_tables(garde, tables)
+        print(f"🔒 Écritures suspendues sur {', '.join(tables)} jusqu'à l'échange")
+
+        lignes = {}
+        for table in tables:
+            print(f"📋 Construction de gpr.{table}{SUFFIXE_NOUVELLE} depuis {schema_source}.{table}...")
+            lignes[table] = construire_table(conn, table, schema_source, processus)
+
+        print("🔀 Échange des tables...")
+        if not echanger_tables(garde, tables):
+            print("❌ Verrous toujours indisponibles, l'ancienne version reste en service")
+            return None
+        return lignes
+    except Exception as e:
+        conn.rollback()
+        garde.rollback()
+        print(f"❌ Erreur lors du rechargement: {e}")
+        return None
+    finally:
+        conn.close()
+        garde.close()
+
+def main():
+    """Fonction principale"""
+    print("🚂 ONCF GIS - Rechargement des tables par échange atomique")
+    print("=" * 50)
+
+    arguments = sys.argv[1:]
+    schema_source = 'gpr'
+    if '--depuis' in arguments:
+        i = arguments.index('--depuis')
+        schema_source = arguments[i + 1]
+        del arguments[i:i + 2]
+    if not arguments:
+        print("Usage: python echange_tables.py [--depuis schema] table [table ...]")
+        sys.exit(1)
+
+    lignes = recharger_tables(arguments, schema_source)
+    if lignes is None:
+        sys.exit(1)
+    for table, nombre in lignes.items():
+        print(f"   - gpr.{table}: {nombre:,} enregistrements")
+    print("\n🎉 Rechargement terminé")
+
+if __name__ == "__main__":
+    main()
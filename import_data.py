@@ -3,13 +3,15 @@
 Script d'importation des données CSV dans PostgreSQL pour ONCF GIS
 """
 
-import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import os
 from dotenv import load_dotenv
 import sys
 
+from chargeur_copy import FICHIERS_SQL_DATA, apres_chargement, charger_fichier
+from materialiser_geometries import materialiser_tout
+from migrer_base import MIGRATION_GEOMETRIES, appliquer_migrations
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -78,32 +80,15 @@ def create_schema_and_tables(conn):
     finally:
         cursor.close()
 
-def import_csv_data(conn, csv_file, table_name):
-    """Importer les données CSV dans une table PostgreSQL"""
+def import_csv_data(conn, csv_file, table_name, incremental=False):
+    """Importer un dump CSV dans une table PostgreSQL (COPY, voir chargeur_copy.py)"""
     cursor = conn.cursor()
     
     try:
-        # Lire le fichier CSV
-        print(f"📖 Lecture du fichier {csv_file}...")
-        df = pd.read_csv(csv_file)
-        
-        # Nettoyer les données
-        df = df.fillna('')
-        
-        # Préparer les données pour l'insertion
-        columns = df.columns.tolist()
-        data = [tuple(row) for row in df.values]
-        
-        # Construire la requête d'insertion
-        placeholders = ','.join(['%s'] * len(columns))
-        query = f"INSERT INTO gpr.{table_name} ({','.join(columns)}) VALUES {placeholders}"
-        
-        # Insérer les données
-        print(f"📥 Importation de {len(data)} enregistrements dans {table_name}...")
-        execute_values(cursor, query, data)
-        
+        print(f"📖 Chargement du fichier {csv_file}...")
+        charger_fichier(cursor, table_name, FICHIERS_SQL_DATA[table_name], dossier=os.path.dirname(csv_file),
+                        incremental=incremental)
         conn.commit()
-        print(f"✅ {len(data)} enregistrements importés dans {table_name}")
         
     except Exception as e:
         conn.rollback()
@@ -111,38 +96,9 @@ def import_csv_data(conn, csv_file, table_name):
     finally:
         cursor.close()
 
-def import_geometry_data(conn, csv_file, table_name):
-    """Importer les données géométriques spéciales"""
-    cursor = conn.cursor()
-    
-    try:
-        # Lire le fichier CSV
-        print(f"📖 Lecture du fichier {csv_file}...")
-        df = pd.read_csv(csv_file)
-        
-        # Nettoyer les données
-        df = df.fillna('')
-        
-        # Traiter chaque ligne
-        for index, row in df.iterrows():
-            # Préparer les données (exclure la colonne id si elle existe)
-            data_columns = [col for col in df.columns if col != 'id']
-            data_values = [row[col] for col in data_columns]
-            
-            # Construire la requête d'insertion
-            placeholders = ','.join(['%s'] * len(data_columns))
-            query = f"INSERT INTO gpr.{table_name} ({','.join(data_columns)}) VALUES ({placeholders})"
-            
-            cursor.execute(query, data_values)
-        
-        conn.commit()
-        print(f"✅ {len(df)} enregistrements importés dans {table_name}")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Erreur lors de l'importation de {csv_file}: {e}")
-    finally:
-        cursor.close()
+def import_geometry_data(conn, csv_file, table_name, incremental=False):
+    """Importer les données géométriques spéciales (même chargement COPY)"""
+    import_csv_data(conn, csv_file, table_name, incremental)
 
 def create_indexes(conn):
     """Créer les index pour optimiser les performances"""
@@ -151,13 +107,11 @@ def create_indexes(conn):
     try:
         # Index pour graphe_arc
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_graphe_arc_axe ON gpr.graphe_arc(axe);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_graphe_arc_geometrie ON gpr.graphe_arc USING GIST(geometrie);")
         
         # Index pour gpd_gares_ref
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_gares_ref_axe ON gpr.gpd_gares_ref(axe);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_gares_ref_type ON gpr.gpd_gares_ref(typegare);")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_gares_ref_etat ON gpr.gpd_gares_ref(etat);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_gares_ref_geometrie ON gpr.gpd_gares_ref USING GIST(geometrie);")
         
         conn.commit()
         print("✅ Index créés avec succès")
@@ -230,27 +184,34 @@ def main():
         print("\n🏗️  Création du schéma et des tables...")
         create_schema_and_tables(conn)
         
-        # Vider les tables existantes
-        cursor = conn.cursor()
-        cursor.execute("TRUNCATE TABLE gpr.graphe_arc RESTART IDENTITY CASCADE;")
-        cursor.execute("TRUNCATE TABLE gpr.gpd_gares_ref RESTART IDENTITY CASCADE;")
-        conn.commit()
-        cursor.close()
-        print("🧹 Tables vidées")
-        
-        # Importer les données
-        print("\n📥 Importation des données...")
+        # Importer les données (--incremental: seulement les lignes modifiées,
+        # sinon chaque table est vidée puis rechargée)
+        incremental = '--incremental' in sys.argv
+        print(f"\n📥 Importation des données ({'incrémentale' if incremental else 'complète'})...")
         
         # Importer graphe_arc
-        import_csv_data(conn, 'sql_data/graphe_arc', 'graphe_arc')
+        import_csv_data(conn, 'sql_data/graphe_arc', 'graphe_arc', incremental)
         
         # Importer gpd_gares_ref
-        import_csv_data(conn, 'sql_data/gpd_gares_ref', 'gpd_gares_ref')
+        import_csv_data(conn, 'sql_data/gpd_gares_ref', 'gpd_gares_ref', incremental)
+        
+        # Statistiques recalculées et application prévenue, une fois les tables validées
+        with conn.cursor() as cursor:
+            apres_chargement(cursor)
+        conn.commit()
         
         # Créer les index
         print("\n🔍 Création des index...")
         create_indexes(conn)
         
+        # Précalculer les coordonnées décodées des gares et des arcs
+        print("\n🗺️  Matérialisation des coordonnées...")
+        materialiser_tout(conn, force=not incremental)
+        
+        # Géométries en binaire et index spatiaux (PostGIS ou bytea + GiST WGS84)
+        print("\n🧭 Géométries binaires et index spatiaux...")
+        appliquer_migrations(conn, [MIGRATION_GEOMETRIES])
+        
         # Vérifier les données
         print("\n✅ Vérification finale...")
         verify_data(conn)
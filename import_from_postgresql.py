@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
 """
 Script d'import des données depuis PostgreSQL existant vers le schéma ONCF GIS
-Les tables existent déjà et sont remplies dans la base oncf_ems_db
+Les tables existent déjà et sont remplies dans la base oncf_ems_db, ou dans
+une autre base PostgreSQL désignée par SOURCE_DATABASE_URL.
+
+Chaque table est transférée en flux (COPY ... TO STDOUT vers COPY ... FROM
+STDIN, tampon mémoire borné, sans fichier intermédiaire), par lots d'id
+validés un à un, plusieurs tables en parallèle.
+
+Usage:
+    python import_from_postgresql.py               # copie complète
+    python import_from_postgresql.py -j 8          # 8 tables en parallèle
+    python import_from_postgresql.py --reprendre   # reprendre une copie interrompue
 """
 
 import psycopg2
 import psycopg2.extras
 import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
+from psycopg2 import sql
 
 # Charger les variables d'environnement
 load_dotenv()
 
+# Lignes par lot validé (point de reprise) et morceaux COPY en transit entre les deux bases
+TAILLE_LOT_COPIE = int(os.getenv('COPIE_TAILLE_LOT', 50000))
+TAMPON_COPIE = 64
+
 def connect_to_database(db_name=None):
     """Établir une connexion à la base de données PostgreSQL"""
     try:
@@ -29,9 +49,20 @@ def connect_to_database(db_name=None):
         print(f"❌ Erreur de connexion à la base de données: {e}")
         return None
 
+def connect_to_source():
+    """Connexion à la base source (SOURCE_DATABASE_URL, par défaut la base cible)"""
+    source_url = os.getenv('SOURCE_DATABASE_URL')
+    if not source_url:
+        return connect_to_database()
+    try:
+        return psycopg2.connect(source_url)
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base source: {e}")
+        return None
+
 def check_existing_tables():
     """Vérifier les tables existantes dans la base source"""
-    conn = connect_to_database()
+    conn = connect_to_source()
     if not conn:
         return []
     
@@ -67,8 +98,8 @@ def check_existing_tables():
         conn.close()
 
 def analyze_table_structure(schema, table):
-    """Analyser la structure d'une table"""
-    conn = connect_to_database()
+    """Analyser la structure d'une table de la base source"""
+    conn = connect_to_source()
     if not conn:
         return None
     
@@ -131,11 +162,131 @@ def create_target_schema():
         cursor.close()
         conn.close()
 
-def copy_table_data(source_schema, source_table, target_schema, target_table, column_mapping=None):
-    """Copier les données d'une table source vers une table cible"""
+class TuyauCopie:
+    """Tampon borné entre COPY ... TO STDOUT (source) et COPY ... FROM STDIN (cible)
+
+    La source écrit des morceaux, la cible les lit: quand la file est pleine
+    la lecture de la source attend, rien n'est écrit sur disque.
+    """
+
+    def __init__(self, taille=TAMPON_COPIE):
+        self._file = queue.Queue(maxsize=taille)
+        self.abandonne = False
+        self.octets = 0
+
+    def write(self, donnees):
+        while True:
+            if self.abandonne:
+                raise RuntimeError("copie abandonnée côté cible")
+            try:
+                self._file.put(donnees, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.octets += len(donnees)
+
+    def fermer(self):
+        """Signaler la fin du flux source"""
+        while not self.abandonne:
+            try:
+                self._file.put(None, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, taille=-1):
+        donnees = self._file.get()
+        return b'' if donnees is None else donnees
+
+def copier_flux(source_conn, cible_conn, requete_source, requete_cible):
+    """Relier COPY TO STDOUT de la source à COPY FROM STDIN de la cible; retourne le nombre de lignes
+
+    Ne valide rien: la transaction cible reste ouverte pour l'appelant. Une
+    erreur côté source (flux tronqué) est relevée avant toute validation.
+    """
+    tuyau = TuyauCopie()
+    erreurs = []
+
+    def produire():
+        try:
+            with source_conn.cursor() as cursor:
+                cursor.copy_expert(requete_source, tuyau)
+        except Exception as e:
+            erreurs.append(e)
+        finally:
+            tuyau.fermer()
+
+    producteur = threading.Thread(target=produire, daemon=True)
+    producteur.start()
+    try:
+        with cible_conn.cursor() as cursor:
+            cursor.copy_expert(requete_cible, tuyau)
+            nb_lignes = cursor.rowcount
+    except Exception:
+        tuyau.abandonne = True
+        raise
+    finally:
+        producteur.join()
+        # Lecture seule: libérer l'instantané de la source entre deux lots
+        source_conn.rollback()
+
+    if erreurs:
+        raise erreurs[0]
+    return nb_lignes
+
+def borne_lot(cursor, source, depuis, taille):
+    """Plus grand id du prochain lot de `taille` lignes après `depuis` (None: dernier lot)"""
+    condition = sql.SQL("WHERE id > {}").format(sql.Literal(depuis)) if depuis is not None else sql.SQL("")
+    cursor.execute(sql.SQL("SELECT id FROM {} {} ORDER BY id OFFSET %s LIMIT 1").format(source, condition),
+                   (taille - 1,))
+    ligne = cursor.fetchone()
+    return ligne[0] if ligne else None
+
+def colonne_sql(col_name, data_type, nullable, default):
+    """Définition de colonne cible à partir de la structure source"""
+    col_def = f"{col_name} "
+    
+    # Mapper les types PostgreSQL
+    if data_type in ['integer', 'bigint']:
+        col_def += "INTEGER"
+    elif data_type in ['numeric', 'decimal']:
+        col_def += "NUMERIC"
+    elif data_type in ['timestamp without time zone', 'timestamp with time zone']:
+        col_def += "TIMESTAMP"
+    elif data_type == 'time without time zone':
+        col_def += "TIME"
+    elif data_type == 'boolean':
+        col_def += "BOOLEAN"
+    elif data_type in ['character varying', 'text', 'character']:
+        col_def += "TEXT"
+    elif data_type == 'USER-DEFINED':  # Probablement geometry
+        col_def += "TEXT"
+    else:
+        col_def += "TEXT"  # Par défaut
+    
+    # Gérer la clé primaire
+    if col_name == 'id' and 'nextval' in str(default):
+        col_def = f"{col_name} SERIAL PRIMARY KEY"
+    elif nullable == 'NO' and col_name != 'id':
+        col_def += " NOT NULL"
+    
+    return col_def
+
+def copy_table_data(source_schema, source_table, target_schema, target_table, column_mapping=None,
+                    taille_lot=TAILLE_LOT_COPIE):
+    """Copier une table de la base source vers la base cible par lots d'id, en flux COPY
+
+    Chaque lot est validé séparément: une copie interrompue reprend après le
+    plus grand id déjà présent dans la table cible. Une table sans colonne id
+    est copiée en un seul lot.
+    """
+    source_conn = connect_to_source()
     conn = connect_to_database()
-    if not conn:
+    if not source_conn or not conn:
         return 0
+    # Les octets COPY passent tels quels d'une connexion à l'autre
+    source_conn.set_client_encoding('UTF8')
+    conn.set_client_encoding('UTF8')
     
     cursor = conn.cursor()
     
@@ -146,63 +297,67 @@ def copy_table_data(source_schema, source_table, target_schema, target_table, co
             print(f"⚠️  Impossible d'analyser {source_schema}.{source_table}")
             return 0
         
-        # Construire la requête CREATE TABLE
-        create_columns = []
-        for col_name, data_type, nullable, default in columns:
-            col_def = f"{col_name} "
-            
-            # Mapper les types PostgreSQL
-            if data_type in ['integer', 'bigint']:
-                col_def += "INTEGER"
-            elif data_type in ['numeric', 'decimal']:
-                col_def += "NUMERIC"
-            elif data_type in ['timestamp without time zone', 'timestamp with time zone']:
-                col_def += "TIMESTAMP"
-            elif data_type == 'time without time zone':
-                col_def += "TIME"
-            elif data_type == 'boolean':
-                col_def += "BOOLEAN"
-            elif data_type in ['character varying', 'text', 'character']:
-                col_def += "TEXT"
-            elif data_type == 'USER-DEFINED':  # Probablement geometry
-                col_def += "TEXT"
-            else:
-                col_def += "TEXT"  # Par défaut
-            
-            # Gérer la clé primaire
-            if col_name == 'id' and 'nextval' in str(default):
-                col_def = f"{col_name} SERIAL PRIMARY KEY"
-            elif nullable == 'NO' and col_name != 'id':
-                col_def += " NOT NULL"
-            
-            create_columns.append(col_def)
-        
-        # Créer la table cible
-        create_sql = f"""
-            CREATE TABLE {target_schema}.{target_table} (
+        # Créer la table cible (conservée telle quelle en reprise)
+        create_columns = [colonne_sql(*col) for col in columns]
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {target_schema}.{target_table} (
                 {', '.join(create_columns)}
             );
-        """
-        
-        cursor.execute(create_sql)
-        print(f"✅ Table {target_schema}.{target_table} créée")
+        """)
+        conn.commit()
         
-        # Copier les données
         column_names = [col[0] for col in columns]
-        columns_str = ', '.join(column_names)
+        source = sql.Identifier(source_schema, source_table)
+        cible = sql.Identifier(target_schema, target_table)
+        liste = sql.SQL(', ').join(sql.Identifier(nom) for nom in column_names)
+        requete_cible = sql.SQL("COPY {} ({}) FROM STDIN").format(cible, liste).as_string(conn)
         
-        # Requête de copie avec conversion des géométries
-        copy_sql = f"""
-            INSERT INTO {target_schema}.{target_table} ({columns_str})
-            SELECT {columns_str}
-            FROM {source_schema}.{source_table};
-        """
+        if 'id' not in column_names:
+            requete_source = sql.SQL("COPY (SELECT {} FROM {}) TO STDOUT").format(liste, source)
+            cursor.execute(sql.SQL("TRUNCATE TABLE {}").format(cible))
+            rows_copied = copier_flux(source_conn, conn, requete_source.as_string(source_conn), requete_cible)
+            conn.commit()
+            print(f"✅ {rows_copied:,} lignes copiées dans {target_schema}.{target_table}")
+            return rows_copied
         
-        cursor.execute(copy_sql)
-        rows_copied = cursor.rowcount
+        # Reprise après le dernier lot validé
+        cursor.execute(sql.SQL("SELECT MAX(id) FROM {}").format(cible))
+        depuis = cursor.fetchone()[0]
+        if depuis is not None:
+            print(f"   ↪ reprise de {target_schema}.{target_table} après l'id {depuis}")
         
+        rows_copied = 0
+        debut = time.perf_counter()
+        source_cursor = source_conn.cursor()
+        while True:
+            jusqua = borne_lot(source_cursor, source, depuis, taille_lot)
+            conditions = []
+            if depuis is not None:
+                conditions.append(sql.SQL("id > {}").format(sql.Literal(depuis)))
+            if jusqua is not None:
+                conditions.append(sql.SQL("id <= {}").format(sql.Literal(jusqua)))
+            where = sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL("")
+            requete_source = sql.SQL("COPY (SELECT {} FROM {}{}) TO STDOUT").format(liste, source, where)
+            
+            nb_lignes = copier_flux(source_conn, conn, requete_source.as_string(source_conn), requete_cible)
+            conn.commit()
+            rows_copied += nb_lignes
+            if jusqua is None:
+                break
+            depuis = jusqua
+            print(f"   … {target_table}: {rows_copied:,} lignes (id ≤ {depuis})")
+        source_cursor.close()
+        
+        # Recaler la séquence sur les ids copiés
+        cursor.execute(sql.SQL("""
+            SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+            FROM {}
+        """).format(cible), (f'{target_schema}.{target_table}',))
         conn.commit()
-        print(f"✅ {rows_copied:,} lignes copiées dans {target_schema}.{target_table}")
+        
+        duree = time.perf_counter() - debut
+        print(f"✅ {rows_copied:,} lignes copiées dans {target_schema}.{target_table} "
+              f"en {duree:.2f}s ({rows_copied / max(duree, 1e-9):,.0f} lignes/s)")
         
         return rows_copied
         
@@ -213,6 +368,7 @@ def copy_table_data(source_schema, source_table, target_schema, target_table, co
     finally:
         cursor.close()
         conn.close()
+        source_conn.close()
 
 def create_indexes():
     """Créer les index pour optimiser les performances"""
@@ -250,8 +406,13 @@ def create_indexes():
         cursor.close()
         conn.close()
 
-def import_all_data():
-    """Importer toutes les données depuis PostgreSQL"""
+def import_all_data(reprendre=False, processus=4):
+    """Importer toutes les données depuis PostgreSQL
+
+    Les tables sont copiées en parallèle (`processus` à la fois). Avec
+    `reprendre`, les tables cibles sont conservées et chaque copie repart
+    du dernier lot validé.
+    """
     print("🚂 ONCF GIS - Import depuis PostgreSQL")
     print("=" * 50)
     
@@ -261,8 +422,10 @@ def import_all_data():
         print("❌ Aucune table trouvée dans la base source")
         return False
     
-    # Créer le schéma cible
-    if not create_target_schema():
+    # Créer le schéma cible (vidé, sauf en reprise)
+    if reprendre:
+        print("↪ Reprise: tables cibles conservées")
+    elif not create_target_schema():
         return False
     
     print("\n📊 Import des données...")
@@ -288,21 +451,27 @@ def import_all_data():
         ('gpr', 'ref_sous_types', 'gpr', 'ref_sous_types')
     ]
     
+    # Une seule source par table cible (le schéma public est prioritaire)
+    copies = {}
+    for source_schema, source_table, target_schema, target_table in table_mappings:
+        table_exists = any(t[0] == source_schema and t[1] == source_table for t in tables)
+        if table_exists and (target_schema, target_table) not in copies:
+            copies[(target_schema, target_table)] = (source_schema, source_table)
+    
     total_copied = 0
     successful_copies = 0
     
-    for source_schema, source_table, target_schema, target_table in table_mappings:
-        # Vérifier si la table source existe
-        table_exists = any(t[0] == source_schema and t[1] == source_table for t in tables)
-        if not table_exists:
-            continue
-        
-        print(f"\n📋 Copie de {source_schema}.{source_table} -> {target_schema}.{target_table}")
-        rows = copy_table_data(source_schema, source_table, target_schema, target_table)
-        
-        if rows > 0:
-            total_copied += rows
-            successful_copies += 1
+    with ThreadPoolExecutor(max_workers=processus) as executeur:
+        futurs = []
+        for (target_schema, target_table), (source_schema, source_table) in copies.items():
+            print(f"📋 Copie de {source_schema}.{source_table} -> {target_schema}.{target_table}")
+            futurs.append(executeur.submit(copy_table_data, source_schema, source_table,
+                                           target_schema, target_table))
+        for futur in futurs:
+            rows = futur.result()
+            if rows > 0:
+                total_copied += rows
+                successful_copies += 1
     
     if successful_copies == 0:
         print("\n⚠️  Aucune table copiée. Vérifiez que les tables existent dans la base source.")
@@ -362,7 +531,12 @@ def main():
     print("✅ Connexion à la base de données réussie")
     conn.close()
     
-    if import_all_data():
+    arguments = sys.argv[1:]
+    processus = 4
+    if '-j' in arguments:
+        processus = int(arguments[arguments.index('-j') + 1])
+    
+    if import_all_data(reprendre='--reprendre' in arguments, processus=processus):
         print("\n🚀 Prochaines étapes:")
         print("1. Lancez l'application: python app.py")
         print("2. Accédez à: http://localhost:5000")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur d'import parallèle des dumps sql_data
+
+Chaque table est chargée par COPY (voir chargeur_copy.py) dans un processus
+distinct, avec sa propre connexion et sa propre transaction. Une table ne
+démarre qu'une fois ses dépendances chargées; les index sont construits
+ensuite, eux aussi en parallèle.
+
+Usage:
+    python import_parallele.py                    # toutes les tables
+    python import_parallele.py -j 4               # au plus 4 processus
+    python import_parallele.py --incremental      # n'écrire que les lignes modifiées
+    python import_parallele.py ge_evenement ...   # seulement certaines tables
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import psycopg2
+from dotenv import load_dotenv
+
+from chargeur_copy import FICHIERS_SQL_DATA, charger_table, resume_chargement, apres_chargement
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Tables à charger avant une autre (clés étrangères, TRUNCATE ... CASCADE)
+DEPENDANCES = {
+    'ge_localisation': ('ge_evenement',),
+    'ref_sous_types': ('ref_types',),
+}
+
+# Index construits après le chargement
+INDEX_IMPORT = [
+    "CREATE INDEX IF NOT EXISTS idx_gares_axe ON gpr.gpd_gares_ref(axe);",
+    "CREATE INDEX IF NOT EXISTS idx_gares_type ON gpr.gpd_gares_ref(typegare);",
+    "CREATE INDEX IF NOT EXISTS idx_arcs_axe ON gpr.graphe_arc(axe);",
+    "CREATE INDEX IF NOT EXISTS idx_evenements_date ON gpr.ge_evenement(date_debut);",
+    "CREATE INDEX IF NOT EXISTS idx_evenements_statut ON gpr.ge_evenement(statut);",
+    "CREATE INDEX IF NOT EXISTS idx_types_actif ON gpr.ref_types(actif);"
+]
+
+def connect_to_database():
+    """Établir une connexion à la base de données PostgreSQL"""
+    try:
+        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        return conn
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base de données: {e}")
+        return None
+
+def _charger_dans_processus(table, dossier, incremental):
+    """Charger une table dans sa propre connexion; retourne le résultat de charger_table"""
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    try:
+        with conn.cursor() as cursor:
+            resultat = charger_table(cursor, os.path.join(dossier, table), table, FICHIERS_SQL_DATA[table],
+                                     incremental)
+        conn.commit()
+        return resultat
+    finally:
+        conn.close()
+
+def _executer_dans_processus(requete):
+    """Exécuter une requête (création d'index) en autocommit; retourne la durée"""
+    debut = time.perf_counter()
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(requete)
+    finally:
+        conn.close()
+    return time.perf_counter() - debut
+
+def charger_en_parallele(tables=None, processus=None, dossier='sql_data', incremental=False):
+    """Charger les tables en parallèle dans l'ordre des dépendances
+
+    Retourne (lignes écrites, tables en échec). Une table dont une dépendance
+    a échoué n'est pas chargée.
+    """
+    tables = [t for t in (tables or FICHIERS_SQL_DATA) if os.path.exists(os.path.join(dossier, t))]
+    restantes = set(tables)
+    terminees, echecs = set(), set()
+    en_cours = {}
+    total = 0
+    debut = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processus) as executeur:
+        while restantes or en_cours:
+            # Lancer toutes les tables dont les dépendances (présentes dans l'import) sont chargées
+            for table in sorted(restantes):
+                dependances = [d for d in DEPENDANCES.get(table, ()) if d in tables]
+                if any(d in echecs for d in dependances):
+                    restantes.discard(table)
+                    echecs.add(table)
+                    print(f"⏭️  {table}: ignorée (dépendance en échec)")
+                elif all(d in terminees for d in dependances):
+                    restantes.discard(table)
+                    en_cours[executeur.submit(_charger_dans_processus, table, dossier, incremental)] = table
+                    print(f"⏳ {table}: chargement démarré")
+            if not en_cours:
+                break
+
+            finis, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in finis:
+                table = en_cours.pop(futur)
+                try:
+                    resultat = futur.result()
+                except Exception as e:
+                    echecs.add(table)
+                    print(f"❌ {table}: {e}")
+                    continue
+                terminees.add(table)
+                total += resultat['inseres'] + resultat['modifies']
+                print(f"✅ [{len(terminees)}/{len(tables)}] {resume_chargement(table, resultat)}")
+
+    duree = time.perf_counter() - debut
+    print(f"📦 {total:,} lignes écrites en {duree:.2f}s ({total / max(duree, 1e-9):,.0f} lignes/s)")
+    return total, echecs
+
+def creer_index_en_parallele(index=INDEX_IMPORT, processus=None):
+    """Construire les index en parallèle (une connexion par index); retourne le nombre d'échecs"""
+    echecs = 0
+    with ProcessPoolExecutor(max_workers=processus) as executeur:
+        futurs = {executeur.submit(_executer_dans_processus, requete): requete for requete in index}
+        for futur in futurs:
+            nom = futurs[futur].split(' ON ')[0].split()[-1]
+            try:
+                print(f"   ✅ {nom} ({futur.result():.2f}s)")
+            except Exception as e:
+                echecs += 1
+                print(f"   ⚠️  {nom}: {e}")
+    return echecs
+
+def main():
+    """Fonction principale"""
+    print("🚂 ONCF GIS - Import parallèle des données")
+    print("=" * 50)
+
+    arguments = sys.argv[1:]
+    processus = None
+    if '-j' in arguments:
+        i = arguments.index('-j')
+        processus = int(arguments[i + 1])
+        del arguments[i:i + 2]
+    incremental = '--incremental' in arguments
+    arguments = [a for a in arguments if a != '--incremental']
+
+    inconnues = [t for t in arguments if t not in FICHIERS_SQL_DATA]
+    if inconnues:
+        print(f"❌ Tables inconnues: {', '.join(inconnues)}")
+        sys.exit(1)
+
+    _, echecs = charger_en_parallele(arguments or None, processus, incremental=incremental)
+
+    print("\n🔧 Création des index...")
+    creer_index_en_parallele(processus=processus)
+
+    conn = connect_to_database()
+    if not conn:
+        sys.exit(1)
+    try:
+        with conn.cursor() as cursor:
+            apres_chargement(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if echecs:
+        print(f"\n⚠️  Tables en échec: {', '.join(sorted(echecs))}")
+        sys.exit(1)
+    print("\n🎉 Import terminé")
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,14 @@ Compatible avec Python 3.13
 import psycopg2
 import psycopg2.extras
 import os
-import csv
-from datetime import datetime
+import sys
 from dotenv import load_dotenv
 
+from chargeur_copy import apres_chargement
+from import_parallele import charger_en_parallele, creer_index_en_parallele
+from materialiser_geometries import materialiser_tout
+from migrer_base import appliquer_migrations
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -165,102 +169,13 @@ def create_schema_and_tables(cursor):
         print(f"❌ Erreur lors de la création des tables: {e}")
         return False
 
-def parse_datetime(date_str):
-    """Parser une date/heure avec gestion des erreurs"""
-    if not date_str or date_str.strip() == '':
-        return None
-    try:
-        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-    except:
-        try:
-            return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-        except:
-            try:
-                return datetime.strptime(date_str, '%Y-%m-%d')
-            except:
-                return None
-
-def parse_time(time_str):
-    """Parser une heure avec gestion des erreurs"""
-    if not time_str or time_str.strip() == '':
-        return None
-    try:
-        return datetime.strptime(time_str, '%H:%M:%S').time()
-    except:
-        return None
-
-def parse_boolean(bool_str):
-    """Parser un booléen"""
-    if not bool_str or bool_str.strip() == '':
-        return None
-    return bool_str.lower() in ('t', 'true', '1', 'yes', 'oui')
-
-def import_csv_file(cursor, csv_file, table_name, columns_mapping):
-    """Importer un fichier CSV dans une table"""
-    csv_path = f"sql_data/{csv_file}"
-    
-    if not os.path.exists(csv_path):
-        print(f"⚠️  Fichier {csv_path} non trouvé, ignoré")
-        return 0
-    
-    try:
-        # Vider la table existante
-        cursor.execute(f"TRUNCATE TABLE gpr.{table_name} RESTART IDENTITY CASCADE;")
-        
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            rows_inserted = 0
-            
-            for row_num, row in enumerate(reader, 1):
-                try:
-                    # Préparer les données selon le mapping
-                    data = {}
-                    for i, (col_name, col_type) in enumerate(columns_mapping.items()):
-                        if i < len(row):
-                            value = row[i].strip() if row[i] else None
-                            
-                            if col_type == 'int' and value:
-                                data[col_name] = int(value) if value.isdigit() else None
-                            elif col_type == 'float' and value:
-                                try:
-                                    data[col_name] = float(value.replace(',', '.'))
-                                except:
-                                    data[col_name] = None
-                            elif col_type == 'datetime' and value:
-                                data[col_name] = parse_datetime(value)
-                            elif col_type == 'time' and value:
-                                data[col_name] = parse_time(value)
-                            elif col_type == 'bool' and value:
-                                data[col_name] = parse_boolean(value)
-                            else:
-                                data[col_name] = value if value else None
-                        else:
-                            data[col_name] = None
-                    
-                    # Construire la requête d'insertion
-                    columns = list(data.keys())
-                    values = list(data.values())
-                    
-                    placeholders = ', '.join(['%s'] * len(columns))
-                    columns_str = ', '.join(columns)
-                    
-                    query = f"INSERT INTO gpr.{table_name} ({columns_str}) VALUES ({placeholders})"
-                    cursor.execute(query, values)
-                    rows_inserted += 1
-                    
-                except Exception as e:
-                    print(f"⚠️  Erreur ligne {row_num} dans {csv_file}: {e}")
-                    continue
-        
-        print(f"✅ {rows_inserted} lignes importées dans {table_name}")
-        return rows_inserted
-        
-    except Exception as e:
-        print(f"❌ Erreur lors de l'import de {csv_file}: {e}")
-        return 0
+def import_all_data(incremental=True):
+    """Importer toutes les données CSV
 
-def import_all_data():
-    """Importer toutes les données CSV"""
+    En mode incrémental, seules les lignes modifiées depuis l'import précédent
+    sont écrites (voir chargeur_copy.fusionner_table); sinon les tables sont
+    vidées et rechargées entièrement.
+    """
     conn = connect_to_database()
     if not conn:
         return False
@@ -272,124 +187,33 @@ def import_all_data():
         if not create_schema_and_tables(cursor):
             return False
         
-        print("\n📊 Import des données CSV...")
-        
-        # Configuration des mappings pour chaque fichier
-        mappings = {
-            'gpd_gares_ref': {
-                'id': 'int',
-                'axe': 'str',
-                'plod': 'str', 
-                'absd': 'str',
-                'geometrie': 'str',
-                'geometrie_dec': 'str',
-                'codegare': 'str',
-                'codeoperationnel': 'str',
-                'codereseau': 'str',
-                'nomgarefr': 'str',
-                'typegare': 'str',
-                'publishid': 'str',
-                'sivtypegare': 'str',
-                'num_pk': 'str',
-                'idville': 'int',
-                'villes_ville': 'str',
-                'etat': 'str'
-            },
-            'graphe_arc': {
-                'id': 'int',
-                'axe': 'str',
-                'cumuld': 'float',
-                'cumulf': 'float',
-                'plod': 'str',
-                'absd': 'float',
-                'plof': 'str',
-                'absf': 'float',
-                'geometrie': 'str'
-            },
-            'ge_evenement': {
-                'id': 'int',
-                'date_debut': 'datetime',
-                'date_fin': 'datetime',
-                'col3': 'str',
-                'col4': 'str',
-                'date_creation': 'datetime',
-                'type_id': 'int',
-                'statut': 'str',
-                'heure_debut': 'time',
-                'heure_fin': 'time',
-                'col10': 'str',
-                'col11': 'str',
-                'col12': 'bool',
-                'col13': 'bool',
-                'col14': 'bool',
-                'col15': 'bool',
-                'description': 'str'
-            },
-            'ref_types': {
-                'id': 'int',
-                'date_creation': 'datetime',
-                'libelle': 'str',
-                'niveau': 'int',
-                'systeme_id': 'int',
-                'actif': 'bool',
-                'supprime': 'bool'
-            },
-            'ge_localisation': {
-                'id': 'int',
-                'axe': 'str',
-                'pk_debut': 'float',
-                'pk_fin': 'float',
-                'voie': 'str',
-                'section': 'str',
-                'gare': 'str',
-                'description': 'str',
-                'col8': 'str', 'col9': 'str', 'col10': 'str', 'col11': 'str',
-                'col12': 'str', 'col13': 'str', 'col14': 'str', 'col15': 'str',
-                'col16': 'str', 'col17': 'str', 'col18': 'str', 'col19': 'str',
-                'col20': 'str'
-            },
-            'ref_sous_types': {
-                'id': 'int',
-                'date_creation': 'datetime',
-                'libelle': 'str',
-                'type_id': 'int',
-                'systeme_id': 'int',
-                'actif': 'bool',
-                'supprime': 'bool',
-                'col7': 'str', 'col8': 'str', 'col9': 'str', 'col10': 'str',
-                'col11': 'str', 'col12': 'str', 'col13': 'str', 'col14': 'str',
-                'col15': 'str', 'col16': 'str', 'col17': 'str', 'col18': 'str',
-                'col19': 'str', 'col20': 'str'
-            }
-        }
+        # Les processus de chargement doivent voir les tables créées
+        conn.commit()
         
-        total_imported = 0
-        for csv_file, mapping in mappings.items():
-            count = import_csv_file(cursor, csv_file, csv_file, mapping)
-            total_imported += count
+        print("\n📊 Import des données CSV...")
         
-        # Valider les changements
-        conn.commit()
+        # Chargement COPY des fichiers en parallèle, un processus et une transaction par table
+        total_imported, echecs = charger_en_parallele(incremental=incremental)
+        if echecs:
+            print(f"⚠️  Tables en échec: {', '.join(sorted(echecs))}")
         
         # Créer des index pour les performances
         print("\n🔧 Création des index...")
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_gares_axe ON gpr.gpd_gares_ref(axe);",
-            "CREATE INDEX IF NOT EXISTS idx_gares_type ON gpr.gpd_gares_ref(typegare);",
-            "CREATE INDEX IF NOT EXISTS idx_arcs_axe ON gpr.graphe_arc(axe);",
-            "CREATE INDEX IF NOT EXISTS idx_evenements_date ON gpr.ge_evenement(date_debut);",
-            "CREATE INDEX IF NOT EXISTS idx_evenements_statut ON gpr.ge_evenement(statut);",
-            "CREATE INDEX IF NOT EXISTS idx_types_actif ON gpr.ref_types(actif);"
-        ]
-        
-        for index_sql in indexes:
-            try:
-                cursor.execute(index_sql)
-            except Exception as e:
-                print(f"⚠️  Erreur création index: {e}")
+        creer_index_en_parallele()
+        print("✅ Index créés")
         
+        # Statistiques recalculées et application prévenue
+        apres_chargement(cursor)
         conn.commit()
-        print("✅ Index créés")
+        
+        # Précalculer les coordonnées décodées des gares et des arcs
+        print("\n🗺️  Matérialisation des coordonnées...")
+        # (en incrémental, seules les lignes dont la géométrie a changé sont à recalculer)
+        materialiser_tout(conn, force=not incremental)
+        
+        # Index et objets requis par l'API
+        print("\n🔧 Migrations de la base...")
+        appliquer_migrations(conn)
         
         # Afficher les statistiques finales
         print(f"\n📈 Résumé de l'import:")
@@ -408,7 +232,7 @@ def import_all_data():
             print(f"   - {name}: {count:,} enregistrements")
         
         print(f"\n🎉 Import terminé avec succès!")
-        print(f"   Total: {total_imported:,} enregistrements importés")
+        print(f"   Total: {total_imported:,} enregistrements écrits")
         
         return True
         
@@ -440,9 +264,10 @@ def main():
         print("⚠️  Aucun fichier CSV trouvé dans sql_data/")
         return
     
-    print(f"\n🔄 Démarrage de l'import...")
+    incremental = '--complet' not in sys.argv
+    print(f"\n🔄 Démarrage de l'import ({'incrémental' if incremental else 'complet'})...")
     
-    if import_all_data():
+    if import_all_data(incremental):
         print("\n✅ Import des vraies données terminé!")
         print("\nVous pouvez maintenant:")
         print("1. Lancer l'application: python app.py")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Script de matérialisation des coordonnées décodées des gares et des arcs
+
+Calcule une fois pour toutes les coordonnées WGS84 des gares
+(gpr.gpd_gares_ref.longitude/latitude) et les sommets des arcs avec leur
+importance de simplification (gpr.graphe_arc.sommets_*), afin que l'API
+n'ait plus à décoder les géométries WKB à chaque requête.
+
+Usage:
+    python materialiser_geometries.py          # seulement les lignes non calculées
+    python materialiser_geometries.py --force  # recalculer toutes les lignes
+"""
+
+import psycopg2
+from psycopg2.extras import execute_values
+import os
+import sys
+from dotenv import load_dotenv
+
+from geometrie import decode_wkb_points, materialiser_linestring
+
+# Charger les variables d'environnement
+load_dotenv()
+
+def connect_to_database():
+    """Établir une connexion à la base de données PostgreSQL"""
+    try:
+        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        return conn
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base de données: {e}")
+        return None
+
+def ajouter_colonnes_materialisees(cursor):
+    """Ajouter les colonnes de coordonnées matérialisées si elles n'existent pas"""
+    cursor.execute("""
+        ALTER TABLE gpr.gpd_gares_ref
+            ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+    """)
+    cursor.execute("""
+        ALTER TABLE gpr.graphe_arc
+            ADD COLUMN IF NOT EXISTS sommets_lon DOUBLE PRECISION[],
+            ADD COLUMN IF NOT EXISTS sommets_lat DOUBLE PRECISION[],
+            ADD COLUMN IF NOT EXISTS sommets_importance DOUBLE PRECISION[];
+    """)
+
+def materialiser_gares(cursor, force=False):
+    """Décoder en une passe les géométries des gares et stocker lon/lat"""
+    condition = "" if force else "AND longitude IS NULL"
+    cursor.execute(f"""
+        SELECT id, geometrie FROM gpr.gpd_gares_ref
+        WHERE geometrie IS NOT NULL {condition}
+    """)
+    lignes = cursor.fetchall()
+    if not lignes:
+        return 0
+
+    lons, lats = decode_wkb_points([geometrie for _, geometrie in lignes])
+    valeurs = [
+        (gare_id, lon, lat)
+        for (gare_id, _), lon, lat in zip(lignes, lons.tolist(), lats.tolist())
+        if lon == lon and lat == lat
+    ]
+
+    execute_values(cursor, """
+        UPDATE gpr.gpd_gares_ref AS g
+        SET longitude = v.lon, latitude = v.lat
+        FROM (VALUES %s) AS v(id, lon, lat)
+        WHERE g.id = v.id
+    """, valeurs, template="(%s, %s::double precision, %s::double precision)")
+    return len(valeurs)
+
+def materialiser_arcs(cursor, force=False):
+    """Décoder les lignes des arcs et stocker leurs sommets et importances"""
+    condition = "" if force else "AND sommets_lon IS NULL"
+    cursor.execute(f"""
+        SELECT id, geometrie FROM gpr.graphe_arc
+        WHERE geometrie IS NOT NULL {condition}
+    """)
+    lignes = cursor.fetchall()
+
+    valeurs = []
+    for arc_id, geometrie in lignes:
+        try:
+            lons, lats, importances = materialiser_linestring(geometrie)
+        except Exception as e:
+            print(f"⚠️  Arc {arc_id}: géométrie illisible ({e})")
+            continue
+        if lons is not None:
+            valeurs.append((arc_id, lons, lats, importances))
+
+    if valeurs:
+        execute_values(cursor, """
+            UPDATE gpr.graphe_arc AS a
+            SET sommets_lon = v.lon, sommets_lat = v.lat, sommets_importance = v.importance
+            FROM (VALUES %s) AS v(id, lon, lat, importance)
+            WHERE a.id = v.id
+        """, valeurs, template="(%s, %s::double precision[], %s::double precision[], %s::double precision[])")
+    return len(valeurs)
+
+def materialiser_tout(conn, force=False):
+    """Ajouter les colonnes puis matérialiser gares et arcs dans une transaction"""
+    cursor = conn.cursor()
+    try:
+        ajouter_colonnes_materialisees(cursor)
+        nb_gares = materialiser_gares(cursor, force)
+        nb_arcs = materialiser_arcs(cursor, force)
+        conn.commit()
+        print(f"✅ Coordonnées matérialisées: {nb_gares} gares, {nb_arcs} arcs")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erreur lors de la matérialisation: {e}")
+        return False
+    finally:
+        cursor.close()
+
+def main():
+    """Fonction principale"""
+    print("🚂 ONCF GIS - Matérialisation des coordonnées")
+    print("=" * 50)
+
+    force = '--force' in sys.argv
+    conn = connect_to_database()
+    if not conn:
+        sys.exit(1)
+
+    try:
+        if not materialiser_tout(conn, force):
+            sys.exit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Script de migration: index et objets de base de données requis par l'API
+
+Chaque étape est idempotente (IF NOT EXISTS / OR REPLACE) et peut être
+rejouée sans risque après un import ou une mise à jour de l'application.
+"""
+
+import psycopg2
+import os
+import sys
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Géométries binaires: geometry (PostGIS) si l'extension est disponible, bytea
+# sinon, au lieu de l'EWKB hexadécimal en TEXT; gpr.ewkb() les relit toujours
+# en EWKB binaire. Index spatiaux natifs (PostGIS) et GiST en WGS84 sur les
+# coordonnées matérialisées (types géométriques intégrés, sans extension).
+MIGRATION_GEOMETRIES = (
+    "Géométries binaires (PostGIS ou bytea) et index spatiaux",
+    """
+    CREATE OR REPLACE FUNCTION gpr.ewkb_depuis_hex(t text) RETURNS bytea
+    LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+    BEGIN
+        RETURN decode(NULLIF(btrim(t), ''), 'hex');
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION gpr.ewkb(g bytea) RETURNS bytea
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS 'SELECT g';
+    CREATE OR REPLACE FUNCTION gpr.ewkb(g text) RETURNS bytea
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS 'SELECT gpr.ewkb_depuis_hex(g)';
+
+    DO $$
+    DECLARE
+        colonne RECORD;
+        postgis BOOLEAN;
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'postgis') THEN
+            BEGIN
+                CREATE EXTENSION IF NOT EXISTS postgis;
+            EXCEPTION WHEN insufficient_privilege THEN
+                RAISE NOTICE 'PostGIS non activable (droits insuffisants), stockage bytea';
+            END;
+        END IF;
+        postgis := EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis');
+
+        IF postgis THEN
+            EXECUTE $f$
+                CREATE OR REPLACE FUNCTION gpr.ewkb(g geometry) RETURNS bytea
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE AS 'SELECT ST_AsEWKB(g)';
+
+                CREATE OR REPLACE FUNCTION gpr.geometrie_depuis_ewkb(b bytea) RETURNS geometry
+                LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $c$
+                BEGIN
+                    RETURN ST_GeomFromEWKB(b);
+                EXCEPTION WHEN others THEN
+                    RETURN NULL;
+                END $c$;
+            $f$;
+        END IF;
+
+        FOR colonne IN
+            SELECT table_name, column_name, data_type FROM information_schema.columns
+            WHERE table_schema = 'gpr'
+              AND (table_name, column_name) IN (('gpd_gares_ref', 'geometrie'),
+                                                ('gpd_gares_ref', 'geometrie_dec'),
+                                                ('graphe_arc', 'geometrie'))
+        LOOP
+            IF postgis AND colonne.data_type IN ('text', 'bytea') THEN
+                EXECUTE format('ALTER TABLE gpr.%I ALTER COLUMN %I TYPE geometry '
+                               'USING gpr.geometrie_depuis_ewkb(gpr.ewkb(%I))',
+                               colonne.table_name, colonne.column_name, colonne.column_name);
+            ELSIF NOT postgis AND colonne.data_type = 'text' THEN
+                EXECUTE format('ALTER TABLE gpr.%I ALTER COLUMN %I TYPE bytea USING gpr.ewkb_depuis_hex(%I)',
+                               colonne.table_name, colonne.column_name, colonne.column_name);
+            END IF;
+        END LOOP;
+
+        IF postgis THEN
+            CREATE INDEX IF NOT EXISTS idx_gares_ref_geometrie ON gpr.gpd_gares_ref USING GIST (geometrie);
+            CREATE INDEX IF NOT EXISTS idx_graphe_arc_geometrie ON gpr.graphe_arc USING GIST (geometrie);
+        END IF;
+    END $$;
+
+    -- Emprise WGS84 d'un arc à partir de ses sommets matérialisés
+    CREATE OR REPLACE FUNCTION gpr.emprise_sommets(lons double precision[], lats double precision[])
+    RETURNS box LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT box(point(min(lon), min(lat)), point(max(lon), max(lat)))
+        FROM unnest(lons, lats) AS s(lon, lat)
+    $$;
+
+    ALTER TABLE gpr.gpd_gares_ref
+        ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+    ALTER TABLE gpr.graphe_arc
+        ADD COLUMN IF NOT EXISTS sommets_lon DOUBLE PRECISION[],
+        ADD COLUMN IF NOT EXISTS sommets_lat DOUBLE PRECISION[],
+        ADD COLUMN IF NOT EXISTS sommets_importance DOUBLE PRECISION[];
+
+    CREATE INDEX IF NOT EXISTS idx_gares_position
+        ON gpr.gpd_gares_ref USING GIST (point(longitude, latitude));
+    CREATE INDEX IF NOT EXISTS idx_arcs_emprise
+        ON gpr.graphe_arc USING GIST (gpr.emprise_sommets(sommets_lon, sommets_lat));
+    """
+)
+
+# (description, SQL) appliqués dans l'ordre
+MIGRATIONS = [
+    (
+        "Index de pagination par curseur des événements",
+        """
+        CREATE INDEX IF NOT EXISTS idx_evenements_date_id
+            ON gpr.ge_evenement (date_debut DESC NULLS LAST, id DESC);
+        """
+    ),
+    (
+        "Index des localisations par événement",
+        """
+        CREATE INDEX IF NOT EXISTS idx_localisation_evenement
+            ON gpr.ge_localisation (evenement_id, id);
+        """
+    ),
+    (
+        "Index des filtres d'événements (type, sous-type, état)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_evenements_type_date
+            ON gpr.ge_evenement (type_id, date_debut DESC NULLS LAST, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_evenements_sous_type_date
+            ON gpr.ge_evenement (sous_type_id, date_debut DESC NULLS LAST, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_evenements_etat_date
+            ON gpr.ge_evenement (etat, date_debut DESC NULLS LAST, id DESC);
+        """
+    ),
+    (
+        "Index du tri des événements par date de fin",
+        """
+        CREATE INDEX IF NOT EXISTS idx_evenements_date_fin_id
+            ON gpr.ge_evenement (date_fin DESC NULLS LAST, id DESC);
+        """
+    ),
+    (
+        "Index des localisations par gare",
+        """
+        CREATE INDEX IF NOT EXISTS idx_localisation_gare_debut
+            ON gpr.ge_localisation (gare_debut_id);
+        CREATE INDEX IF NOT EXISTS idx_localisation_gare_fin
+            ON gpr.ge_localisation (gare_fin_id);
+        CREATE INDEX IF NOT EXISTS idx_gares_publishid_axe
+            ON gpr.gpd_gares_ref (publishid, axe);
+        """
+    ),
+    (
+        "Extensions et fonction de recherche approchée des gares",
+        # unaccent() n'est pas IMMUTABLE: l'envelopper pour pouvoir l'indexer
+        """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE EXTENSION IF NOT EXISTS unaccent;
+        CREATE OR REPLACE FUNCTION gpr.sans_accents(texte text) RETURNS text
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texte)) $$;
+        """
+    ),
+    (
+        "Index trigrammes des gares (nom, code, ville)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_gares_nom_trgm
+            ON gpr.gpd_gares_ref USING GIN (gpr.sans_accents(nomgarefr) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_gares_code_trgm
+            ON gpr.gpd_gares_ref USING GIN (gpr.sans_accents(codegare) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_gares_ville_trgm
+            ON gpr.gpd_gares_ref USING GIN (gpr.sans_accents(villes_ville) gin_trgm_ops);
+        """
+    ),
+    (
+        "Vecteur de recherche plein texte (français) des événements",
+        # Colonne générée: recalculée par PostgreSQL à chaque INSERT/UPDATE
+        """
+        ALTER TABLE gpr.ge_evenement
+            ADD COLUMN IF NOT EXISTS recherche tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('french', coalesce(resume, '')), 'A') ||
+                setweight(to_tsvector('french', coalesce(commentaire, '')), 'B') ||
+                setweight(to_tsvector('french', coalesce(extrait, '')), 'C')
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_evenements_recherche
+            ON gpr.ge_evenement USING GIN (recherche);
+        """
+    ),
+    (
+        "Table de synthèse des statistiques",
+        # (domaine, dimension, valeur) -> nombre; valeur '' pour total et NULL
+        """
+        CREATE TABLE IF NOT EXISTS gpr.statistiques_rollup (
+            domaine TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            valeur TEXT NOT NULL DEFAULT '',
+            nombre BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (domaine, dimension, valeur)
+        );
+
+        CREATE OR REPLACE FUNCTION gpr.ajuster_statistique(p_domaine text, p_dimension text,
+                                                           p_valeur text, p_delta bigint)
+        RETURNS void LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO gpr.statistiques_rollup AS s (domaine, dimension, valeur, nombre)
+            VALUES (p_domaine, p_dimension, coalesce(p_valeur, ''), p_delta)
+            ON CONFLICT (domaine, dimension, valeur)
+                DO UPDATE SET nombre = s.nombre + EXCLUDED.nombre;
+            -- Comme un GROUP BY: pas de groupe vide (les totaux restent)
+            DELETE FROM gpr.statistiques_rollup
+            WHERE domaine = p_domaine AND dimension = p_dimension
+              AND valeur = coalesce(p_valeur, '') AND dimension <> 'total' AND nombre = 0;
+        END $$;
+        """
+    ),
+    (
+        "Recalcul complet des statistiques (GROUPING SETS)",
+        """
+        CREATE OR REPLACE FUNCTION gpr.reconstruire_statistiques() RETURNS void
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM gpr.statistiques_rollup;
+
+            INSERT INTO gpr.statistiques_rollup (domaine, dimension, valeur, nombre)
+            SELECT 'gares',
+                   CASE WHEN GROUPING(coalesce(typegare, '')) = 0 THEN 'type'
+                        WHEN GROUPING(coalesce(axe, '')) = 0 THEN 'axe'
+                        ELSE 'total' END,
+                   CASE WHEN GROUPING(coalesce(typegare, '')) = 0 THEN coalesce(typegare, '')
+                        WHEN GROUPING(coalesce(axe, '')) = 0 THEN coalesce(axe, '')
+                        ELSE '' END,
+                   COUNT(*)
+            FROM gpr.gpd_gares_ref
+            GROUP BY GROUPING SETS ((coalesce(typegare, '')), (coalesce(axe, '')), ());
+
+            INSERT INTO gpr.statistiques_rollup (domaine, dimension, valeur, nombre)
+            SELECT 'arcs',
+                   CASE WHEN GROUPING(coalesce(axe, '')) = 0 THEN 'axe' ELSE 'total' END,
+                   CASE WHEN GROUPING(coalesce(axe, '')) = 0 THEN coalesce(axe, '') ELSE '' END,
+                   COUNT(*)
+            FROM gpr.graphe_arc
+            GROUP BY GROUPING SETS ((coalesce(axe, '')), ());
+
+            INSERT INTO gpr.statistiques_rollup (domaine, dimension, valeur, nombre)
+            SELECT 'evenements',
+                   CASE WHEN GROUPING(coalesce(etat, '')) = 0 THEN 'statut' ELSE 'total' END,
+                   CASE WHEN GROUPING(coalesce(etat, '')) = 0 THEN coalesce(etat, '') ELSE '' END,
+                   COUNT(*)
+            FROM gpr.ge_evenement
+            GROUP BY GROUPING SETS ((coalesce(etat, '')), ());
+
+            INSERT INTO gpr.statistiques_rollup (domaine, dimension, valeur, nombre)
+            SELECT 'types', v.dimension, '', v.nombre
+            FROM (SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE etat = true) AS actifs
+                  FROM gpr.ref_types) t,
+                 LATERAL (VALUES ('total', t.total), ('actifs', t.actifs)) AS v(dimension, nombre);
+        END $$;
+        """
+    ),
+    (
+        "Triggers de mise à jour incrémentale des statistiques",
+        """
+        CREATE OR REPLACE FUNCTION gpr.statistiques_gares() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.typegare IS NOT DISTINCT FROM OLD.typegare
+                                AND NEW.axe IS NOT DISTINCT FROM OLD.axe THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM gpr.ajuster_statistique('gares', 'total', '', -1);
+                PERFORM gpr.ajuster_statistique('gares', 'type', OLD.typegare, -1);
+                PERFORM gpr.ajuster_statistique('gares', 'axe', OLD.axe, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM gpr.ajuster_statistique('gares', 'total', '', 1);
+                PERFORM gpr.ajuster_statistique('gares', 'type', NEW.typegare, 1);
+                PERFORM gpr.ajuster_statistique('gares', 'axe', NEW.axe, 1);
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.statistiques_arcs() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.axe IS NOT DISTINCT FROM OLD.axe THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM gpr.ajuster_statistique('arcs', 'total', '', -1);
+                PERFORM gpr.ajuster_statistique('arcs', 'axe', OLD.axe, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM gpr.ajuster_statistique('arcs', 'total', '', 1);
+                PERFORM gpr.ajuster_statistique('arcs', 'axe', NEW.axe, 1);
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.statistiques_evenements() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.etat IS NOT DISTINCT FROM OLD.etat THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM gpr.ajuster_statistique('evenements', 'total', '', -1);
+                PERFORM gpr.ajuster_statistique('evenements', 'statut', OLD.etat, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM gpr.ajuster_statistique('evenements', 'total', '', 1);
+                PERFORM gpr.ajuster_statistique('evenements', 'statut', NEW.etat, 1);
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.statistiques_types() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM gpr.ajuster_statistique('types', 'total', '', -1);
+                IF OLD.etat THEN
+                    PERFORM gpr.ajuster_statistique('types', 'actifs', '', -1);
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM gpr.ajuster_statistique('types', 'total', '', 1);
+                IF NEW.etat THEN
+                    PERFORM gpr.ajuster_statistique('types', 'actifs', '', 1);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        -- TRUNCATE (imports) ne déclenche pas les triggers de ligne: tout recalculer
+        CREATE OR REPLACE FUNCTION gpr.statistiques_apres_truncate() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM gpr.reconstruire_statistiques();
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS trg_statistiques ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_statistiques AFTER INSERT OR UPDATE OR DELETE ON gpr.gpd_gares_ref
+            FOR EACH ROW EXECUTE FUNCTION gpr.statistiques_gares();
+        DROP TRIGGER IF EXISTS trg_statistiques ON gpr.graphe_arc;
+        CREATE TRIGGER trg_statistiques AFTER INSERT OR UPDATE OR DELETE ON gpr.graphe_arc
+            FOR EACH ROW EXECUTE FUNCTION gpr.statistiques_arcs();
+        DROP TRIGGER IF EXISTS trg_statistiques ON gpr.ge_evenement;
+        CREATE TRIGGER trg_statistiques AFTER INSERT OR UPDATE OR DELETE ON gpr.ge_evenement
+            FOR EACH ROW EXECUTE FUNCTION gpr.statistiques_evenements();
+        DROP TRIGGER IF EXISTS trg_statistiques ON gpr.ref_types;
+        CREATE TRIGGER trg_statistiques AFTER INSERT OR UPDATE OR DELETE ON gpr.ref_types
+            FOR EACH ROW EXECUTE FUNCTION gpr.statistiques_types();
+
+        DROP TRIGGER IF EXISTS trg_statistiques_truncate ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_statistiques_truncate AFTER TRUNCATE ON gpr.gpd_gares_ref
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.statistiques_apres_truncate();
+        DROP TRIGGER IF EXISTS trg_statistiques_truncate ON gpr.graphe_arc;
+        CREATE TRIGGER trg_statistiques_truncate AFTER TRUNCATE ON gpr.graphe_arc
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.statistiques_apres_truncate();
+        DROP TRIGGER IF EXISTS trg_statistiques_truncate ON gpr.ge_evenement;
+        CREATE TRIGGER trg_statistiques_truncate AFTER TRUNCATE ON gpr.ge_evenement
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.statistiques_apres_truncate();
+        DROP TRIGGER IF EXISTS trg_statistiques_truncate ON gpr.ref_types;
+        CREATE TRIGGER trg_statistiques_truncate AFTER TRUNCATE ON gpr.ref_types
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.statistiques_apres_truncate();
+
+        -- Point de départ cohérent avec les tables actuelles
+        SELECT gpr.reconstruire_statistiques();
+        """
+    ),
+    (
+        "Journal des modifications d'événements",
+        """
+        CREATE TABLE IF NOT EXISTS gpr.ge_evenement_changement (
+            seq BIGSERIAL PRIMARY KEY,
+            evenement_id INTEGER,
+            operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete', 'reset')),
+            modifie_le TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        -- 'reset' (evenement_id NULL): tables remplacées en bloc (TRUNCATE, échange),
+        -- les clients doivent tout recharger. Mise à niveau des journaux existants:
+        ALTER TABLE gpr.ge_evenement_changement ALTER COLUMN evenement_id DROP NOT NULL;
+        ALTER TABLE gpr.ge_evenement_changement DROP CONSTRAINT IF EXISTS ge_evenement_changement_operation_check;
+        ALTER TABLE gpr.ge_evenement_changement ADD CONSTRAINT ge_evenement_changement_operation_check
+            CHECK (operation IN ('insert', 'update', 'delete', 'reset'));
+
+        -- Les écritures du journal sont sérialisées (verrou consultatif tenu jusqu'au
+        -- COMMIT): l'ordre des seq est celui des commits et un client qui a lu
+        -- jusqu'à seq N ne peut pas manquer une modification N' < N validée plus tard.
+        -- Le verrou est pris au début de l'instruction, avant tout verrou de ligne:
+        -- pris ligne à ligne, il formait un cycle avec les verrous de ligne d'une
+        -- autre transaction (import incrémental et écritures de l'API).
+        CREATE OR REPLACE FUNCTION gpr.verrouiller_journal_evenements() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('gpr.ge_evenement_changement'));
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.reinitialiser_journal_evenements() RETURNS void
+        LANGUAGE sql AS $$
+            SELECT pg_advisory_xact_lock(hashtext('gpr.ge_evenement_changement'));
+            INSERT INTO gpr.ge_evenement_changement (evenement_id, operation) VALUES (NULL, 'reset');
+        $$;
+
+        CREATE OR REPLACE FUNCTION gpr.journaliser_reinitialisation() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM gpr.reinitialiser_journal_evenements();
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.journaliser_evenement() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'ge_localisation' THEN
+                -- Une localisation modifie la représentation de son événement
+                IF TG_OP <> 'INSERT' AND OLD.evenement_id IS NOT NULL THEN
+                    INSERT INTO gpr.ge_evenement_changement (evenement_id, operation)
+                    VALUES (OLD.evenement_id, 'update');
+                END IF;
+                IF TG_OP = 'INSERT' AND NEW.evenement_id IS NOT NULL THEN
+                    INSERT INTO gpr.ge_evenement_changement (evenement_id, operation)
+                    VALUES (NEW.evenement_id, 'update');
+                ELSIF TG_OP = 'UPDATE' THEN
+                    IF NEW.evenement_id IS DISTINCT FROM OLD.evenement_id AND NEW.evenement_id IS NOT NULL THEN
+                        INSERT INTO gpr.ge_evenement_changement (evenement_id, operation)
+                        VALUES (NEW.evenement_id, 'update');
+                    END IF;
+                END IF;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO gpr.ge_evenement_changement (evenement_id, operation)
+                VALUES (OLD.id, 'delete');
+            ELSE
+                INSERT INTO gpr.ge_evenement_changement (evenement_id, operation)
+                VALUES (NEW.id, lower(TG_OP));
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS trg_journal_verrou ON gpr.ge_evenement;
+        CREATE TRIGGER trg_journal_verrou BEFORE INSERT OR UPDATE OR DELETE ON gpr.ge_evenement
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.verrouiller_journal_evenements();
+        DROP TRIGGER IF EXISTS trg_journal_verrou ON gpr.ge_localisation;
+        CREATE TRIGGER trg_journal_verrou BEFORE INSERT OR UPDATE OR DELETE ON gpr.ge_localisation
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.verrouiller_journal_evenements();
+        DROP TRIGGER IF EXISTS trg_journal ON gpr.ge_evenement;
+        CREATE TRIGGER trg_journal AFTER INSERT OR UPDATE OR DELETE ON gpr.ge_evenement
+            FOR EACH ROW EXECUTE FUNCTION gpr.journaliser_evenement();
+        DROP TRIGGER IF EXISTS trg_journal ON gpr.ge_localisation;
+        CREATE TRIGGER trg_journal AFTER INSERT OR UPDATE OR DELETE ON gpr.ge_localisation
+            FOR EACH ROW EXECUTE FUNCTION gpr.journaliser_evenement();
+        DROP TRIGGER IF EXISTS trg_journal_truncate ON gpr.ge_evenement;
+        CREATE TRIGGER trg_journal_truncate AFTER TRUNCATE ON gpr.ge_evenement
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.journaliser_reinitialisation();
+        DROP TRIGGER IF EXISTS trg_journal_truncate ON gpr.ge_localisation;
+        CREATE TRIGGER trg_journal_truncate AFTER TRUNCATE ON gpr.ge_localisation
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.journaliser_reinitialisation();
+        """
+    ),
+    (
+        "Notifications (NOTIFY) des modifications",
+        # evenements_changements: une notification par entrée du journal (flux SSE)
+        # tables_modifiees: nom logique de la table, pour invalider caches et ETags
+        # de tous les processus de l'application; envoyées au COMMIT
+        """
+        CREATE OR REPLACE FUNCTION gpr.notifier_changement_evenement() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('evenements_changements', json_build_object(
+                'seq', NEW.seq,
+                'evenement_id', NEW.evenement_id,
+                'operation', NEW.operation
+            )::text);
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.ge_evenement_changement;
+        CREATE TRIGGER trg_notification AFTER INSERT ON gpr.ge_evenement_changement
+            FOR EACH ROW EXECUTE FUNCTION gpr.notifier_changement_evenement();
+
+        CREATE OR REPLACE FUNCTION gpr.notifier_table_modifiee() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('tables_modifiees', TG_ARGV[0]);
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_notification AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.gpd_gares_ref
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.notifier_table_modifiee('gares');
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.graphe_arc;
+        CREATE TRIGGER trg_notification AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.graphe_arc
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.notifier_table_modifiee('arcs');
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.ge_evenement;
+        CREATE TRIGGER trg_notification AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.ge_evenement
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.notifier_table_modifiee('evenements');
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.ge_localisation;
+        CREATE TRIGGER trg_notification AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.ge_localisation
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.notifier_table_modifiee('evenements');
+        DROP TRIGGER IF EXISTS trg_notification ON gpr.ref_types;
+        CREATE TRIGGER trg_notification AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.ref_types
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.notifier_table_modifiee('types');
+        """
+    ),
+    MIGRATION_GEOMETRIES,
+    (
+        "Journal des emprises modifiées (invalidation des tuiles vectorielles)",
+        # Une ligne par emprise WGS84 de gare ou d'arc modifiée (avant et après);
+        # emprise NULL: toutes les tuiles. L'application applique les lignes dont
+        # seq dépasse la dernière appliquée (voir synchroniser_cache_tuiles)
+        """
+        CREATE TABLE IF NOT EXISTS gpr.tuiles_invalidees (
+            seq BIGSERIAL PRIMARY KEY,
+            emprise BOX
+        );
+        ALTER TABLE gpr.tuiles_invalidees
+            ADD COLUMN IF NOT EXISTS journalise_le TIMESTAMPTZ NOT NULL DEFAULT now();
+
+        -- Horizon de purge (une ligne): les entrées de seq <= horizon ont été supprimées;
+        -- un processus qui n'avait pas appliqué jusque-là doit vider son cache
+        CREATE TABLE IF NOT EXISTS gpr.tuiles_invalidees_horizon (horizon BIGINT NOT NULL);
+        INSERT INTO gpr.tuiles_invalidees_horizon (horizon)
+        SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM gpr.tuiles_invalidees_horizon);
+
+        -- Supprimer les entrées plus anciennes que `conservation` (appliquées depuis
+        -- longtemps par tous les processus); retourne le nombre d'entrées supprimées
+        CREATE OR REPLACE FUNCTION gpr.purger_tuiles_invalidees(conservation interval) RETURNS bigint
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            limite bigint;
+            nombre bigint;
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('gpr.tuiles_invalidees'));
+            SELECT max(seq) INTO limite FROM gpr.tuiles_invalidees
+            WHERE journalise_le < now() - conservation;
+            IF limite IS NULL THEN
+                RETURN 0;
+            END IF;
+            DELETE FROM gpr.tuiles_invalidees WHERE seq <= limite;
+            GET DIAGNOSTICS nombre = ROW_COUNT;
+            UPDATE gpr.tuiles_invalidees_horizon SET horizon = greatest(horizon, limite);
+            RETURN nombre;
+        END $$;
+
+        -- Invalide tout et purge le journal: les lignes antérieures deviennent inutiles
+        CREATE OR REPLACE FUNCTION gpr.invalider_toutes_tuiles() RETURNS void
+        LANGUAGE sql AS $$
+            SELECT pg_advisory_xact_lock(hashtext('gpr.tuiles_invalidees'));
+            DELETE FROM gpr.tuiles_invalidees;
+            INSERT INTO gpr.tuiles_invalidees (emprise) VALUES (NULL);
+        $$;
+
+        -- Écritures sérialisées jusqu'au COMMIT: les seq deviennent visibles dans
+        -- l'ordre, un lecteur ne peut pas dépasser une ligne encore invisible. Le
+        -- verrou est pris au début de l'instruction, avant tout verrou de ligne
+        -- (comme pour le journal des événements)
+        CREATE OR REPLACE FUNCTION gpr.verrouiller_journal_tuiles() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('gpr.tuiles_invalidees'));
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION gpr.journaliser_tuiles() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            ancienne box;
+            nouvelle box;
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                PERFORM gpr.invalider_toutes_tuiles();
+                RETURN NULL;
+            END IF;
+            IF TG_TABLE_NAME = 'gpd_gares_ref' THEN
+                IF TG_OP <> 'INSERT' THEN
+                    ancienne := box(point(OLD.longitude, OLD.latitude), point(OLD.longitude, OLD.latitude));
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    nouvelle := box(point(NEW.longitude, NEW.latitude), point(NEW.longitude, NEW.latitude));
+                END IF;
+            ELSE
+                IF TG_OP <> 'INSERT' THEN
+                    ancienne := gpr.emprise_sommets(OLD.sommets_lon, OLD.sommets_lat);
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    nouvelle := gpr.emprise_sommets(NEW.sommets_lon, NEW.sommets_lat);
+                END IF;
+            END IF;
+            IF ancienne ~= nouvelle THEN
+                ancienne := NULL;
+            END IF;
+            INSERT INTO gpr.tuiles_invalidees (emprise)
+            SELECT emprise FROM unnest(ARRAY[ancienne, nouvelle]) AS emprise
+            WHERE emprise IS NOT NULL;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS trg_tuiles_verrou ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_tuiles_verrou BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.gpd_gares_ref
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.verrouiller_journal_tuiles();
+        DROP TRIGGER IF EXISTS trg_tuiles ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_tuiles AFTER INSERT OR UPDATE OR DELETE ON gpr.gpd_gares_ref
+            FOR EACH ROW EXECUTE FUNCTION gpr.journaliser_tuiles();
+        DROP TRIGGER IF EXISTS trg_tuiles_truncate ON gpr.gpd_gares_ref;
+        CREATE TRIGGER trg_tuiles_truncate AFTER TRUNCATE ON gpr.gpd_gares_ref
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.journaliser_tuiles();
+        DROP TRIGGER IF EXISTS trg_tuiles_verrou ON gpr.graphe_arc;
+        CREATE TRIGGER trg_tuiles_verrou BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON gpr.graphe_arc
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.verrouiller_journal_tuiles();
+        DROP TRIGGER IF EXISTS trg_tuiles ON gpr.graphe_arc;
+        CREATE TRIGGER trg_tuiles AFTER INSERT OR UPDATE OR DELETE ON gpr.graphe_arc
+            FOR EACH ROW EXECUTE FUNCTION gpr.journaliser_tuiles();
+        DROP TRIGGER IF EXISTS trg_tuiles_truncate ON gpr.graphe_arc;
+        CREATE TRIGGER trg_tuiles_truncate AFTER TRUNCATE ON gpr.graphe_arc
+            FOR EACH STATEMENT EXECUTE FUNCTION gpr.journaliser_tuiles();
+        """
+    ),
+]
+
+def connect_to_database():
+    """Établir une connexion à la base de données PostgreSQL"""
+    try:
+        conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+        return conn
+    except Exception as e:
+        print(f"❌ Erreur de connexion à la base de données: {e}")
+        return None
+
+def appliquer_migrations(conn, migrations=None):
+    """Appliquer les migrations (toutes par défaut), chacune dans sa propre transaction"""
+    cursor = conn.cursor()
+    echecs = 0
+
+    try:
+        for description, sql in (MIGRATIONS if migrations is None else migrations):
+            try:
+                cursor.execute(sql)
+                conn.commit()
+                print(f"✅ {description}")
+            except Exception as e:
+                conn.rollback()
+                echecs += 1
+                print(f"⚠️  {description}: {e}")
+    finally:
+        cursor.close()
+
+    return echecs == 0
+
+def main():
+    """Fonction principale"""
+    print("🚂 ONCF GIS - Migration de la base de données")
+    print("=" * 50)
+
+    conn = connect_to_database()
+    if not conn:
+        sys.exit(1)
+
+    try:
+        if not appliquer_migrations(conn):
+            print("\n⚠️  Certaines migrations ont échoué")
+            sys.exit(1)
+        print("\n🎉 Base de données à jour")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Écoute des notifications PostgreSQL (LISTEN/NOTIFY) et diffusion aux abonnés
+
+Une seule connexion par processus écoute les canaux et appelle les rappels
+enregistrés; DiffuseurFlux répartit les messages entre les flux SSE ouverts
+sans qu'aucun d'eux n'interroge la base.
+"""
+
+import queue
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+class EcouteurNotifications:
+    """Thread d'écoute LISTEN sur une connexion dédiée, reconnecté en cas d'erreur"""
+
+    def __init__(self, dsn, intervalle=5.0, delai_reconnexion=5.0):
+        self.dsn = dsn
+        self.intervalle = intervalle
+        self.delai_reconnexion = delai_reconnexion
+        self._rappels = {}
+        self._rappels_reconnexion = []
+        self._deja_connecte = False
+        self._verrou = threading.Lock()
+        self._thread = None
+        self.connecte = False
+
+    def ajouter_rappel(self, canal, rappel, avec_emetteur=False):
+        """Appeler rappel(charge) à chaque notification reçue sur le canal
+
+        Avec avec_emetteur, rappel(charge, pid) reçoit aussi le pid du backend
+        PostgreSQL qui a émis la notification.
+        """
+        with self._verrou:
+            self._rappels.setdefault(canal, []).append((rappel, avec_emetteur))
+
+    def ajouter_rappel_reconnexion(self, rappel):
+        """Appeler rappel() après chaque reconnexion: les notifications émises
+        pendant la coupure sont perdues, les états qui en dépendent sont à refaire"""
+        with self._verrou:
+            self._rappels_reconnexion.append(rappel)
+
+    def demarrer(self):
+        """Lancer le thread d'écoute (sans effet s'il tourne déjà)"""
+        if self._thread is not None:
+            return
+        with self._verrou:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._boucle, name='ecouteur-notifications',
+                                                daemon=True)
+                self._thread.start()
+
+    def _ecouter(self):
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                for canal in list(self._rappels):
+                    cursor.execute(f'LISTEN "{canal}"')
+            self.connecte = True
+            if self._deja_connecte:
+                for rappel in self._rappels_reconnexion:
+                    try:
+                        rappel()
+                    except Exception as e:
+                        print(f"⚠️  Reconnexion aux notifications: {e}")
+            self._deja_connecte = True
+            while True:
+                if select.select([conn], [], [], self.intervalle) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    for rappel, avec_emetteur in self._rappels.get(notification.channel, []):
+                        try:
+                            if avec_emetteur:
+                                rappel(notification.payload, notification.pid)
+                            else:
+                                rappel(notification.payload)
+                        except Exception as e:
+                            print(f"⚠️  Notification {notification.channel}: {e}")
+        finally:
+            self.connecte = False
+            conn.close()
+
+    def _boucle(self):
+        while True:
+            try:
+                self._ecouter()
+            except Exception as e:
+                print(f"⚠️  Écoute des notifications interrompue: {e}")
+            time.sleep(self.delai_reconnexion)
+
+class Abonnement:
+    """File de messages d'un abonné; en_retard si des messages ont été perdus"""
+
+    def __init__(self, taille_max):
+        self.file = queue.Queue(maxsize=taille_max)
+        self.en_retard = False
+
+class DiffuseurFlux:
+    """Répartition des messages entre abonnés, sans bloquer sur un abonné lent"""
+
+    def __init__(self, taille_file=1000):
+        self.taille_file = taille_file
+        self._abonnes = set()
+        self._verrou = threading.Lock()
+
+    def abonner(self):
+        abonnement = Abonnement(self.taille_file)
+        with self._verrou:
+            self._abonnes.add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            self._abonnes.discard(abonnement)
+
+    def publier(self, message):
+        """Déposer un message dans la file de chaque abonné"""
+        with self._verrou:
+            abonnes = list(self._abonnes)
+        for abonnement in abonnes:
+            try:
+                abonnement.file.put_nowait(message)
+            except queue.Full:
+                abonnement.en_retard = True
+
+    def signaler_retard(self):
+        """Marquer tous les abonnés en retard (messages perdus): ils rattrapent depuis le journal"""
+        with self._verrou:
+            for abonnement in self._abonnes:
+                abonnement.en_retard = True
+
+    def __len__(self):
+        return len(self._abonnes)
@@ -0,0 +1,98 @@
+"""
+Registre des transformations de coordonnées (pyproj) partagé par tout le processus
+"""
+
+import threading
+
+import numpy as np
+
+# Rayon de la sphère Web Mercator (EPSG:3857)
+RAYON_MERCATOR = 6378137.0
+
+CRS_WGS84 = "EPSG:4326"
+
+# Transformateurs pyproj construits une seule fois, indexés par (source, cible)
+_transformateurs = {}
+_verrou = threading.Lock()
+
+def normaliser_crs(crs):
+    """Normaliser un SRID entier ou une chaîne 'EPSG:xxxx' en 'EPSG:xxxx'"""
+    if isinstance(crs, int):
+        return f"EPSG:{crs}"
+    return str(crs).upper()
+
+def obtenir_transformateur(source, cible=CRS_WGS84):
+    """Retourner le Transformer pyproj source -> cible, construit une fois par processus
+
+    Lève ImportError si pyproj n'est pas installé. Les Transformer de
+    pyproj >= 3.1 peuvent être partagés entre threads.
+    """
+    cle = (normaliser_crs(source), normaliser_crs(cible))
+    transformateur = _transformateurs.get(cle)
+    if transformateur is None:
+        from pyproj import Transformer
+
+        with _verrou:
+            transformateur = _transformateurs.get(cle)
+            if transformateur is None:
+                transformateur = Transformer.from_crs(cle[0], cle[1], always_xy=True)
+                _transformateurs[cle] = transformateur
+    return transformateur
+
+def _mercator_vers_wgs84(x, y):
+    """Inverse analytique de Web Mercator, utilisé sans pyproj"""
+    lon = np.degrees(x / RAYON_MERCATOR)
+    lat = np.degrees(np.arctan(np.sinh(y / RAYON_MERCATOR)))
+    return lon, lat
+
+def transformer_tableaux(x, y, source, cible=CRS_WGS84):
+    """Transformer des tableaux de coordonnées en un seul appel
+
+    Retourne deux tableaux NumPy (x, y) dans le système cible.
+    """
+    source, cible = normaliser_crs(source), normaliser_crs(cible)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if source == cible:
+        return x.copy(), y.copy()
+    if (source, cible) == ("EPSG:3857", CRS_WGS84):
+        # Formule fermée: identique à pyproj et disponible sans dépendance
+        return _mercator_vers_wgs84(x, y)
+
+    tx, ty = obtenir_transformateur(source, cible).transform(x, y)
+    return np.asarray(tx, dtype=float), np.asarray(ty, dtype=float)
+
+def transformer_candidats(x, y, srid, candidats, valide, cible=CRS_WGS84):
+    """Essayer des systèmes candidats sur des tableaux jusqu'à obtenir des coordonnées valides
+
+    Chaque candidat transforme en une fois toutes les lignes encore non
+    résolues; `valide(lon, lat)` renvoie le masque des lignes acceptées.
+    Les candidats sont toujours essayés dans l'ordre donné, comme le fait
+    le parseur ligne à ligne: le résultat d'une ligne ne dépend pas des lots
+    décodés auparavant (seuls les Transformer sont mémorisés).
+
+    Retourne (lon, lat, resolu); les lignes non résolues valent NaN.
+    """
+    n = len(x)
+    lon = np.full(n, np.nan)
+    lat = np.full(n, np.nan)
+    restants = np.arange(n)
+
+    for crs in candidats:
+        if not len(restants):
+            break
+        try:
+            lon_crs, lat_crs = transformer_tableaux(x[restants], y[restants], crs, cible)
+        except ImportError:
+            raise
+        except Exception:
+            continue
+        ok = valide(lon_crs, lat_crs)
+        if ok.any():
+            lon[restants[ok]] = lon_crs[ok]
+            lat[restants[ok]] = lat_crs[ok]
+            restants = restants[~ok]
+
+    resolu = np.ones(n, dtype=bool)
+    resolu[restants] = False
+    return lon, lat, resolu
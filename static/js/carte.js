@@ -5,12 +5,15 @@ let garesLayer;
 let arcsLayer;
 let incidentsLayer;
 let selectedGare = null;
+let viewportTimer = null;
+// Numéro de la dernière requête par couche: les réponses périmées sont ignorées
+const viewportRequests = { gares: 0, arcs: 0, incidents: 0 };
 
 // Variables de pagination pour les incidents
 let currentIncidentPage = 1;
 let totalIncidentPages = 1;
 let incidentsPerPage = 50;
-let allIncidents = [];
+let totalIncidents = 0;
 let currentIncidents = [];
 
 // Configuration de la carte
@@ -21,6 +24,10 @@ const MAP_CONFIG = {
     maxZoom: 18
 };
 
+// Marge chargée autour de la vue (fraction de sa taille) et délai avant rechargement
+const VIEWPORT_PADDING = 0.2;
+const VIEWPORT_DELAY = 300;
+
 // Initialisation de la carte
 function initONCFMap() {
     // Créer la carte
@@ -52,13 +59,32 @@ function initONCFMap() {
     setupMapEvents();
 }
 
-// Charger les données de la carte
+// Emprise courante de la carte au format bbox de l'API (minLon,minLat,maxLon,maxLat)
+function viewportBbox() {
+    const bounds = map.getBounds().pad(VIEWPORT_PADDING);
+    return [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+        .map(value => value.toFixed(5))
+        .join(',');
+}
+
+// Charger les données de la carte visibles dans la vue courante
 function loadMapData() {
-    // Charger toutes les gares pour la carte
-    fetch('/api/gares?all=true')
+    loadGares();
+
+    // Charger les arcs
+    loadArcs();
+        
+    // Charger les incidents
+    loadAllIncidents();
+}
+
+// Charger les gares de la vue courante
+function loadGares() {
+    const request = ++viewportRequests.gares;
+    fetch(`/api/gares?all=true&bbox=${viewportBbox()}`)
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
+            if (data.success && request === viewportRequests.gares) {
                 addGaresToMap(data.data);
             }
         })
@@ -66,12 +92,16 @@ function loadMapData() {
             console.error('Erreur lors du chargement des gares:', error);
             showNotification('Erreur lors du chargement des gares', 'error');
         });
+}
 
-    // Charger les arcs
-    fetch('/api/arcs')
+// Charger les arcs de la vue courante, simplifiés pour le niveau de zoom
+function loadArcs() {
+    const zoom = map.getZoom();
+    const request = ++viewportRequests.arcs;
+    fetch(`/api/arcs?zoom=${zoom}&bbox=${viewportBbox()}`)
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
+            if (data.success && request === viewportRequests.arcs) {
                 addArcsToMap(data.data);
             }
         })
@@ -79,9 +109,6 @@ function loadMapData() {
             console.error('Erreur lors du chargement des arcs:', error);
             showNotification('Erreur lors du chargement des voies', 'error');
         });
-        
-    // Charger tous les incidents
-    loadAllIncidents();
 }
 
 // Ajouter les gares à la carte
@@ -494,7 +521,7 @@ function resetMap() {
     map.addLayer(incidentsLayer);
     
     // Réinitialiser la pagination des incidents
-    if (allIncidents.length > 0) {
+    if (totalIncidents > 0) {
         currentIncidentPage = 1;
         showIncidentsPage(1);
     }
@@ -577,6 +604,13 @@ function setupMapEvents() {
         // Ajuster la taille des marqueurs selon le zoom
         console.log('Nouveau zoom:', zoom);
     });
+    
+    // Recharger les données de la nouvelle vue une fois le déplacement terminé
+    // (moveend suit aussi chaque zoom; les arcs sont alors simplifiés au nouveau niveau)
+    map.on('moveend', () => {
+        clearTimeout(viewportTimer);
+        viewportTimer = setTimeout(loadMapData, VIEWPORT_DELAY);
+    });
 }
 
 // Fonction globale pour centrer sur une gare
@@ -627,17 +661,29 @@ function showNotification(message, type = 'info') {
 
 // Fonctions de pagination pour les incidents
 function loadAllIncidents() {
-    fetch('/api/evenements?per_page=348')
+    currentIncidentPage = 1;
+    showIncidentsPage(1);
+}
+
+function showIncidentsPage(page) {
+    // Seule la page affichée, restreinte à la vue courante, est demandée au serveur
+    const request = ++viewportRequests.incidents;
+    return fetch(`/api/evenements?page=${page}&per_page=${incidentsPerPage}&bbox=${viewportBbox()}`)
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
-                allIncidents = data.data;
-                totalIncidentPages = Math.ceil(allIncidents.length / incidentsPerPage);
-                currentIncidentPage = 1;
+            if (data.success && request === viewportRequests.incidents) {
+                currentIncidents = data.data;
+                totalIncidents = data.pagination.total || 0;
+                totalIncidentPages = data.pagination.pages || 1;
+                currentIncidentPage = page;
+                
+                // Effacer les incidents existants et ajouter les nouveaux
+                incidentsLayer.clearLayers();
+                addIncidentsToMap(currentIncidents);
                 
-                console.log(`✅ ${allIncidents.length} incidents chargés au total`);
-                showIncidentsPage(1);
-                updateIncidentPaginationInfo();
+                // Mettre à jour les contrôles de pagination
+                updateIncidentPaginationControls();
+                updateMapStats();
             }
         })
         .catch(error => {
@@ -646,26 +692,12 @@ function loadAllIncidents() {
         });
 }
 
-function showIncidentsPage(page) {
-    const startIndex = (page - 1) * incidentsPerPage;
-    const endIndex = startIndex + incidentsPerPage;
-    currentIncidents = allIncidents.slice(startIndex, endIndex);
-    
-    // Effacer les incidents existants et ajouter les nouveaux
-    incidentsLayer.clearLayers();
-    addIncidentsToMap(currentIncidents);
-    
-    // Mettre à jour les contrôles de pagination
-    updateIncidentPaginationControls();
-    updateMapStats();
-}
-
 function updateIncidentPaginationInfo() {
     const infoElement = document.getElementById('incidentPaginationInfo');
     const pageInfoElement = document.getElementById('incidentPageInfo');
     
     if (infoElement && pageInfoElement) {
-        infoElement.textContent = `Affichage des incidents ${(currentIncidentPage - 1) * incidentsPerPage + 1} à ${Math.min(currentIncidentPage * incidentsPerPage, allIncidents.length)} sur ${allIncidents.length} au total`;
+        infoElement.textContent = `Affichage des incidents ${(currentIncidentPage - 1) * incidentsPerPage + 1} à ${Math.min(currentIncidentPage * incidentsPerPage, totalIncidents)} sur ${totalIncidents} au total`;
         pageInfoElement.textContent = `Page ${currentIncidentPage} sur ${totalIncidentPages}`;
     }
 }
@@ -688,15 +720,13 @@ function updateIncidentPaginationControls() {
 
 function loadNextIncidents() {
     if (currentIncidentPage < totalIncidentPages) {
-        currentIncidentPage++;
-        showIncidentsPage(currentIncidentPage);
+        showIncidentsPage(currentIncidentPage + 1);
     }
 }
 
 function loadPreviousIncidents() {
     if (currentIncidentPage > 1) {
-        currentIncidentPage--;
-        showIncidentsPage(currentIncidentPage);
+        showIncidentsPage(currentIncidentPage - 1);
     }
 }
 
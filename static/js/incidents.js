@@ -7,6 +7,8 @@
 let allIncidents = [];
 let filteredIncidents = [];
 let currentPage = 1;
+let totalIncidents = 0;
+let totalPages = 0;
 let itemsPerPage = 50; // Augmenté de 12 à 50 pour afficher plus d'incidents
 let incidentTypes = [];
 let locations = [];
@@ -46,20 +48,85 @@ function setupEventListeners() {
     document.getElementById('periodFilter').addEventListener('change', applyFilters);
     document.getElementById('searchFilter').addEventListener('input', debounce(applyFilters, 500));
     
-    // Actualisation automatique toutes les 5 minutes
-    setInterval(refreshIncidents, 5 * 60 * 1000);
+    // Mises à jour en direct poussées par le serveur (SSE), sinon actualisation toutes les 5 minutes
+    if (window.EventSource) {
+        const flux = new EventSource('/api/stream/evenements');
+        const actualiser = debounce(refreshIncidents, 1000);
+        ['insert', 'update', 'delete', 'reset'].forEach(type => flux.addEventListener(type, actualiser));
+    } else {
+        setInterval(refreshIncidents, 5 * 60 * 1000);
+    }
+}
+
+/**
+ * Construire les paramètres de filtrage envoyés à l'API
+ */
+function buildFilterParams() {
+    const filters = {};
+    const statusFilter = document.getElementById('statusFilter');
+    const periodFilter = document.getElementById('periodFilter');
+    const searchFilter = document.getElementById('searchFilter');
+    
+    if (statusFilter && statusFilter.value) {
+        filters.etat = statusFilter.value;
+    }
+    
+    if (searchFilter && searchFilter.value.trim()) {
+        filters.q = searchFilter.value.trim();
+    }
+    
+    // Types sélectionnés
+    const selectedTypes = Array.from(document.querySelectorAll('.type-chip.active'))
+        .map(chip => chip.dataset.typeId);
+    if (selectedTypes.length > 0) {
+        filters.type = selectedTypes.join(',');
+    }
+    
+    // Filtre par période: borne inférieure sur la date de début
+    if (periodFilter && periodFilter.value) {
+        const now = new Date();
+        let since = null;
+        switch (periodFilter.value) {
+            case 'today':
+                since = new Date(now.getFullYear(), now.getMonth(), now.getDate());
+                break;
+            case 'week':
+                since = new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000);
+                break;
+            case 'month':
+                since = new Date(now.getFullYear(), now.getMonth(), 1);
+                break;
+            case 'year':
+                since = new Date(now.getFullYear(), 0, 1);
+                break;
+        }
+        if (since) {
+            filters.date_min = formatLocalDateTime(since);
+        }
+    }
+    
+    return filters;
+}
+
+/**
+ * Formater une date locale au format ISO sans fuseau (YYYY-MM-DDTHH:MM:SS)
+ */
+function formatLocalDateTime(date) {
+    const pad = n => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}` +
+        `T${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(date.getSeconds())}`;
 }
 
 /**
- * Charger les incidents depuis l'API
+ * Charger la page courante des incidents depuis l'API (filtrage et pagination côté serveur)
  */
-async function loadIncidents(page = 1, filters = {}) {
+async function loadIncidents(page = currentPage, filters = buildFilterParams()) {
     showLoading(true);
     
     try {
-        // Charger tous les incidents en une seule requête
         const params = new URLSearchParams({
-            per_page: 348, // Charger tous les 348 incidents
+            page: page,
+            per_page: itemsPerPage,
             ...filters
         });
         
@@ -69,20 +136,12 @@ async function loadIncidents(page = 1, filters = {}) {
         if (data.success) {
             allIncidents = data.data;
             filteredIncidents = [...allIncidents];
-            
-            // Calculer la pagination côté client
-            const totalPages = Math.ceil(filteredIncidents.length / itemsPerPage);
-            const pagination = {
-                total: filteredIncidents.length,
-                pages: totalPages,
-                page: currentPage,
-                per_page: itemsPerPage
-            };
+            currentPage = page;
             
             // Mettre à jour la pagination
-            updatePagination(pagination);
+            updatePagination(data.pagination);
             
-            console.log(`✅ ${allIncidents.length} incidents chargés au total`);
+            console.log(`✅ ${allIncidents.length} incidents chargés (page ${currentPage}/${totalPages})`);
             return data;
         } else {
             throw new Error(data.error);
@@ -223,64 +282,13 @@ function toggleTypeFilter(chip, typeId) {
 }
 
 /**
- * Appliquer les filtres
+ * Appliquer les filtres (exécutés par le serveur) et revenir à la première page
  */
-function applyFilters() {
-    const statusFilter = document.getElementById('statusFilter').value;
-    const periodFilter = document.getElementById('periodFilter').value;
-    const searchFilter = document.getElementById('searchFilter').value.toLowerCase();
-    
-    // Types sélectionnés
-    const selectedTypes = Array.from(document.querySelectorAll('.type-chip.active'))
-        .map(chip => parseInt(chip.dataset.typeId));
-    
-    filteredIncidents = allIncidents.filter(incident => {
-        // Filtre par statut
-        if (statusFilter && incident.statut !== statusFilter) {
-            return false;
-        }
-        
-        // Filtre par recherche
-        if (searchFilter && incident.description && 
-            !incident.description.toLowerCase().includes(searchFilter)) {
-            return false;
-        }
-        
-        // Filtre par type
-        if (selectedTypes.length > 0 && !selectedTypes.includes(incident.type_id)) {
-            return false;
-        }
-        
-        // Filtre par période
-        if (periodFilter && incident.date_debut) {
-            const incidentDate = new Date(incident.date_debut);
-            const now = new Date();
-            
-            switch (periodFilter) {
-                case 'today':
-                    if (incidentDate.toDateString() !== now.toDateString()) return false;
-                    break;
-                case 'week':
-                    const weekAgo = new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000);
-                    if (incidentDate < weekAgo) return false;
-                    break;
-                case 'month':
-                    if (incidentDate.getMonth() !== now.getMonth() || 
-                        incidentDate.getFullYear() !== now.getFullYear()) return false;
-                    break;
-                case 'year':
-                    if (incidentDate.getFullYear() !== now.getFullYear()) return false;
-                    break;
-            }
-        }
-        
-        return true;
-    });
-    
-    currentPage = 1;
+async function applyFilters() {
+    await loadIncidents(1);
     renderIncidents();
     
-    console.log(`🔍 Filtres appliqués: ${filteredIncidents.length} incidents trouvés`);
+    console.log(`🔍 Filtres appliqués: ${totalIncidents} incidents trouvés`);
 }
 
 /**
@@ -306,12 +314,8 @@ function renderIncidents() {
         return;
     }
     
-    // Pagination côté client
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    const endIndex = Math.min(startIndex + itemsPerPage, filteredIncidents.length);
-    const pageIncidents = filteredIncidents.slice(startIndex, endIndex);
-    
-    pageIncidents.forEach(incident => {
+    // La page courante est déjà découpée par le serveur
+    filteredIncidents.forEach(incident => {
         const card = createIncidentCard(incident);
         container.appendChild(card);
     });
@@ -508,10 +512,9 @@ function showIncidentDetails(incidentId) {
 }
 
 /**
- * Mettre à jour la pagination côté client
+ * Mettre à jour les contrôles de pagination
  */
 function updateClientPagination() {
-    const totalPages = Math.ceil(filteredIncidents.length / itemsPerPage);
     const pagination = document.getElementById('paginationControls');
     
     if (totalPages <= 1) {
@@ -521,7 +524,7 @@ function updateClientPagination() {
     
     // Calculer les indices de début et fin pour la page courante
     const startIndex = (currentPage - 1) * itemsPerPage + 1;
-    const endIndex = Math.min(currentPage * itemsPerPage, filteredIncidents.length);
+    const endIndex = Math.min(currentPage * itemsPerPage, totalIncidents);
     
     let html = '';
     
@@ -529,7 +532,7 @@ function updateClientPagination() {
     html += `
         <li class="page-item disabled">
             <span class="page-link">
-                Affichage ${startIndex}-${endIndex} sur ${filteredIncidents.length} incidents
+                Affichage ${startIndex}-${endIndex} sur ${totalIncidents} incidents
             </span>
         </li>
     `;
@@ -601,21 +604,20 @@ function updateClientPagination() {
 /**
  * Aller à une page spécifique
  */
-function goToPage(page) {
-    const totalPages = Math.ceil(filteredIncidents.length / itemsPerPage);
+async function goToPage(page) {
     if (page < 1 || page > totalPages) return;
     
-    currentPage = page;
+    await loadIncidents(page);
     renderIncidents();
 }
 
 /**
  * Changer le nombre d'éléments par page
  */
-function changeItemsPerPage() {
+async function changeItemsPerPage() {
     const newItemsPerPage = parseInt(document.getElementById('itemsPerPageSelect').value);
     itemsPerPage = newItemsPerPage;
-    currentPage = 1; // Retour à la première page
+    await loadIncidents(1); // Retour à la première page
     renderIncidents();
     showNotification(`Affichage de ${newItemsPerPage} incidents par page`, 'info');
 }
@@ -624,14 +626,13 @@ function changeItemsPerPage() {
  * Mettre à jour les informations de pagination
  */
 function updatePaginationInfo() {
-    const totalPages = Math.ceil(filteredIncidents.length / itemsPerPage);
-    const startIndex = (currentPage - 1) * itemsPerPage + 1;
-    const endIndex = Math.min(currentPage * itemsPerPage, filteredIncidents.length);
+    const startIndex = totalIncidents > 0 ? (currentPage - 1) * itemsPerPage + 1 : 0;
+    const endIndex = Math.min(currentPage * itemsPerPage, totalIncidents);
     
     // Mettre à jour l'information principale
     const paginationInfo = document.getElementById('paginationInfo');
     if (paginationInfo) {
-        paginationInfo.textContent = `Affichage des incidents ${startIndex} à ${endIndex} sur ${filteredIncidents.length} au total`;
+        paginationInfo.textContent = `Affichage des incidents ${startIndex} à ${endIndex} sur ${totalIncidents} au total`;
     }
     
     // Mettre à jour les statistiques
@@ -650,7 +651,7 @@ async function refreshIncidents() {
         loadIncidents(),
         loadStatistics()
     ]);
-    applyFilters();
+    renderIncidents();
     showNotification('Incidents actualisés', 'success');
 }
 
@@ -720,8 +721,7 @@ async function saveNewIncident() {
             form.reset();
             
             // Recharger les incidents
-            await loadIncidents();
-            applyFilters();
+            await applyFilters();
             
             showNotification('Incident créé avec succès', 'success');
         } else {
@@ -819,8 +819,7 @@ async function updateIncident() {
             saveButton.onclick = saveNewIncident;
             
             // Recharger les incidents
-            await loadIncidents();
-            applyFilters();
+            await applyFilters();
             
             showNotification('Incident modifié avec succès', 'success');
         } else {
@@ -838,8 +837,8 @@ async function updateIncident() {
  * Mettre à jour la pagination (API)
  */
 function updatePagination(pagination) {
-    // Cette fonction est appelée pour la pagination côté serveur
-    // Pour l'instant, nous utilisons la pagination côté client
+    totalIncidents = pagination.total || 0;
+    totalPages = pagination.pages || 0;
 }
 
 /**
@@ -0,0 +1,10 @@
+"""Tests unitaires (sans base de données ni serveur): python -m pytest tests
+
+Les test_*.py à la racine du dépôt sont des scripts à lancer contre une
+application en marche, pas des tests pytest.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,64 @@
+"""Index de préfixes de l'autocomplétion des gares"""
+
+from autocompletion import IndexPrefixes, cles_gare, normaliser
+
+GARES = [
+    {'id': 1, 'nom': 'Rabat Ville', 'code': 'RBV', 'codeoperationnel': 'LIN01.RABAT', 'publishid': '100'},
+    {'id': 2, 'nom': 'Salé Tabriquet', 'code': 'SLT', 'codeoperationnel': None, 'publishid': '200'},
+    {'id': 3, 'nom': 'Rabat Agdal', 'code': 'RBA', 'codeoperationnel': None, 'publishid': '101'},
+    {'id': 4, 'nom': 'Fès', 'code': 'FES', 'codeoperationnel': None, 'publishid': '300'},
+]
+
+def index_charge():
+    index = IndexPrefixes()
+    index.charger([dict(gare) for gare in GARES])
+    return index
+
+def ids(resultats):
+    return [gare['id'] for gare in resultats]
+
+def test_normaliser():
+    assert normaliser('Salé-Tabriquet  (Gare)') == 'sale tabriquet gare'
+    assert normaliser('FÈS') == 'fes'
+    assert normaliser(None) == ''
+
+def test_cles_gare():
+    # Chaque mot du nom est un point d'entrée, pas ceux des autres champs
+    assert cles_gare(GARES[1]) == {'sale tabriquet', 'tabriquet', 'slt', '200'}
+
+def test_recherche_par_prefixe():
+    index = index_charge()
+    assert len(index) == 4
+    assert ids(index.rechercher('rab')) == [3, 1]
+    assert ids(index.rechercher('Sale')) == [2]
+    assert ids(index.rechercher('tabri')) == [2]
+    assert ids(index.rechercher('fès')) == [4]
+    assert ids(index.rechercher('10')) == [1, 3]
+    assert ids(index.rechercher('lin01')) == [1]
+    assert index.rechercher('casa') == []
+    assert index.rechercher('  ') == []
+
+def test_gare_trouvee_une_seule_fois():
+    index = index_charge()
+    # Le nom et le code des deux gares de Rabat commencent par 'r': chacune une seule fois
+    assert ids(index.rechercher('r')) == [3, 1]
+
+def test_limite():
+    index = index_charge()
+    assert ids(index.rechercher('rabat', limite=1)) == [3]
+
+def test_mise_a_jour_et_retrait():
+    index = index_charge()
+    index.mettre_a_jour({'id': 1, 'nom': 'Rabat Centre', 'code': 'RBC', 'codeoperationnel': None,
+                         'publishid': '100'})
+    assert ids(index.rechercher('ville')) == []
+    assert ids(index.rechercher('centre')) == [1]
+    assert index.rechercher('rabat c')[0]['code'] == 'RBC'
+    index.mettre_a_jour({'id': 5, 'nom': 'Kénitra', 'code': 'KEN', 'codeoperationnel': None, 'publishid': '400'})
+    assert ids(index.rechercher('ken')) == [5]
+    assert len(index) == 5
+
+    index.retirer(3)
+    index.retirer(42)
+    assert ids(index.rechercher('rabat')) == [1]
+    assert len(index) == 4
@@ -0,0 +1,84 @@
+"""Cache des réponses JSON: LRU, expiration, invalidation par groupe, réponses calculées pendant une invalidation"""
+
+import time
+
+from flask import Flask, jsonify
+
+from cache_reponses import CacheReponses
+
+def test_lru_et_expiration(monkeypatch):
+    cache = CacheReponses(taille_max=2)
+    cache.ecrire('a', b'1', 'application/json', 60, ())
+    cache.ecrire('b', b'2', 'application/json', 60, ())
+    assert cache.lire('a') == (b'1', 'application/json')
+    cache.ecrire('c', b'3', 'application/json', 60, ())
+    # 'b', la moins récemment utilisée, est évincée
+    assert cache.lire('b') is None
+    assert cache.lire('c') == (b'3', 'application/json')
+
+    maintenant = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: maintenant + 61)
+    assert cache.lire('a') is None
+    stats = cache.stats()
+    assert (stats['evictions'], stats['expirations'], stats['succes'], stats['echecs']) == (1, 1, 2, 2)
+
+def test_invalidation_par_groupe():
+    cache = CacheReponses()
+    cache.ecrire('gares', b'1', 'application/json', 60, ('gares',))
+    cache.ecrire('mixte', b'2', 'application/json', 60, ('gares', 'evenements'))
+    cache.ecrire('types', b'3', 'application/json', 60, ('types',))
+    cache.invalider('evenements')
+    assert cache.lire('mixte') is None
+    assert cache.lire('gares') is not None
+    cache.invalider()
+    assert cache.lire('gares') is None and cache.lire('types') is None
+    assert cache.stats()['invalidations'] == 3
+
+def test_ecriture_perimee_ignoree():
+    cache = CacheReponses()
+    generation = cache.generation(('gares',))
+    cache.invalider('types')
+    assert cache.ecrire('a', b'1', 'application/json', 60, ('gares',), generation)
+    cache.invalider('gares')
+    assert not cache.ecrire('b', b'2', 'application/json', 60, ('gares',), generation)
+    generation = cache.generation(('gares',))
+    cache.invalider()
+    assert not cache.ecrire('c', b'3', 'application/json', 60, ('gares',), generation)
+    assert cache.lire('b') is None and cache.lire('c') is None
+
+def application(cache, vue):
+    app = Flask(__name__)
+    app.add_url_rule('/ressource', 'ressource', cache.en_cache(ttl=60, groupes=('gares',))(vue))
+    return app.test_client()
+
+def test_decorateur():
+    cache = CacheReponses()
+    appels = []
+
+    def vue():
+        appels.append(1)
+        return jsonify({'success': True, 'n': len(appels)})
+
+    client = application(cache, vue)
+    assert client.get('/ressource?a=1').get_json()['n'] == 1
+    assert client.get('/ressource?a=1').get_json()['n'] == 1
+    assert client.get('/ressource?a=2').get_json()['n'] == 2
+    cache.invalider('gares')
+    assert client.get('/ressource?a=1').get_json()['n'] == 3
+
+def test_decorateur_erreurs_non_memorisees():
+    cache = CacheReponses()
+    client = application(cache, lambda: jsonify({'success': False, 'error': 'base indisponible'}))
+    client.get('/ressource')
+    assert cache.stats()['taille'] == 0
+
+def test_decorateur_invalidation_pendant_le_calcul():
+    cache = CacheReponses()
+
+    def vue():
+        # Écriture concurrente validée pendant la lecture de la base
+        cache.invalider('gares')
+        return jsonify({'success': True})
+
+    application(cache, vue).get('/ressource')
+    assert cache.stats()['taille'] == 0
@@ -0,0 +1,74 @@
+"""Cache disque des tuiles: éviction, invalidation par emprise, écritures périmées"""
+
+import os
+
+from cache_tuiles import CacheTuiles
+from tuiles_mvt import limites_tuile
+
+Z, X, Y = 8, 122, 105
+
+def tuiles_en_cache(dossier):
+    return sorted(int(nom[:-len('.mvt')]) for nom in os.listdir(os.path.join(dossier, str(Z), str(X)))
+                  if nom.endswith('.mvt'))
+
+def test_ecrire_puis_lire(tmp_path):
+    cache = CacheTuiles(str(tmp_path), taille_max=10000)
+    assert cache.lire(Z, X, Y) is None
+    assert cache.ecrire(Z, X, Y, b'tuile', cache.generation)
+    assert cache.lire(Z, X, Y) == b'tuile'
+    stats = cache.stats()
+    assert (stats['succes'], stats['echecs'], stats['taille_octets']) == (1, 1, 5)
+
+def test_eviction_des_moins_recemment_lues(tmp_path):
+    cache = CacheTuiles(str(tmp_path), taille_max=3000)
+    for i in range(5):
+        cache.ecrire(Z, X, Y + i, b'x' * 500, cache.generation)
+        os.utime(cache._chemin(Z, X, Y + i), (1000 + i, 1000 + i))
+    # La plus ancienne, relue, passe en dernier dans l'ordre d'éviction
+    cache.lire(Z, X, Y)
+    for i in range(5, 8):
+        cache.ecrire(Z, X, Y + i, b'x' * 500, cache.generation)
+
+    # La 7e tuile dépasse 3000 octets: retour sous 90% (2500), puis la 8e remonte à 3000
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['taille_octets'] == 3000
+    assert tuiles_en_cache(str(tmp_path)) == [Y, Y + 3, Y + 4, Y + 5, Y + 6, Y + 7]
+
+def test_invalidation_par_emprise(tmp_path):
+    cache = CacheTuiles(str(tmp_path), taille_max=10000)
+    for i in range(0, 10, 3):
+        cache.ecrire(Z, X, Y + i, b'x', cache.generation)
+    cache.ecrire(Z - 1, X // 2, (Y + 9) // 2, b'x', cache.generation)
+
+    # Un point à l'intérieur de la tuile Y + 3: elle seule est touchée à ce zoom,
+    # ainsi que la tuile parente qui la contient
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y + 3)
+    lon, lat = (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+    cache.invalider_emprise(lon, lat, lon, lat)
+    assert tuiles_en_cache(str(tmp_path)) == [Y, Y + 6, Y + 9]
+    assert cache.lire(Z - 1, X // 2, (Y + 9) // 2) == b'x'
+
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y + 9)
+    cache.invalider_emprise(min_lon, min_lat, max_lon, max_lat)
+    assert tuiles_en_cache(str(tmp_path)) == [Y, Y + 6]
+    assert cache.lire(Z - 1, X // 2, (Y + 9) // 2) is None
+
+def test_ecriture_perimee_ignoree(tmp_path):
+    cache = CacheTuiles(str(tmp_path), taille_max=10000)
+    generation = cache.generation
+    cache.invalider_emprise(-180, -85, 180, 85)
+    # Tuile calculée avant l'invalidation: pas écrite
+    assert not cache.ecrire(Z, X, Y, b'ancienne', generation)
+    assert cache.lire(Z, X, Y) is None
+    assert cache.ecrire(Z, X, Y, b'nouvelle', cache.generation)
+
+def test_vider_et_sequence(tmp_path):
+    cache = CacheTuiles(str(tmp_path), taille_max=10000)
+    assert cache.lire_sequence() == 0
+    cache.ecrire_sequence(42)
+    cache.ecrire(Z, X, Y, b'x', cache.generation)
+    cache.vider()
+    assert cache.lire(Z, X, Y) is None
+    assert cache.stats()['taille_octets'] == 0
+    # La séquence survit au vidage: elle dit jusqu'où le journal a été appliqué
+    assert CacheTuiles(str(tmp_path), taille_max=10000).lire_sequence() == 42
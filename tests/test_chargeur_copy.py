@@ -0,0 +1,59 @@
+"""Lecture en flux des dumps CSV irréguliers et découpage en lots pour COPY"""
+
+import csv
+import io
+import os
+
+from chargeur_copy import FICHIERS_SQL_DATA, FluxCopie, enregistrements_csv, largeur_premiere_ligne, lots
+
+SQL_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql_data')
+
+def test_enregistrements_ramenes_a_la_largeur():
+    fichier = io.StringIO('1,a,b,c\n2,a\n3,"récit\nsur deux lignes",x\n')
+    assert list(enregistrements_csv(fichier, 3)) == [
+        ['1', 'a', 'b'],
+        ['2', 'a', ''],
+        ['3', 'récit\nsur deux lignes', 'x'],
+    ]
+
+def test_lots():
+    assert list(lots(range(7), taille=3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(lots(range(6), taille=3)) == [[0, 1, 2], [3, 4, 5]]
+    assert list(lots([], taille=3)) == []
+
+def test_lots_paresseux():
+    lus = []
+
+    def source():
+        for i in range(10):
+            lus.append(i)
+            yield i
+
+    premier = next(lots(source(), taille=4))
+    assert premier == [0, 1, 2, 3]
+    assert lus == [0, 1, 2, 3]
+
+def test_flux_copie_un_lot_par_lecture():
+    enregistrements = [[str(i), f'texte, "{i}"\nsuite'] for i in range(5)]
+    flux = FluxCopie(iter(enregistrements), taille_lot=2)
+    morceaux = []
+    while True:
+        donnees = flux.read(8192)
+        if not donnees:
+            break
+        morceaux.append(donnees)
+    assert len(morceaux) == 3
+    assert (flux.nb_lots, flux.nb_enregistrements) == (3, 5)
+    assert list(csv.reader(io.StringIO(''.join(morceaux)))) == enregistrements
+
+def test_dumps_sql_data():
+    # Chaque dump de l'échantillon se relit en enregistrements de largeur fixe
+    for table in FICHIERS_SQL_DATA:
+        chemin = os.path.join(SQL_DATA, table)
+        if not os.path.exists(chemin):
+            continue
+        largeur = largeur_premiere_ligne(chemin)
+        with open(chemin, encoding='utf-8', newline='') as fichier:
+            enregistrements = list(enregistrements_csv(fichier, largeur))
+        assert enregistrements
+        assert {len(enregistrement) for enregistrement in enregistrements} == {largeur}
@@ -0,0 +1,130 @@
+"""Décodeurs EWKB vectorisés comparés aux parseurs ligne à ligne, importance Douglas-Peucker"""
+
+import csv
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from geometrie import (_point_depuis_wkt, decode_wkb_linestring, decode_wkb_points, importance_sommets,
+                       parse_wkb_point, simplifier_douglas_peucker)
+
+SQL_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql_data')
+
+def lignes_sql_data(table):
+    with open(os.path.join(SQL_DATA, table), newline='', encoding='utf-8') as fichier:
+        return list(csv.reader(fichier))
+
+def geometries_gares():
+    """Les deux colonnes géométriques (hexadécimal) de l'échantillon des gares"""
+    return [ligne[i] for ligne in lignes_sql_data('gpd_gares_ref') for i in (4, 5) if ligne[i]]
+
+def test_points_identiques_au_parseur_unitaire():
+    geometries = geometries_gares()
+    attendu = np.array([_point_depuis_wkt(parse_wkb_point(wkb)) for wkb in geometries])
+
+    lon, lat = decode_wkb_points(geometries)
+    np.testing.assert_allclose(np.column_stack((lon, lat)), attendu, rtol=0, atol=1e-9)
+
+    # Même résultat depuis les tampons binaires (colonnes bytea / geometry)
+    lon, lat = decode_wkb_points([bytes.fromhex(wkb) for wkb in geometries])
+    np.testing.assert_allclose(np.column_stack((lon, lat)), attendu, rtol=0, atol=1e-9)
+
+def point_3857(x, y):
+    return '0101000020110F0000' + struct.pack('<2d', x, y).hex().upper()
+
+def test_lots_successifs_independants():
+    # Hors des limites en conversion mètres: résolus par les systèmes projetés,
+    # essayés dans le même ordre à chaque lot, comme par le parseur unitaire
+    lots = [[point_3857(500000, 750000)], [point_3857(500000, 300000), point_3857(500000, 750000)]]
+    for lot in lots + lots[::-1]:
+        attendu = np.array([_point_depuis_wkt(parse_wkb_point(wkb)) for wkb in lot])
+        lon, lat = decode_wkb_points(lot)
+        np.testing.assert_allclose(np.column_stack((lon, lat)), attendu, rtol=0, atol=1e-9)
+
+def test_points_illisibles():
+    valide = geometries_gares()[0]
+    lon, lat = decode_wkb_points([None, '', valide[:30], valide[:18] + 'ZZ' * 16, valide])
+    assert np.isnan(lon[:2]).all() and np.isnan(lat[:2]).all()
+    # Tronqué ou invalide: même réponse que le parseur unitaire
+    for i, wkb in ((2, valide[:30]), (3, valide[:18] + 'ZZ' * 16)):
+        assert (lon[i], lat[i]) == pytest.approx(_point_depuis_wkt(parse_wkb_point(wkb)), nan_ok=True)
+    assert not np.isnan(lon[4])
+
+def linestring_ewkb(coords, srid=3857, drapeaux=0, ordre='<'):
+    """EWKB d'une LineString, avec des colonnes supplémentaires (Z, M) si coords en a"""
+    type_geom = 2 | 0x20000000 | drapeaux
+    entete = (b'\x01' if ordre == '<' else b'\x00') + struct.pack(f'{ordre}II', type_geom, srid)
+    valeurs = [v for sommet in coords for v in sommet]
+    return entete + struct.pack(f'{ordre}I{len(valeurs)}d', len(coords), *valeurs)
+
+def test_linestring_echantillon():
+    wkb = lignes_sql_data('graphe_arc')[0][8]
+    coords, srid = decode_wkb_linestring(wkb)
+    assert srid == 3857
+    (nb_points,) = struct.unpack_from('<I', bytes.fromhex(wkb), 9)
+    assert coords.shape == (nb_points, 2)
+    # Binaire et hexadécimal lus à l'identique
+    binaire, _ = decode_wkb_linestring(bytes.fromhex(wkb))
+    np.testing.assert_array_equal(binaire, coords)
+    assert struct.unpack_from('<2d', bytes.fromhex(wkb), 13) == tuple(coords[0])
+
+@pytest.mark.parametrize('drapeaux, dimensions', [(0, 2), (0x80000000, 3), (0x40000000, 3), (0xC0000000, 4)])
+@pytest.mark.parametrize('ordre', ['<', '>'])
+def test_linestring_z_m(drapeaux, dimensions, ordre):
+    sommets = [(1.0, 2.0, 9.0, 8.0), (3.0, 4.0, 9.0, 8.0), (5.0, 6.0, 9.0, 8.0)]
+    wkb = linestring_ewkb([s[:dimensions] for s in sommets], drapeaux=drapeaux, ordre=ordre)
+    coords, srid = decode_wkb_linestring(wkb)
+    assert srid == 3857
+    assert coords.tolist() == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+
+def test_linestring_iso_z():
+    # Type ISO 1002 (LineString Z) sans SRID
+    wkb = b'\x01' + struct.pack('<II6d', 1002, 2, 1.0, 2.0, 9.0, 3.0, 4.0, 9.0)
+    coords, srid = decode_wkb_linestring(wkb)
+    assert srid is None
+    assert coords.tolist() == [[1.0, 2.0], [3.0, 4.0]]
+
+def test_linestring_tronquee_ou_autre_type():
+    wkb = linestring_ewkb([(1.0, 2.0), (3.0, 4.0)])
+    assert decode_wkb_linestring(wkb[:-1]) == (None, 3857)
+    assert decode_wkb_linestring(wkb[:11]) == (None, 3857)
+    assert decode_wkb_linestring(wkb[:5]) == (None, None)
+    assert decode_wkb_linestring(geometries_gares()[0]) == (None, 3857)
+    assert decode_wkb_linestring(None) == (None, None)
+
+def douglas_peucker_recursif(coords, tolerance):
+    """Implémentation de référence, directement tirée de la définition"""
+    if len(coords) <= 2:
+        return coords
+    a, b = coords[0], coords[-1]
+    segment = b - a
+    longueur = np.hypot(*segment)
+    points = coords[1:-1] - a
+    if longueur == 0:
+        distances = np.hypot(points[:, 0], points[:, 1])
+    else:
+        distances = np.abs(segment[0] * points[:, 1] - segment[1] * points[:, 0]) / longueur
+    i = int(np.argmax(distances)) + 1
+    if distances[i - 1] <= tolerance:
+        return coords[[0, -1]]
+    gauche = douglas_peucker_recursif(coords[:i + 1], tolerance)
+    droite = douglas_peucker_recursif(coords[i:], tolerance)
+    return np.vstack((gauche[:-1], droite))
+
+def test_importance_equivaut_a_douglas_peucker():
+    generateur = np.random.default_rng(0)
+    coords = np.cumsum(generateur.normal(size=(200, 2)), axis=0)
+    importance = importance_sommets(coords)
+    assert importance[0] == importance[-1] == np.inf
+    for tolerance in (0.1, 0.5, 1.0, 2.0, 5.0, 20.0):
+        attendu = douglas_peucker_recursif(coords, tolerance)
+        np.testing.assert_array_equal(simplifier_douglas_peucker(coords, tolerance), attendu)
+
+def test_importance_lignes_courtes():
+    assert importance_sommets(np.zeros((0, 2))).tolist() == []
+    assert importance_sommets(np.array([[0.0, 0.0], [1.0, 1.0]])).tolist() == [np.inf, np.inf]
+    # Sommet aligné: importance nulle, supprimé dès la plus petite tolérance
+    ligne = np.array([[0.0, 0.0], [1.0, 0.0], [2.0, 0.0]])
+    assert importance_sommets(ligne).tolist() == [np.inf, 0.0, np.inf]
@@ -0,0 +1,75 @@
+"""Pagination par curseur de /api/evenements: jetons et parcours complet par recherche de clé"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import decoder_curseur, encoder_curseur, lire_page_curseur
+
+def test_jeton_aller_retour():
+    date = datetime(2024, 3, 1, 8, 30, 15, 123456)
+    jeton = encoder_curseur(date, 42)
+    assert '=' not in jeton
+    assert decoder_curseur(jeton) == (date, 42)
+    assert decoder_curseur(encoder_curseur(None, 7)) == (None, 7)
+
+def test_jeton_lisible():
+    assert decoder_curseur('2024-03-01T08:30:00,42') == (datetime(2024, 3, 1, 8, 30), 42)
+    assert decoder_curseur('null,7') == (None, 7)
+    assert decoder_curseur(',7') == (None, 7)
+
+@pytest.mark.parametrize('jeton', ['abc', 'pas-une-date,1', '2024-03-01,x', encoder_curseur(None, 1)[:-2]])
+def test_jeton_invalide(jeton):
+    with pytest.raises(ValueError, match='Curseur de pagination invalide'):
+        decoder_curseur(jeton)
+
+class CurseurSimule:
+    """Curseur psycopg2 qui applique à une liste les conditions de lire_page_curseur"""
+
+    def __init__(self, evenements):
+        # date_debut DESC NULLS LAST, id DESC
+        self.evenements = sorted(evenements, reverse=True,
+                                 key=lambda e: (e['date_debut'] is not None, e['date_debut'] or datetime.min, e['id']))
+        self.requetes = 0
+
+    def execute(self, requete, params):
+        self.requetes += 1
+        lignes = self.evenements
+        if '(e.date_debut, e.id) < (%s, %s)' in requete:
+            date, identifiant = params[-3], params[-2]
+            lignes = [e for e in lignes if e['date_debut'] is not None and (e['date_debut'], e['id']) < (date, identifiant)]
+        elif 'e.id < %s' in requete:
+            lignes = [e for e in lignes if e['date_debut'] is None and e['id'] < params[-2]]
+        elif 'e.date_debut IS NULL' in requete:
+            lignes = [e for e in lignes if e['date_debut'] is None]
+        self.resultat = lignes[:params[-1]]
+
+    def fetchall(self):
+        return list(self.resultat)
+
+def parcourir(evenements, per_page):
+    cursor = CurseurSimule(evenements)
+    vus, curseur = [], None
+    while True:
+        lignes, jeton = lire_page_curseur(cursor, 'SELECT', [], [], curseur, per_page)
+        assert len(lignes) <= per_page
+        vus.extend(e['id'] for e in lignes)
+        if jeton is None:
+            return vus, cursor
+        curseur = decoder_curseur(jeton)
+
+@pytest.mark.parametrize('per_page', [1, 3, 7, 50])
+def test_parcours_complet(per_page):
+    debut = datetime(2024, 1, 1)
+    evenements = [{'id': i, 'date_debut': debut + timedelta(hours=i // 3) if i % 5 else None} for i in range(1, 31)]
+    vus, _ = parcourir(evenements, per_page)
+    # Chaque événement une fois, dans l'ordre de l'index, les dates absentes à la fin
+    assert vus == [e['id'] for e in CurseurSimule(evenements).evenements]
+    assert all(i % 5 == 0 for i in vus[-6:])
+
+def test_page_exacte_sans_jeton():
+    evenements = [{'id': i, 'date_debut': datetime(2024, 1, i)} for i in range(1, 4)]
+    cursor = CurseurSimule(evenements)
+    lignes, jeton = lire_page_curseur(cursor, 'SELECT', [], [], None, 3)
+    assert [e['id'] for e in lignes] == [3, 2, 1]
+    assert jeton is None
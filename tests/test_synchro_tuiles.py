@@ -0,0 +1,135 @@
+"""Application au cache disque du journal gpr.tuiles_invalidees, purge et horizon de purge"""
+
+import pytest
+
+import app as application
+from cache_tuiles import CacheTuiles
+from tuiles_mvt import limites_tuile
+
+Z, X, Y = 8, 122, 105
+
+class JournalSimule:
+    """gpr.tuiles_invalidees et son horizon, interprétés à partir des requêtes de l'application"""
+
+    def __init__(self):
+        self.lignes = []  # (seq, emprise ou None, âge en secondes)
+        self.horizon = 0
+        self.purges = 0
+
+    def ajouter(self, emprise, age=0):
+        seq = self.lignes[-1][0] + 1 if self.lignes else self.horizon + 1
+        self.lignes.append((seq, emprise, age))
+        return seq
+
+    def execute(self, requete, params):
+        if 'purger_tuiles_invalidees' in requete:
+            self.purges += 1
+            anciennes = [seq for seq, _, age in self.lignes if age > params[0]]
+            if anciennes:
+                self.horizon = max(self.horizon, max(anciennes))
+                self.lignes = [ligne for ligne in self.lignes if ligne[0] > self.horizon]
+            self.resultat = [(len(anciennes),)]
+        elif 'count(*)' in requete:
+            (depuis,) = params
+            lignes = [ligne for ligne in self.lignes if ligne[0] > depuis]
+            self.resultat = [(len(lignes), max((l[0] for l in lignes), default=None),
+                              any(l[1] is None for l in lignes) if lignes else None, self.horizon)]
+        else:
+            depuis, jusqua = params
+            self.resultat = [l[1] for l in self.lignes if depuis < l[0] <= jusqua]
+
+    def fetchone(self):
+        return self.resultat[0]
+
+    def fetchall(self):
+        return self.resultat
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+class PoolSimule:
+    def __init__(self, journal):
+        self.journal = journal
+
+    def obtenir(self):
+        return self.journal
+
+    def rendre(self, conn):
+        pass
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    journal = JournalSimule()
+    monkeypatch.setattr(application, 'db_pool', PoolSimule(journal))
+    monkeypatch.setattr(application, 'cache_tuiles', CacheTuiles(str(tmp_path), taille_max=10 ** 6))
+    monkeypatch.setattr(application, 'synchro_tuiles', {'sequence': None, 'instant': 0.0, 'purge': 0.0})
+    return journal
+
+def remplir_cache():
+    cache = application.cache_tuiles
+    for i in range(3):
+        cache.ecrire(Z, X, Y + i, b'x', cache.generation)
+
+def tuiles_presentes():
+    return [i for i in range(3) if application.cache_tuiles.lire(Z, X, Y + i) is not None]
+
+def test_invalidation_par_emprise(journal):
+    remplir_cache()
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y + 1)
+    lon, lat = (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+    seq = journal.ajouter((lon, lat, lon, lat))
+    application.synchroniser_cache_tuiles()
+    assert tuiles_presentes() == [0, 2]
+    assert application.synchro_tuiles['sequence'] == seq
+    assert application.cache_tuiles.lire_sequence() == seq
+
+def test_purge_des_entrees_anciennes(journal):
+    ancienne = journal.ajouter((0, 0, 0, 0), age=application.TUILES_JOURNAL_CONSERVATION + 1)
+    recente = journal.ajouter((0, 0, 0, 0))
+    application.synchroniser_cache_tuiles()
+    assert journal.purges == 1
+    assert journal.horizon == ancienne
+    assert [ligne[0] for ligne in journal.lignes] == [recente]
+
+    # Pas de nouvelle purge avant TUILES_PURGE_INTERVALLE
+    application.synchroniser_cache_tuiles()
+    assert journal.purges == 1
+
+def test_processus_a_jour_non_vide_par_la_purge(journal):
+    remplir_cache()
+    seq = journal.ajouter((0, 0, 0, 0))
+    application.synchroniser_cache_tuiles()
+    # L'entrée, appliquée, vieillit puis est purgée par un autre processus
+    journal.lignes = [(seq, (0, 0, 0, 0), application.TUILES_JOURNAL_CONSERVATION + 1)]
+    journal.execute('purger_tuiles_invalidees', (application.TUILES_JOURNAL_CONSERVATION,))
+    assert journal.horizon == seq and not journal.lignes
+
+    application.synchroniser_cache_tuiles()
+    assert tuiles_presentes() == [0, 1, 2]
+
+def test_horizon_depasse_vide_le_cache(journal):
+    remplir_cache()
+    application.cache_tuiles.ecrire_sequence(0)
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y + 1)
+    # Entrées purgées avant d'avoir été appliquées par ce processus: emprises inconnues
+    journal.horizon = 5
+    recente = journal.ajouter((min_lon, min_lat, max_lon, max_lat))
+    application.synchroniser_cache_tuiles()
+    assert tuiles_presentes() == []
+    assert application.synchro_tuiles['sequence'] == recente
+
+def test_horizon_depasse_sans_entree_restante(journal):
+    remplir_cache()
+    journal.horizon = 5
+    application.synchroniser_cache_tuiles()
+    assert tuiles_presentes() == []
+    assert application.synchro_tuiles['sequence'] == 5
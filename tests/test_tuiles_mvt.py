@@ -0,0 +1,187 @@
+"""Encodage des tuiles vectorielles: la tuile produite est relue par un décodeur protobuf minimal"""
+
+import struct
+
+import pytest
+
+from tuiles_mvt import (BUFFER, EXTENT, LIGNE, POINT, _commandes, _varint, _zigzag, encoder_couche,
+                        geometrie_ligne, geometrie_point, limites_tuile, projeter, tuiles_emprise)
+
+# Décodeur minimal du schéma vector_tile.proto
+
+def lire_varint(octets, i):
+    valeur = decalage = 0
+    while True:
+        octet = octets[i]
+        i += 1
+        valeur |= (octet & 0x7F) << decalage
+        decalage += 7
+        if octet < 0x80:
+            return valeur, i
+
+def champs(octets):
+    """(numéro, valeur) de chaque champ d'un message"""
+    i = 0
+    while i < len(octets):
+        cle, i = lire_varint(octets, i)
+        numero, type_fil = cle >> 3, cle & 7
+        if type_fil == 0:
+            valeur, i = lire_varint(octets, i)
+        elif type_fil == 1:
+            valeur = struct.unpack('<d', octets[i:i + 8])[0]
+            i += 8
+        elif type_fil == 2:
+            longueur, i = lire_varint(octets, i)
+            valeur = octets[i:i + longueur]
+            i += longueur
+        else:
+            raise ValueError(f'type de champ inattendu: {type_fil}')
+        yield numero, valeur
+
+def compacts(octets):
+    valeurs, i = [], 0
+    while i < len(octets):
+        valeur, i = lire_varint(octets, i)
+        valeurs.append(valeur)
+    return valeurs
+
+def dezigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+def decoder_geometrie(commandes):
+    """Parties en coordonnées absolues d'une suite de commandes MoveTo/LineTo"""
+    parties, i, cx, cy = [], 0, 0, 0
+    while i < len(commandes):
+        commande, nombre = commandes[i] & 7, commandes[i] >> 3
+        i += 1
+        for _ in range(nombre):
+            cx += dezigzag(commandes[i])
+            cy += dezigzag(commandes[i + 1])
+            i += 2
+            if commande == 1:
+                parties.append([(cx, cy)])
+            else:
+                assert commande == 2
+                parties[-1].append((cx, cy))
+    return parties
+
+def decoder_valeur(octets):
+    (numero, valeur), = champs(octets)
+    return {1: lambda v: v.decode('utf-8'), 3: float, 5: int, 6: dezigzag, 7: bool}[numero](valeur)
+
+def decoder_tuile(tuile):
+    """{nom de couche: {'version', 'extent', 'entites': [(id, type, parties, propriétés)]}}"""
+    couches = {}
+    for numero, couche in champs(tuile):
+        assert numero == 3
+        nom, version, extent, cles, valeurs, entites = None, None, None, [], [], []
+        for numero, valeur in champs(couche):
+            if numero == 1:
+                nom = valeur.decode('utf-8')
+            elif numero == 2:
+                entites.append(dict(champs(valeur)))
+            elif numero == 3:
+                cles.append(valeur.decode('utf-8'))
+            elif numero == 4:
+                valeurs.append(decoder_valeur(valeur))
+            elif numero == 5:
+                extent = valeur
+            elif numero == 15:
+                version = valeur
+        decodees = []
+        for entite in entites:
+            tags = compacts(entite.get(2, b''))
+            proprietes = {cles[tags[i]]: valeurs[tags[i + 1]] for i in range(0, len(tags), 2)}
+            decodees.append((entite.get(1), entite[3], decoder_geometrie(compacts(entite[4])), proprietes))
+        couches[nom] = {'version': version, 'extent': extent, 'entites': decodees}
+    return couches
+
+# Tuile de référence autour de Casablanca
+Z, X, Y = 8, 122, 105
+
+def test_varint_et_zigzag():
+    assert _varint(0) == b'\x00'
+    assert _varint(1) == b'\x01'
+    assert _varint(300) == b'\xac\x02'
+    assert lire_varint(_varint(2 ** 40 + 7), 0) == (2 ** 40 + 7, 6)
+    assert [_zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    for n in (-4097, -1, 0, 63, 4160):
+        assert dezigzag(_zigzag(n)) == n
+
+def test_commandes_relatives():
+    # MoveTo(1) puis LineTo(2) avec des déplacements relatifs au point précédent,
+    # le curseur étant conservé d'une partie à l'autre
+    commandes = _commandes([[(5, 5), (8, 5), (8, 1)], [(0, 0), (2, 2)]])
+    assert commandes == [
+        9, _zigzag(5), _zigzag(5),
+        18, _zigzag(3), _zigzag(0), _zigzag(0), _zigzag(-4),
+        9, _zigzag(-8), _zigzag(-1),
+        10, _zigzag(2), _zigzag(2),
+    ]
+    assert decoder_geometrie(commandes) == [[(5, 5), (8, 5), (8, 1)], [(0, 0), (2, 2)]]
+
+def test_projection_aux_coins_de_la_tuile():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    px, py = projeter([min_lon, max_lon], [max_lat, min_lat], Z, X, Y)
+    assert px.tolist() == pytest.approx([0, EXTENT], abs=1e-6)
+    assert py.tolist() == pytest.approx([0, EXTENT], abs=1e-6)
+    assert tuiles_emprise(Z, min_lon + 0.01, min_lat + 0.01, max_lon - 0.01, max_lat - 0.01) == (X, X, Y, Y)
+    # Avec le tampon, le coin touche les trois tuiles voisines
+    assert tuiles_emprise(Z, min_lon, min_lat, min_lon, min_lat, marge=BUFFER) == (X - 1, X, Y, Y + 1)
+
+def test_point_hors_tuile():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    assert geometrie_point(min_lon - 1, min_lat, Z, X, Y) is None
+    assert geometrie_point(None, min_lat, Z, X, Y) is None
+    # Mercator: le milieu en latitude n'est pas le milieu de la tuile
+    ((px, py),), = geometrie_point((min_lon + max_lon) / 2, (min_lat + max_lat) / 2, Z, X, Y)
+    assert px == EXTENT // 2
+    assert 0 < py < EXTENT
+
+def test_ligne_decoupee_au_tampon():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    milieu = (min_lat + max_lat) / 2
+    # De bien à gauche à bien à droite de la tuile, en passant par son centre
+    (partie,) = geometrie_ligne([min_lon - 1, (min_lon + max_lon) / 2, max_lon + 1],
+                                [milieu, milieu, milieu], Z, X, Y)
+    assert partie[0][0] == -BUFFER
+    assert partie[-1][0] == EXTENT + BUFFER
+    assert all(-BUFFER <= px <= EXTENT + BUFFER and -BUFFER <= py <= EXTENT + BUFFER for px, py in partie)
+
+def test_ligne_qui_sort_et_revient():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    milieu = (min_lon + max_lon) / 2
+    # Aller-retour au-dessus de la tuile: deux parties distinctes
+    parties = geometrie_ligne([milieu - 0.1, milieu - 0.1, milieu + 0.1, milieu + 0.1],
+                              [min_lat + 0.1, max_lat + 1, max_lat + 1, min_lat + 0.1], Z, X, Y)
+    assert len(parties) == 2
+    assert parties[0][-1][1] == -BUFFER
+    assert parties[1][0][1] == -BUFFER
+
+def test_ligne_hors_tuile():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    assert geometrie_ligne([max_lon + 1, max_lon + 2], [min_lat, max_lat], Z, X, Y) is None
+    assert geometrie_ligne([min_lon], [min_lat], Z, X, Y) is None
+
+def test_tuile_decodee():
+    min_lon, min_lat, max_lon, max_lat = limites_tuile(Z, X, Y)
+    milieu = (min_lat + max_lat) / 2
+    ligne = geometrie_ligne([min_lon - 1, max_lon + 1], [milieu, milieu], Z, X, Y)
+    tuile = (
+        encoder_couche('arcs', [(7, LIGNE, ligne, {'axe': 'A1', 'rang': -3, 'pk': 1.5, 'actif': True, 'vide': None})])
+        + encoder_couche('gares', [(1, POINT, [[(10, 20)]], {'nom': 'Rabat', 'axe': 'A1'}),
+                                   (2, POINT, [[(30, 40)]], {'nom': 'Salé', 'axe': 'A1'})])
+        + encoder_couche('rien', [])
+    )
+    couches = decoder_tuile(tuile)
+
+    assert set(couches) == {'arcs', 'gares'}
+    assert couches['arcs']['version'] == 2
+    assert couches['arcs']['extent'] == EXTENT
+    (arc,) = couches['arcs']['entites']
+    assert arc[:3] == (7, LIGNE, ligne)
+    assert arc[3] == {'axe': 'A1', 'rang': -3, 'pk': 1.5, 'actif': True}
+
+    gares = couches['gares']['entites']
+    assert [(g[0], g[1], g[2]) for g in gares] == [(1, POINT, [[(10, 20)]]), (2, POINT, [[(30, 40)]])]
+    assert [g[3] for g in gares] == [{'nom': 'Rabat', 'axe': 'A1'}, {'nom': 'Salé', 'axe': 'A1'}]
@@ -0,0 +1,209 @@
+"""
+Encodage de tuiles vectorielles Mapbox (MVT 2.1) sans dépendance externe
+
+Les entités sont données en lon/lat WGS84; elles sont projetées en Web
+Mercator dans le repère entier de la tuile (EXTENT unités de côté),
+découpées à l'emprise de la tuile élargie de BUFFER unités pour éviter les
+coupures visibles aux bords, puis encodées en protobuf. Une tuile est la
+simple concaténation de ses couches encodées.
+"""
+
+import math
+import struct
+
+import numpy as np
+
+EXTENT = 4096
+BUFFER = 64
+LATITUDE_MAX = 85.0511287798066
+
+# GeomType de la spécification
+POINT = 1
+LIGNE = 2
+
+MIME_MVT = 'application/vnd.mapbox-vector-tile'
+
+def _fraction_x(lon):
+    return (np.asarray(lon, dtype=float) + 180.0) / 360.0
+
+def _fraction_y(lat):
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -LATITUDE_MAX, LATITUDE_MAX))
+    return (1.0 - np.arcsinh(np.tan(lat)) / math.pi) / 2.0
+
+def _latitude(fraction_y):
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * fraction_y))))
+
+def limites_tuile(z, x, y, marge=0):
+    """Emprise (min_lon, min_lat, max_lon, max_lat) d'une tuile, élargie de `marge` unités"""
+    n = 2 ** z
+    m = marge / EXTENT
+    return (
+        (x - m) / n * 360.0 - 180.0,
+        _latitude(min((y + 1 + m) / n, 1.0)),
+        (x + 1 + m) / n * 360.0 - 180.0,
+        _latitude(max((y - m) / n, 0.0)),
+    )
+
+def tuiles_emprise(z, min_lon, min_lat, max_lon, max_lat, marge=0):
+    """Plages (x_min, x_max, y_min, y_max) des tuiles de zoom z dont l'emprise élargie
+    de `marge` unités recouvre l'emprise lon/lat donnée"""
+    n = 2 ** z
+    m = marge / EXTENT
+    bornes = lambda valeur: min(max(int(math.floor(valeur)), 0), n - 1)
+    return (
+        bornes(float(_fraction_x(min_lon)) * n - m), bornes(float(_fraction_x(max_lon)) * n + m),
+        bornes(float(_fraction_y(max_lat)) * n - m), bornes(float(_fraction_y(min_lat)) * n + m),
+    )
+
+def projeter(lons, lats, z, x, y):
+    """Coordonnées (flottantes) dans le repère de la tuile z/x/y"""
+    n = 2 ** z
+    px = (_fraction_x(lons) * n - x) * EXTENT
+    py = (_fraction_y(lats) * n - y) * EXTENT
+    return px, py
+
+def _decouper_segment(x0, y0, x1, y1, bas, haut):
+    """Découpage de Liang-Barsky d'un segment au carré [bas, haut]², ou None s'il est dehors
+
+    Les extrémités intérieures sont renvoyées telles quelles, ce qui permet de
+    raccorder les segments consécutifs par simple égalité.
+    """
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - bas), (dx, haut - x0), (-dy, y0 - bas), (dy, haut - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return None
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return None
+            t1 = min(t1, t)
+    debut = (x0, y0) if t0 == 0.0 else (x0 + t0 * dx, y0 + t0 * dy)
+    fin = (x1, y1) if t1 == 1.0 else (x0 + t1 * dx, y0 + t1 * dy)
+    return debut, fin
+
+def _arrondir(partie):
+    """Arrondir une partie de ligne aux unités entières, sans sommets consécutifs répétés"""
+    sommets = []
+    for px, py in partie:
+        sommet = (int(round(px)), int(round(py)))
+        if not sommets or sommets[-1] != sommet:
+            sommets.append(sommet)
+    return sommets
+
+def geometrie_point(lon, lat, z, x, y):
+    """Parties MVT d'un point, ou None s'il tombe hors de la tuile élargie"""
+    if lon is None or lat is None:
+        return None
+    px, py = projeter(lon, lat, z, x, y)
+    px, py = float(px), float(py)
+    if not (-BUFFER <= px <= EXTENT + BUFFER and -BUFFER <= py <= EXTENT + BUFFER):
+        return None
+    return [[(int(round(px)), int(round(py)))]]
+
+def geometrie_ligne(lons, lats, z, x, y):
+    """Parties MVT d'une ligne découpée à la tuile élargie, ou None si rien n'y reste"""
+    if lons is None or len(lons) < 2:
+        return None
+    px, py = projeter(lons, lats, z, x, y)
+    sommets = list(zip(px.tolist(), py.tolist()))
+
+    parties = []
+    partie = []
+    for (x0, y0), (x1, y1) in zip(sommets, sommets[1:]):
+        segment = _decouper_segment(x0, y0, x1, y1, -BUFFER, EXTENT + BUFFER)
+        if segment is None:
+            continue
+        debut, fin = segment
+        if not partie or partie[-1] != debut:
+            parties.append(partie)
+            partie = [debut]
+        partie.append(fin)
+    parties.append(partie)
+
+    parties = [sommets for sommets in map(_arrondir, parties) if len(sommets) >= 2]
+    return parties or None
+
+# Encodage protobuf (varints, champs délimités) du schéma vector_tile.proto
+
+def _varint(n):
+    octets = bytearray()
+    while n > 0x7F:
+        octets.append((n & 0x7F) | 0x80)
+        n >>= 7
+    octets.append(n)
+    return bytes(octets)
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+def _entier(numero, n):
+    return _varint(numero << 3) + _varint(n)
+
+def _delimite(numero, donnees):
+    return _varint((numero << 3) | 2) + _varint(len(donnees)) + donnees
+
+def _compacte(numero, valeurs):
+    return _delimite(numero, b''.join(_varint(v) for v in valeurs))
+
+def _valeur(valeur):
+    """Message Value: chaîne, booléen, entier ou double"""
+    if isinstance(valeur, bool):
+        return _entier(7, int(valeur))
+    if isinstance(valeur, int):
+        return _entier(5, valeur) if valeur >= 0 else _entier(6, _zigzag(valeur))
+    if isinstance(valeur, float):
+        return _varint((3 << 3) | 1) + struct.pack('<d', valeur)
+    return _delimite(1, str(valeur).encode('utf-8'))
+
+def _commandes(parties):
+    """Suite de commandes MoveTo/LineTo en coordonnées relatives zigzag"""
+    commandes = []
+    cx = cy = 0
+    for partie in parties:
+        for i, (px, py) in enumerate(partie):
+            if i == 0:
+                commandes.append((1 & 0x7) | (1 << 3))
+            elif i == 1:
+                commandes.append((2 & 0x7) | ((len(partie) - 1) << 3))
+            commandes.append(_zigzag(px - cx))
+            commandes.append(_zigzag(py - cy))
+            cx, cy = px, py
+    return commandes
+
+def encoder_couche(nom, entites):
+    """Encoder une couche (champ layers du message Tile)
+
+    `entites`: itérable de (id, type, parties, proprietes), avec les parties
+    renvoyées par geometrie_point / geometrie_ligne; les propriétés None sont
+    omises. Une couche sans entité n'est pas émise.
+    """
+    cles = {}
+    valeurs = {}
+    corps = []
+    for identifiant, type_geometrie, parties, proprietes in entites:
+        tags = []
+        for cle, valeur in proprietes.items():
+            if valeur is None:
+                continue
+            tags.append(cles.setdefault(cle, len(cles)))
+            tags.append(valeurs.setdefault((type(valeur), valeur), len(valeurs)))
+        entite = b''
+        if identifiant is not None:
+            entite += _entier(1, identifiant)
+        entite += _compacte(2, tags) + _entier(3, type_geometrie) + _compacte(4, _commandes(parties))
+        corps.append(_delimite(2, entite))
+    if not corps:
+        return b''
+
+    couche = _entier(15, 2) + _delimite(1, nom.encode('utf-8')) + b''.join(corps)
+    couche += b''.join(_delimite(3, cle.encode('utf-8')) for cle in cles)
+    couche += b''.join(_delimite(4, _valeur(valeur)) for _, valeur in valeurs)
+    couche += _entier(5, EXTENT)
+    return _delimite(3, couche)
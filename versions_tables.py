@@ -0,0 +1,88 @@
+"""
+Compteurs de version par table pour les requêtes conditionnelles (ETag / Last-Modified)
+
+Les endpoints d'écriture incrémentent la version des tables modifiées; les
+endpoints de lecture dérivent un ETag fort des versions des tables qu'ils
+lisent et répondent 304 sans interroger la base quand rien n'a changé.
+Les compteurs sont propres au processus: un identifiant d'époque tiré au
+démarrage garantit qu'un redémarrage invalide les ETags déjà distribués.
+"""
+
+import hashlib
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import request, current_app
+
+class VersionsTables:
+    """Versions et dates de dernière modification des tables, thread-safe"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._epoque = uuid.uuid4().hex
+        self._demarrage = datetime.now(timezone.utc)
+        self._versions = {}
+        self._modifications = {}
+
+    def incrementer(self, *tables):
+        """Signaler une écriture sur des tables"""
+        maintenant = datetime.now(timezone.utc)
+        with self._verrou:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modifications[table] = maintenant
+
+    def etat(self, tables):
+        """(versions, dernière modification) d'un ensemble de tables"""
+        with self._verrou:
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+            derniere = max((self._modifications.get(table, self._demarrage) for table in tables),
+                           default=self._demarrage)
+        return versions, derniere
+
+    def etag(self, tables, *parties):
+        """ETag fort: époque, versions des tables et parties propres à la ressource"""
+        versions, _ = self.etat(tables)
+        empreinte = hashlib.sha1(repr((self._epoque, tables, versions, parties)).encode())
+        return empreinte.hexdigest()
+
+    def conditionnel(self, *tables):
+        """Décorateur de vue Flask: ETag/Last-Modified et 304 si la ressource n'a pas changé"""
+        def decorateur(vue):
+            @wraps(vue)
+            def vue_conditionnelle(*args, **kwargs):
+                _, derniere = self.etat(tables)
+                etag = self.etag(tables, request.endpoint, tuple(sorted(kwargs.items())),
+                                 tuple(sorted(request.args.items(multi=True))))
+
+                if request.if_none_match:
+                    inchange = request.if_none_match.contains(etag)
+                else:
+                    # Dates précises: une écriture dans la seconde d'un Last-Modified
+                    # déjà envoyé reste postérieure à If-Modified-Since
+                    inchange = request.if_modified_since is not None and request.if_modified_since >= derniere
+                if inchange:
+                    reponse = current_app.response_class(status=304)
+                else:
+                    reponse = current_app.make_response(vue(*args, **kwargs))
+                    # Les erreurs ({'success': False}, HTTP 200) ne sont jamais validables
+                    if reponse.status_code != 200 or (
+                            reponse.is_json and not (reponse.get_json(silent=True) or {}).get('success')):
+                        return reponse
+
+                reponse.set_etag(etag)
+                # Last-Modified a une résolution d'une seconde: arrondi à la seconde
+                # supérieure, et omis tant que cette seconde n'est pas écoulée (une
+                # écriture pourrait encore y survenir sans changer la date annoncée)
+                seconde = derniere.replace(microsecond=0)
+                if derniere.microsecond:
+                    seconde += timedelta(seconds=1)
+                if seconde <= datetime.now(timezone.utc):
+                    reponse.last_modified = seconde
+                # Toujours revalider: le 304 ne coûte aucune requête en base
+                reponse.headers['Cache-Control'] = 'no-cache'
+                return reponse
+            return vue_conditionnelle
+        return decorateur